@@ -0,0 +1,163 @@
+#!/usr/bin/env pyhton
+# -*- coding: UTF-8 -*-
+
+
+__author__ = 'Chao Wu'
+__date__ = '10/18/2026'
+__version__ = '1.0'
+
+
+'''
+This script benchmarks splits of cores into processes x BLAS threads per process for the simulation of main2.py on a given pathway,
+the best split is used by main2.py --nprocess and --threadsPerProcess. The dense and sparse continuation are timed on one model as 
+well, to check sparseThreshold in constants.py against the pathway
+'''
+
+
+import argparse
+import os
+import re
+import time
+import numpy as np
+import pandas as pd
+from constants import nsteps
+from parse_network import parse_network, get_full_stoichiometric_matrix, get_steady_state_net_fluxes, prune_network, get_conservation_relations
+from ensemble_models import generate_stable_ensemble_models, simulate_perturbation, simulation_worker
+
+
+
+
+if __name__ == '__main__':
+
+	parser = argparse.ArgumentParser(description = 'This script benchmarks splits of cores into processes x BLAS threads per process for the simulation of main2.py')
+	parser.add_argument('-o', '--outDir', type = str, required = True, help = 'output directory')
+	parser.add_argument('-r', '--reactionFile', type = str, required = True, help = 'reaction list file, the same with main2.py')
+	parser.add_argument('-i', '--iniMetabs', type = str, required = False, help = 'metabolites as initial substrates, sep by ","')
+	parser.add_argument('-f', '--finMetabs', type = str, required = False, help = 'metabolites as end products, sep by ","')
+	parser.add_argument('-eb', '--exBalMetabs', type = str, required = False, help = 'metabolites excluded from mass balance, sep by ","')
+	parser.add_argument('-eo', '--exOptMetabs', type = str, required = False, help = 'metabolites excluded from optimization, sep by ","')
+	parser.add_argument('-b', '--enzymeBnds', type = str, required = False, default = '0.1,10', help = 'lower and upper bound of relative enzyme level, sep by ",", "0.1,10" by default')
+	parser.add_argument('-c', '--ncores', type = int, required = False, default = os.cpu_count(), help = 'number of cores to split, all cores of this machine by default')
+	parser.add_argument('-n', '--nmodels', type = int, required = False, help = 'number of models simulated with each split, 2 per core by default')
+	parser.add_argument('-sd', '--seed', type = int, required = False, default = 1, help = 'random seed of the models, 1 by default')
+	args = parser.parse_args()
+
+	outDir = args.outDir
+	ncores = args.ncores
+	nmodels = args.nmodels or 2 * ncores
+	seed = args.seed
+
+	os.makedirs(outDir, exist_ok = True)
+
+
+	## generate models -------------------------------------------------------------------------------------
+	print('\n\nGenerating models')
+	print('.' * 50)
+
+	iniMetabs = args.iniMetabs.split(',') if args.iniMetabs else []
+	finMetabs = args.finMetabs.split(',') if args.finMetabs else []
+	exBalMetabs = args.exBalMetabs.split(',') if args.exBalMetabs else []
+	exOptMetabs = args.exOptMetabs.split(',') if args.exOptMetabs else []
+
+	S4Bal, S4Opt, enzymeInfo, metabInfo = parse_network(args.reactionFile, iniMetabs, finMetabs, exBalMetabs, exOptMetabs)
+
+	Vss = get_steady_state_net_fluxes(get_full_stoichiometric_matrix(S4Bal, metabInfo), enzymeInfo, metabInfo)
+
+	S4OptFull = prune_network(get_full_stoichiometric_matrix(S4Opt, metabInfo), Vss)[0]
+
+	metabs = S4OptFull.index
+	enzymes = S4OptFull.columns
+
+	innerEnzymes = [enz for enz in enzymes if not re.match(r'.+_(in|out)', enz)]
+
+	linkMat = get_conservation_relations(S4OptFull)[0]
+
+	Smetab2rnx = S4OptFull.T / S4OptFull.T.abs()
+	Smetab2rnx = Smetab2rnx.replace(np.nan, 0)
+
+	ensembleModels, acceptRate, modelIDs = generate_stable_ensemble_models(S4OptFull, enzymeInfo, Vss, nmodels, Smetab2rnx, seed = seed, L = linkMat)
+
+	enzymeLB, enzymeUB = map(float, args.enzymeBnds.split(','))
+
+	enzymeLBs = pd.Series(np.full(len(enzymes), enzymeLB), index = enzymes)
+	enzymeUBs = pd.Series(np.full(len(enzymes), enzymeUB), index = enzymes)
+
+	print('\n%s metabolites, %s reactions, %s models' % (len(metabs), len(enzymes), len(ensembleModels)))
+
+
+	## benchmark splits ------------------------------------------------------------------------------------
+	print('\n\nBenchmarking splits of %s cores' % ncores)
+	print('.' * 50)
+
+	# warm up, e.g. compilation of Numba kernels
+	simulate_perturbation(ensembleModels[:1], S4OptFull, Smetab2rnx, enzymes, metabs, nsteps, enzymeLBs, enzymeUBs, 1, 1, L = linkMat, pertEnzymes = innerEnzymes[:1])
+
+	nprocesses = sorted({2**k for k in range(int(np.log2(ncores)) + 1)} | {ncores})
+
+	rows = []
+	for nprocess in nprocesses:
+
+		threadsPerProcess = ncores // nprocess
+
+		metrics = {}
+
+		simulate_perturbation(ensembleModels, S4OptFull, Smetab2rnx, enzymes, metabs, nsteps, enzymeLBs, enzymeUBs, len(ensembleModels), nprocess,
+		                      metrics = metrics, modelIDs = modelIDs, L = linkMat, pertEnzymes = innerEnzymes, threadsPerProcess = threadsPerProcess)
+
+		rows.append([nprocess, threadsPerProcess, metrics['simulation']['wall (s)'], metrics['simulation']['throughput (models/s)']])
+
+		print('%s processes x %s threads: %.2f models/s' % tuple(rows[-1][:2] + rows[-1][3:]))
+
+	benchmark = pd.DataFrame(rows, columns = ['Processes', 'Threads per process', 'Wall (s)', 'Throughput (models/s)'])
+
+	best = benchmark.loc[benchmark['Throughput (models/s)'].idxmax()]
+
+	from output import save_parallel_benchmark
+
+	save_parallel_benchmark(benchmark, outDir)
+
+	print('\nbest split: -p %s -tp %s' % (int(best['Processes']), int(best['Threads per process'])))
+
+
+	## benchmark dense and sparse continuation -------------------------------------------------------------
+	print('\n\nBenchmarking dense and sparse continuation')
+	print('.' * 50)
+
+	import constants
+	from sympy import symbols
+	from output import save_sparse_benchmark
+
+	E = np.array(symbols(' '.join(enzymes)))
+	X = np.array(symbols(' '.join(metabs)))
+
+	sparseThreshold = constants.sparseThreshold
+
+	rows = []
+	for path, threshold in [('dense', np.inf), ('sparse', 0)]:
+
+		constants.sparseThreshold = threshold   # read by simulation_worker when called
+
+		t0 = time.perf_counter()
+
+		simulation_worker(0, ensembleModels[0], S4OptFull, Smetab2rnx, E, np.ones(len(enzymes)), X, np.ones(len(metabs)), enzymes, nsteps, enzymeLBs, enzymeUBs, L = linkMat, pertEnzymes = innerEnzymes[:1])
+
+		rows.append([path, time.perf_counter() - t0])
+
+		print('%s continuation: %.2f s per model and enzyme' % tuple(rows[-1]))
+
+	constants.sparseThreshold = sparseThreshold
+
+	sparseBenchmark = pd.DataFrame(rows, columns = ['Continuation', 'Wall (s)'])
+
+	save_sparse_benchmark(sparseBenchmark, outDir)
+
+	faster = sparseBenchmark.loc[sparseBenchmark['Wall (s)'].idxmin(), 'Continuation']
+	used = 'sparse' if len(metabs) >= sparseThreshold else 'dense'
+
+	print('\n%s metabolites, %s continuation used by main2.py (sparseThreshold %s), %s is faster' % (len(metabs), used, sparseThreshold, faster))
+
+	print('\nDone.')
+
+
+
+
@@ -22,6 +22,15 @@ deftKeqRelBnds = [1, 10]   # relative range of equilibrium constant
 
 nsteps = 100   # # of integration step
 eigThreshold = 1  # threshold of eigenvalues (-1e-6 recommended, if too much system failure in ensemble models, increase gradually to 1 or larger for real values)
-
-
-
+condThreshold = float('inf')   # condition number of Jacobian matrix (over its rank at reference state, i.e. excluding conserved moieties) above which integration stops as singular Jacobian, inf for no cutoff (the pseudo inverse step is kept), see main2.py --condThreshold
+costFeasTol = 1e-6   # max violation of ΔG <= 0 (kJ/mol) or concentration bounds (log mM) accepted in an enzyme cost optimum
+zeroFluxTol = 1e-9   # relative flux (to the max) below which a reaction is taken as blocked in steady state and pruned
+sparseThreshold = 100   # # of metabolites from which the continuation uses sparse linear algebra, the sparse path is faster from ~60 metabolites on a linear chain (2x at 120, 4x at 300), see benchmark.py
+denseEigThreshold = 500   # # of metabolites from which the sparse continuation screens stability by ARPACK in shift-invert mode instead of dense eigenvalues, equal cost at ~300 on a linear chain
+seqBatchSize = 200   # # of models simulated in each batch until the tolerance of confidence intervals is met (main2.py --tolerance)
+npairDirections = 32   # # of directions in the plane of two enzymes perturbed simultaneously (main2.py -w 5)
+maxSampleBatches = 20   # max # of sampling batches to collect stable ensemble models
+
+plotDpis = {'fast': 100, 'full': 300}   # resolution of raster figures in fast and full plot mode
+nplotProcess = 2   # # of processes rendering figures
+progressInterval = 10   # min # of seconds between progress lines
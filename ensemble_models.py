@@ -7,9 +7,56 @@ __date__ = '10/19/2018'
 __version__ = '1.0'
 
 
+workerData = {}   # network data loaded once in each worker process, see init_worker
 
 
-def generate_ensemble_models(S, enzymeInfo, Vss, nmodels, Ess = [], Css = []):
+
+
+def get_parameter_design(S, enzymeInfo, nmodels, sampler, seed):
+	'''
+	Parameters
+	S: stoichiometric matrix, metabolite in rows, reaction in columns (including input and output reactions)
+	enzymeInfo: df, reaction in rows
+	nmodels: int, number of points (models) of the design
+	sampler: str, 'sobol' for scrambled Sobol sequence or 'lhs' for Latin hypercube
+	seed: int, random seed of scrambling or permutation
+	
+	Returns
+	design: array, uniform numbers in [0, 1), model in rows, Kms and Keqs in the order drawn by generate_ensemble_models in columns
+	NOTE log-uniform bounds of Kms and Keqs are applied in generate_ensemble_models, so the design maps onto the same bounds with 
+	random sampling
+	'''
+	
+	import numpy as np
+	from scipy.stats import qmc
+	
+	# # of parameters drawn for each model, see generate_ensemble_models
+	ndims = 0
+	for enzyme in S.columns:
+		
+		nsubs = (S.loc[:, enzyme] < 0).sum()
+		npros = (S.loc[:, enzyme] > 0).sum()
+		reverse = 0 if enzyme not in enzymeInfo.index else enzymeInfo.loc[enzyme, 'rev']
+		
+		ndims += nsubs if nsubs > 0 and npros > 0 else 1
+		
+		if reverse: ndims += npros + 1
+	
+	rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key = (0,)))   # independent of streams of models seeded by (seed, k)
+	
+	if sampler == 'sobol':
+		design = qmc.Sobol(ndims, scramble = True, seed = rng).random_base2(int(np.ceil(np.log2(max(nmodels, 2)))))[:nmodels]
+	
+	elif sampler == 'lhs':
+		design = qmc.LatinHypercube(ndims, seed = rng).random(nmodels)
+	
+	else:
+		raise ValueError('unknown sampler %s, should be sobol or lhs' % sampler)
+	
+	return design
+	
+	
+def generate_ensemble_models(S, enzymeInfo, Vss, nmodels, Ess = [], Css = [], rngs = None, designs = None):
 	'''
 	Parameters
 	S: stoichiometric matrix, metabolite in rows, reaction in columns (including input and output reactions)
@@ -18,6 +65,8 @@ def generate_ensemble_models(S, enzymeInfo, Vss, nmodels, Ess = [], Css = []):
 	nmodels: int, number of ensemble models
 	Css: ser, metabolite concentration in steady state
 	Ess: ser, enzyme concentration in steady state
+	rngs: lst of numpy Generator, random number generator of each model, if None, the global numpy random state is used
+	designs: lst of array, uniform numbers of each model from get_parameter_design used in order instead of rngs, None for models drawn by rngs
 	
 	Returns
 	ensembleModels: lst
@@ -27,12 +76,17 @@ def generate_ensemble_models(S, enzymeInfo, Vss, nmodels, Ess = [], Css = []):
 		
 	import numpy as np
 	import re
-	from numpy.random import rand
 	from constants import deftKm, deftKmRelBnds, deftKeqRelBnds
 	from common_rate_laws import v_expression
 		
 	ensembleModels = []   
 	for i in range(nmodels):
+		
+		rand = np.random.random if rngs is None else rngs[i].random
+		
+		if designs is not None and designs[i] is not None:
+			uniforms = iter(designs[i])
+			rand = lambda n = None: next(uniforms) if n is None else np.array([next(uniforms) for j in range(n)])
 	
 		reverses, kcats, subConcss, subCoess, subKmss, proConcss, proCoess, proKmss, Keqs = [], [], [], [], [], [], [], [], []
 		for enzyme in S.columns:
@@ -138,7 +192,217 @@ def generate_ensemble_models(S, enzymeInfo, Vss, nmodels, Ess = [], Css = []):
 	return ensembleModels
 
 
-def simulation_worker(i, ensembleModel, S, Smetab2rnx, E, Eini, X, Xini, enzymes, nsteps, enzymeLBs, enzymeUBs):
+def screen_stable_models(ensembleModels, S, Smetab2rnx, Eini, Xini, L = None):
+	'''
+	Parameters
+	ensembleModels: lst
+	S: df, stoichiometric matrix, metabolite in rows, reaction in columns
+	Smetab2rnx: df, transforme X to metabolites needed in each reaction
+	Eini: array, enzyme concentrations in reference state, in order of enzymes
+	Xini: array, metabolite concentrations in reference state, in order of metabs
+	L: df, link matrix from parse_network.get_conservation_relations, eigenvalues of the reduced Jacobian are screened, None for the full one
+	
+	Returns
+	ifStable: array, whether all Jacobian eigenvalues real parts < eigThreshold in reference state, in order of models
+	maxEigs: array, max real part of Jacobian eigenvalues in reference state, in order of models
+	NOTE the full Jacobian has a zero eigenvalue for each conserved moiety in addition to those of the reduced one
+	'''
+	
+	import numpy as np
+	from constants import eigThreshold
+	from utilities import get_rate_law_arrays, get_rate_law_derivatives
+	
+	rateLawArrays = get_rate_law_arrays(Smetab2rnx, ensembleModels)
+	
+	dVdX = get_rate_law_derivatives(rateLawArrays, Eini, Xini)[1]
+	
+	if L is None:
+		Jss = np.matmul(S.values.astype(float), dVdX)
+		
+	else:
+		Jss = np.matmul(np.matmul(S.loc[L.columns].values.astype(float), dVdX), L.values)
+	
+	maxEigs = np.linalg.eigvals(Jss).real.max(axis = 1)
+	ifStable = maxEigs < eigThreshold
+	
+	return ifStable, maxEigs
+	
+	
+def generate_stable_ensemble_models(S, enzymeInfo, Vss, nmodels, Smetab2rnx, Ess = [], Css = [], seed = None, modelIDs = None, L = None, sampler = 'random'):
+	'''
+	Parameters
+	S: stoichiometric matrix, metabolite in rows, reaction in columns (including input and output reactions)
+	enzymeInfo: df, reaction in rows (same order with S)
+	Vss: ser, fluxes in steady state
+	nmodels: int, number of stable ensemble models required
+	Smetab2rnx: df, transforme X to metabolites needed in each reaction
+	Ess: ser, enzyme concentration in steady state
+	Css: ser, metabolite concentration in steady state
+	seed: int, random seed of the ensemble, if None, a fresh one is used
+	modelIDs: lst, IDs of models to generate, range(nmodels) by default, e.g. a shard of the ensemble
+	L: df, link matrix, stability is screened on the reduced Jacobian if provided
+	sampler: str, 'random' for independent draws, 'sobol' or 'lhs' for the first draw of model k from point k of a low-discrepancy design 
+	of nmodels points, see get_parameter_design
+	
+	Returns
+	ensembleModels: lst, models stable in reference state
+	acceptRate: float, fraction of sampled models accepted
+	modelIDs: lst, IDs of models generated, models failed to be stable within maxSampleBatches are dropped
+	NOTE model k is drawn from its own random stream seeded by (seed, k), the first stable draw of the stream is kept, 
+	so each model is the same whatever models are generated together, e.g. in different shards
+	NOTE models are sampled in batches until all are stable or maxSampleBatches is reached, the # of draws per model 
+	in each batch is sized by the acceptance rate so far
+	NOTE with sobol or lhs sampler, models unstable at their design point are redrawn from their own random streams
+	'''
+	
+	import numpy as np
+	from constants import maxSampleBatches
+	
+	if len(Css) > 0:
+		Eini = Ess.loc[S.columns].values
+		Xini = Css.loc[S.index].values
+		
+	else:
+		Eini = np.ones(S.shape[1])
+		Xini = np.ones(S.shape[0])
+	
+	if seed is None: seed = np.random.SeedSequence().entropy
+	
+	if modelIDs is None: modelIDs = list(range(nmodels))
+	
+	rngs = {k: np.random.default_rng(np.random.SeedSequence([seed, k])) for k in modelIDs}
+	
+	if sampler != 'random':
+		design = get_parameter_design(S, enzymeInfo, max(nmodels, max(modelIDs, default = -1) + 1), sampler, seed)
+	
+	stableModels = {}
+	pending = list(modelIDs)
+	ndraws = 1
+	nsampled = 0
+	nstable = 0
+	for batch in range(maxSampleBatches):
+		
+		drawIDs = [k for k in pending for j in range(ndraws)]
+		
+		designs = [design[k] for k in drawIDs] if sampler != 'random' and batch == 0 else None
+		
+		models = generate_ensemble_models(S, enzymeInfo, Vss, len(drawIDs), Ess, Css, [rngs[k] for k in drawIDs], designs)
+		ifStable = screen_stable_models(models, S, Smetab2rnx, Eini, Xini, L)[0]
+		
+		for k, model, stable in zip(drawIDs, models, ifStable):
+			if stable and k not in stableModels: stableModels[k] = model
+		
+		nsampled += len(drawIDs)
+		nstable += int(ifStable.sum())
+		
+		pending = [k for k in pending if k not in stableModels]
+		
+		if not pending: break
+		
+		# size the draws per model by the acceptance rate so far
+		acceptRate = max(nstable, 1) / nsampled
+		ndraws = min(int(np.ceil(1 / acceptRate * 1.1)), 10)
+	
+	else:
+		print('only %s stable models collected after %s batches' % (len(stableModels), maxSampleBatches))
+	
+	acceptRate = nstable / nsampled
+	
+	modelIDs = [k for k in modelIDs if k in stableModels]
+	ensembleModels = [stableModels[k] for k in modelIDs]
+	
+	return ensembleModels, acceptRate, modelIDs
+	
+	
+def get_worker_data(S, Smetab2rnx, enzymes, metabs, nsteps, Eini = [], Xini = [], L = None, Vss = None, ensembleModels = None, condThreshold = None):
+	'''
+	Parameters
+	S: df, stoichiometric matrix, metabolite in rows, reaction in columns
+	Smetab2rnx: df, transforme X to metabolites needed in each reaction
+	enzymes: lst, enzyme IDs
+	metabs: lst, metabolite IDs
+	nsteps: int, # of integration steps
+	Eini: ser, initial enzyme concentrations, if real values used
+	Xini: ser, initial metabolite concentrations, if real values used
+	L: df, link matrix from parse_network.get_conservation_relations
+	Vss: ser, fluxes in steady state, required by the flux fold change
+	ensembleModels: lst, required by the flux fold change, loaded as rate law arrays of all models (see utilities.get_rate_law_arrays)
+	condThreshold: float, condition number of Jacobian above which continuation stops, see utilities.solve_dXdE
+	
+	Returns
+	data: dict, network data shared by all tasks of a worker pool, see init_worker
+	'''
+	
+	import numpy as np
+	from sympy import symbols
+	from utilities import get_rate_law_arrays
+	
+	if len(Eini) > 0:
+		Xini = Xini.loc[metabs]
+		Eini = Eini.loc[enzymes]
+		
+		ifReal = 'yes'
+	
+	else:
+		Xini = np.ones(len(metabs))
+		Eini = np.ones(len(enzymes))
+		
+		ifReal = 'no'
+	
+	data = {'S': S, 'Smetab2rnx': Smetab2rnx, 'enzymes': enzymes, 'metabs': metabs, 'nsteps': nsteps, 'L': L, 'Vss': Vss, 'ensembleModels': ensembleModels,
+	        'E': np.array(symbols(' '.join(enzymes))), 'X': np.array(symbols(' '.join(metabs))), 'Eini': Eini, 'Xini': Xini, 'ifReal': ifReal, 'condThreshold': condThreshold, 
+	        'rateLawArrays': None if ensembleModels is None else get_rate_law_arrays(Smetab2rnx, ensembleModels)}
+	
+	return data
+	
+	
+def init_worker(data, threadsPerProcess = 1):
+	'''
+	Parameters
+	data: dict, network data, see get_worker_data
+	threadsPerProcess: int, # of BLAS threads of each worker process
+	NOTE initializer of worker pools: network data are loaded into workerData, modules are imported and numeric kernels compiled once in 
+	each worker instead of in each task
+	'''
+	
+	import utilities
+	import common_rate_laws
+	from metrics import limit_blas_threads
+	from kernels import compile_kernels
+	
+	limit_blas_threads(threadsPerProcess)
+	
+	workerData.update(data)
+	
+	compile_kernels()
+	
+	
+def create_worker_pool(nprocess, data, threadsPerProcess = 1, ifThreads = False):
+	'''
+	Parameters
+	nprocess: int, number of processes
+	data: dict, network data, see get_worker_data
+	threadsPerProcess: int, # of BLAS threads of each worker process, or of this process shared by all threads if ifThreads
+	ifThreads: bool, whether to use threads instead of processes
+	
+	Returns
+	pool: Pool or ThreadPool, workers with network data loaded by init_worker, to be reused by simulate_perturbation, 
+	simulate_pair_perturbation and robustness.calculate_flux_fold_change, closed by the caller
+	'''
+	
+	from multiprocessing import Pool
+	from multiprocessing.pool import ThreadPool
+	
+	if ifThreads:
+		pool = ThreadPool(processes = nprocess, initializer = init_worker, initargs = (data, threadsPerProcess))
+	
+	else:
+		pool = Pool(processes = nprocess, initializer = init_worker, initargs = (data, threadsPerProcess))
+	
+	return pool
+	
+	
+def simulation_worker(i, ensembleModel, S, Smetab2rnx, E, Eini, X, Xini, enzymes, nsteps, enzymeLBs, enzymeUBs, backend = 'numeric', L = None, pertEnzymes = None, condThreshold = None):
 	'''
 	Parameters
 	i: int, model #
@@ -153,48 +417,106 @@ def simulation_worker(i, ensembleModel, S, Smetab2rnx, E, Eini, X, Xini, enzymes
 	nsteps: int, # of integration steps
 	enzymeLBs: ser, lower bounds of enzyme level
 	enzymeUBs: ser, upper bounds of enzyme level
+	backend: str, 'numeric' for utilities.solve_dXdE_numeric (compiled by Numba if installed), or utilities.solve_dXdE_sparse if there are
+	sparseThreshold or more metabolites, 'sympy' for symbolic Jacobian lambdified for utilities.solve_dXdE
+	L: df, link matrix from parse_network.get_conservation_relations, the numeric backend runs on independent metabolites if provided
+	pertEnzymes: lst, enzymes to perturb, all enzymes by default
+	condThreshold: float, condition number of Jacobian above which continuation stops, condThreshold in constants.py by default, see utilities.solve_dXdE
 	
 	Returns
-	resultPerModel: dict
+	resultPerModel: dict, enzyme => [Eout2, Eout1, Xout2, Xout1, diagnostics2, diagnostics1], 2 for decreased and 1 for increased enzyme level, None if model abandoned
+	timing: dict, model #, status, wall time (s) of the model and of each enzyme
 	'''
 	
+	import time
 	import numpy as np
 	import pandas as pd
 	from scipy.linalg import eigvals
 	from constants import eigThreshold
-	from utilities import get_Jacobian, get_dVdE, solve_dXdE, get_lambdify_function
+	from utilities import get_Jacobian, get_dVdE, solve_dXdE, get_lambdify_function, get_rate_law_arrays, solve_dXdE_numeric
+	from utilities import get_sparse_rate_law_arrays, get_rate_law_derivatives_sparse, get_rightmost_eigenvalue, get_null_spaces, solve_dXdE_sparse
 	from common_rate_laws import v_expression
+	from constants import sparseThreshold
+	from kernels import rate_law_kernel
 		
-	print('\nprocessing model %s ...' % (i + 1))
+	t0 = time.perf_counter()
+	
+	timing = {'model': i + 1, 'status': 'simulated', 'time (s)': None, 'enzymes (s)': {}}
 	
 	reverses, kcats, subConcss, subCoess, subKmss, proConcss, proCoess, proKmss, Keqs = ensembleModel
 	
 	# calculate the Jacobian matrix of reference state and keep those model with all Jacobian eigenvalues real parts < 0
-	J = get_Jacobian(S, Smetab2rnx, v_expression, Eini, X, reverses, kcats, subCoess, subKmss, proCoess, proKmss, Keqs)	
-	Jlam = get_lambdify_function(X, J)	
+	ifSparse = backend == 'numeric' and S.shape[0] >= sparseThreshold
+	
+	if backend == 'numeric':
+		Lr = L if L is not None else pd.DataFrame(np.eye(S.shape[0]), index = S.index, columns = S.index)
+		Sr = S.loc[Lr.columns]
+		
+		rateLawArrays = {key: np.ascontiguousarray(value[0]) for key, value in get_rate_law_arrays(Smetab2rnx, [ensembleModel]).items()}
+		
+	if ifSparse:
+		from scipy.sparse import csr_matrix
+		
+		sparseArrays = get_sparse_rate_law_arrays(Smetab2rnx, rateLawArrays)
+		
+		dVdXss = get_rate_law_derivatives_sparse(sparseArrays, np.asarray(Eini, dtype = float), np.asarray(Xini, dtype = float))[1]
+		
+		Jss = csr_matrix(Sr.values.astype(float)) @ dVdXss @ csr_matrix(Lr.values)
+		
+		maxEig = get_rightmost_eigenvalue(Jss)
+	
+	elif backend == 'numeric':
+		dVdXss = rate_law_kernel(*[rateLawArrays[key] for key in ['kcats', 'invKeqs', 'subCoes', 'subKms', 'proCoes', 'proKms']], np.asarray(Eini, dtype = float), np.asarray(Xini, dtype = float))[1]
+		
+		maxEig = eigvals(Sr.values.astype(float) @ dVdXss @ Lr.values).real.max()
+		
+	else:
+		J = get_Jacobian(S, Smetab2rnx, v_expression, Eini, X, reverses, kcats, subCoess, subKmss, proCoess, proKmss, Keqs)	
+		Jlam = get_lambdify_function(X, J)	
+		
+		Jss = np.matrix(Jlam(*Xini)).astype(float)
 	
-	Jss = np.matrix(Jlam(*Xini)).astype(np.float)
+		maxEig = eigvals(Jss).real.max()
 	
-	if np.any(eigvals(Jss).real >= eigThreshold):
-		print('Jacobian matrix singular, model abandoned')
-		return
+	if maxEig >= eigThreshold:
+		print('reference state unstable (max eigenvalue %.3g), model %s abandoned' % (maxEig, i + 1))
+		
+		timing['status'] = 'abandoned'
+		timing['time (s)'] = time.perf_counter() - t0
+		
+		return None, timing
 		
 	# solve ODE to get relation of X ~ E
-	J = get_Jacobian(S, Smetab2rnx, v_expression, E, X, reverses, kcats, subCoess, subKmss, proCoess, proKmss, Keqs)
-	dVdE = get_dVdE(Smetab2rnx, v_expression, E, X, reverses, kcats, subCoess, subKmss, proCoess, proKmss, Keqs)
+	if ifSparse:
+		nullSpaces = get_null_spaces(Jss)   # once per model, all continuations start at the reference state
+		
+		solve = lambda Espan: solve_dXdE_sparse(Espan, nsteps, Xini, sparseArrays, S, Lr, condThreshold, nullSpaces)
+		
+	elif backend == 'numeric':
+		solve = lambda Espan: solve_dXdE_numeric(Espan, nsteps, Xini, rateLawArrays, S, Lr, condThreshold)
+		
+	else:
+		J = get_Jacobian(S, Smetab2rnx, v_expression, E, X, reverses, kcats, subCoess, subKmss, proCoess, proKmss, Keqs)
+		dVdE = get_dVdE(Smetab2rnx, v_expression, E, X, reverses, kcats, subCoess, subKmss, proCoess, proKmss, Keqs)
+		
+		XE = np.concatenate((X, E))
+		Jlam = get_lambdify_function(XE, J)
+		dVdElam = get_lambdify_function(XE, dVdE)
+		
+		solve = lambda Espan: solve_dXdE(Espan, nsteps, Xini, Jlam, dVdElam, S, condThreshold)
 	
-	XE = np.concatenate((X, E))
-	Jlam = get_lambdify_function(XE, J)
-	dVdElam = get_lambdify_function(XE, dVdE)
+	if pertEnzymes is None: pertEnzymes = enzymes
 	
 	resultPerModel = {}
-	for enzyme in enzymes:
+	for enzyme in pertEnzymes:
+		
+		tEnzyme = time.perf_counter()
 		
 		# enzyme concentration increase
 		Espan1 = pd.DataFrame(np.array([Eini, Eini]).T, index = enzymes)
 		Espan1.loc[enzyme, 1] = enzymeUBs.loc[enzyme]
 		
-		Eout1, Xout1 = solve_dXdE(Espan1, nsteps, Xini, Jlam, dVdElam, S)
+		Eout1, Xout1, diagnostics1 = solve(Espan1)
 	
 		Eout1 = Eout1.dropna(axis = 1)
 		Xout1 = Xout1.dropna(axis = 1)
@@ -203,17 +525,38 @@ def simulation_worker(i, ensembleModel, S, Smetab2rnx, E, Eini, X, Xini, enzymes
 		Espan2 = pd.DataFrame(np.array([Eini, Eini]).T, index = enzymes)
 		Espan2.loc[enzyme, 1] = enzymeLBs.loc[enzyme]
 		
-		Eout2, Xout2 = solve_dXdE(Espan2, nsteps, Xini, Jlam, dVdElam, S)
+		Eout2, Xout2, diagnostics2 = solve(Espan2)
 
 		Eout2 = Eout2.dropna(axis = 1)
 		Xout2 = Xout2.dropna(axis = 1)
 	
-		resultPerModel[enzyme] = [Eout2, Eout1, Xout2, Xout1]
+		diagnostics1['model'] = diagnostics2['model'] = i + 1
+		
+		resultPerModel[enzyme] = [Eout2, Eout1, Xout2, Xout1, diagnostics2, diagnostics1]
+		
+		timing['enzymes (s)'][enzyme] = time.perf_counter() - tEnzyme
+	
+	timing['time (s)'] = time.perf_counter() - t0
 	
-	return resultPerModel
+	return resultPerModel, timing
 	
 	
-def simulate_perturbation(ensembleModels, S, Smetab2rnx, enzymes, metabs, nsteps, enzymeLBs, enzymeUBs, nmodels, nprocess, Eini = [], Xini = []):
+def pooled_simulation_worker(i, ensembleModel, enzymeLBs, enzymeUBs, backend = 'numeric', pertEnzymes = None):
+	'''
+	Parameters
+	i, ensembleModel, enzymeLBs, enzymeUBs, backend, pertEnzymes: see simulation_worker
+	
+	Returns
+	resultPerModel, timing: see simulation_worker
+	NOTE network data are taken from workerData of a pool created by create_worker_pool
+	'''
+	
+	d = workerData
+	
+	return simulation_worker(i, ensembleModel, d['S'], d['Smetab2rnx'], d['E'], d['Eini'], d['X'], d['Xini'], d['enzymes'], d['nsteps'], enzymeLBs, enzymeUBs, backend, d['L'], pertEnzymes, d['condThreshold'])
+	
+	
+def simulate_perturbation(ensembleModels, S, Smetab2rnx, enzymes, metabs, nsteps, enzymeLBs, enzymeUBs, nmodels, nprocess, Eini = [], Xini = [], metrics = None, modelIDs = None, backend = 'numeric', ifThreads = False, L = None, pertEnzymes = None, threadsPerProcess = 1, pool = None, condThreshold = None):
 	'''
 	Parameters
 	ensembleModels: lst
@@ -228,55 +571,344 @@ def simulate_perturbation(ensembleModels, S, Smetab2rnx, enzymes, metabs, nsteps
 	nprocess: int, number of processes
 	Eini: ser, initial enzyme concentrations, if real values used
 	Xini: ser, initial enzyme concentrations if real values used
+	metrics: dict, if provided, per-model and per-enzyme timings and throughput are recorded in metrics['simulation']
+	modelIDs: lst, IDs of models used to number them in timings and diagnostics, range(nmodels) by default
+	backend: str, continuation backend, 'numeric' or 'sympy', see simulation_worker
+	ifThreads: bool, whether to simulate models in threads instead of processes, only worthwhile with the numeric backend compiled by 
+	Numba which releases the GIL
+	L: df, link matrix from parse_network.get_conservation_relations, see simulation_worker
+	pertEnzymes: lst, enzymes to perturb, all enzymes by default, e.g. without input and output reactions
+	threadsPerProcess: int, # of BLAS threads of each worker process, or of this process shared by all threads if ifThreads
+	pool: worker pool from create_worker_pool loaded with the same network, e.g. shared by all stages of main2.py, if None, a pool is 
+	created and closed here
+	condThreshold: float, condition number of Jacobian above which continuation stops, see utilities.solve_dXdE, taken from the pool if given
 	
 	Returns
-	results: dict
+	results: dict, enzyme => list of [Eout2, Eout1, Xout2, Xout1, diagnostics2, diagnostics1] of each model
+	NOTE a progress line with throughput and ETA is printed every progressInterval seconds
 	'''
 	
+	import time
 	import numpy as np	
-	from sympy import symbols	
-	from multiprocessing import Pool
+	from constants import progressInterval
+	from metrics import print_progress
+	from kernels import ifNumba
 	
-	X = np.array(symbols(' '.join(metabs)))
-	E = np.array(symbols(' '.join(enzymes)))   
+	# multiprocessing
+	t0 = time.perf_counter()
+	progress = {'ndone': 0, 'lastPrint': t0}
+	
+	def report_progress(res):
 		
-	if len(Eini) > 0:   
-		Xini = Xini.loc[metabs]   
-		Eini = Eini.loc[enzymes]   
+		progress['ndone'] += 1
 		
-		ifReal = 'yes'
+		if time.perf_counter() - progress['lastPrint'] >= progressInterval or progress['ndone'] == nmodels:
+			print_progress(progress['ndone'], nmodels, t0)
+			
+			progress['lastPrint'] = time.perf_counter()
 	
-	else:
-		Xini = np.ones(len(metabs))	
-		Eini = np.ones(len(enzymes))
-		
-		ifReal = 'no'
+	if modelIDs is None: modelIDs = list(range(nmodels))
 	
-	# multiprocessing
-	pool = Pool(processes = nprocess)	
+	ifOwnPool = pool is None
+	
+	if ifOwnPool: pool = create_worker_pool(nprocess, get_worker_data(S, Smetab2rnx, enzymes, metabs, nsteps, Eini, Xini, L, condThreshold = condThreshold), threadsPerProcess, ifThreads)
 		
 	tmp = []   
 	for i in range(nmodels):
 
-		res = pool.apply_async(func = simulation_worker, args = (i, ensembleModels[i], S, Smetab2rnx, E, Eini, X, Xini, enzymes, nsteps, enzymeLBs, enzymeUBs))
+		res = pool.apply_async(func = pooled_simulation_worker, args = (modelIDs[i], ensembleModels[i], enzymeLBs, enzymeUBs, backend, pertEnzymes), callback = report_progress)
 		
 		tmp.append(res)
-		
-	pool.close()
-	pool.join()
+	
+	if ifOwnPool:
+		pool.close()
+		pool.join()
+	
+	else:
+		for res in tmp: res.wait()
+	
+	elapsed = time.perf_counter() - t0
 	
 	for i, res in enumerate(tmp): tmp[i] = res.get()
 	
 	# get results
-	results = {enzyme: [] for enzyme in enzymes}
+	if pertEnzymes is None: pertEnzymes = enzymes
+	
+	results = {enzyme: [] for enzyme in pertEnzymes}
 	for i in range(nmodels): 
-		if tmp[i]:
-			for enzyme in enzymes:
-				results[enzyme].append(tmp[i][enzyme])
+		if tmp[i][0]:
+			for enzyme in pertEnzymes:
+				results[enzyme].append(tmp[i][0][enzyme])
+	
+	if metrics is not None:
+		timings = [timing for resultPerModel, timing in tmp]
+		modelTimes = np.array([timing['time (s)'] for timing in timings])
+		
+		metrics['simulation'] = {'nmodels': nmodels, 'nabandoned': sum(timing['status'] == 'abandoned' for timing in timings), 'nprocess': nprocess,
+		                         'backend': backend if backend == 'sympy' else 'numba' if ifNumba else 'numpy', 'threads': ifThreads, 'threads per process': threadsPerProcess,
+		                         'wall (s)': elapsed, 'throughput (models/s)': nmodels / elapsed if elapsed > 0 else None,
+		                         'model time (s)': {'mean': modelTimes.mean(), 'median': np.median(modelTimes), 'max': modelTimes.max()} if nmodels else {},
+		                         'mean enzyme time (s)': {enzyme: np.mean([timing['enzymes (s)'][enzyme] for timing in timings if enzyme in timing['enzymes (s)']] or [np.nan]) for enzyme in pertEnzymes},
+		                         'models': timings}
 	
 	return results
-
-
-
-
-
+	
+	
+def simulate_perturbation_sequential(ensembleModels, S, Smetab2rnx, enzymes, metabs, nsteps, enzymeLBs, enzymeUBs, nprocess, enzymeLB, enzymeUB, tolerance, batchSize, criteria, Eini = [], Xini = [], metrics = None, modelIDs = None, backend = 'numeric', ifThreads = False, L = None, pertEnzymes = None, seed = None, threadsPerProcess = 1, pool = None, condThreshold = None):
+	'''
+	Parameters
+	ensembleModels: lst, models of the whole budget, simulated in order
+	S, Smetab2rnx, enzymes, metabs, nsteps, enzymeLBs, enzymeUBs, nprocess, Eini, Xini, modelIDs, backend, ifThreads, L, pertEnzymes, 
+	threadsPerProcess, pool, condThreshold: see simulate_perturbation
+	enzymeLB: float, lower bound of relative enzyme level
+	enzymeUB: float, upper bound of relative enzyme level
+	tolerance: float, simulation stops once the max half width of 95% bootstrap confidence intervals of all criteria is below it
+	batchSize: int, # of models simulated in each batch
+	criteria: lst, 'robustness index' and/or 'system failure', see robustness.get_bootstrap_halfwidths
+	metrics: dict, if provided, timings of all batches are recorded in metrics['simulation'] as simulate_perturbation does, and the half 
+	widths after each batch in metrics['sequential']
+	seed: int, random seed of bootstrap resampling
+	
+	Returns
+	results: dict, enzyme => list of [Eout2, Eout1, Xout2, Xout1, diagnostics2, diagnostics1] of each model, see simulate_perturbation
+	nsimulated: int, # of models of ensembleModels simulated, i.e. the first nsimulated ones
+	ifConverged: bool, whether tolerance is met within the budget
+	'''
+	
+	import numpy as np
+	from robustness import get_bootstrap_halfwidths
+	
+	ifOwnPool = pool is None
+	
+	# one pool for all batches
+	if ifOwnPool: pool = create_worker_pool(nprocess, get_worker_data(S, Smetab2rnx, enzymes, metabs, nsteps, Eini, Xini, L, condThreshold = condThreshold), threadsPerProcess, ifThreads)
+	
+	nmodels = len(ensembleModels)
+	
+	if modelIDs is None: modelIDs = list(range(nmodels))
+	
+	if pertEnzymes is None: pertEnzymes = enzymes
+	
+	results = {enzyme: [] for enzyme in pertEnzymes}
+	batchMetrics = []
+	history = []
+	nsimulated = 0
+	ifConverged = False
+	for start in range(0, nmodels, batchSize):
+		
+		stop = min(start + batchSize, nmodels)
+		
+		batchMetrics.append({})
+		
+		resultsBatch = simulate_perturbation(ensembleModels[start:stop], S, Smetab2rnx, enzymes, metabs, nsteps, enzymeLBs, enzymeUBs, stop - start, nprocess, Eini, Xini, 
+		                                     metrics = batchMetrics[-1], modelIDs = modelIDs[start:stop], backend = backend, ifThreads = ifThreads, L = L, pertEnzymes = pertEnzymes, 
+		                                     threadsPerProcess = threadsPerProcess, pool = pool)
+		
+		for enzyme in pertEnzymes: results[enzyme].extend(resultsBatch[enzyme])
+		
+		nsimulated = stop
+		
+		if len(results[pertEnzymes[0]]) < 2: continue
+		
+		halfWidths = get_bootstrap_halfwidths(results, pertEnzymes, nsteps, enzymeLB, enzymeUB, seed = seed)
+		
+		history.append(dict(nmodels = nsimulated, **halfWidths))
+		
+		print('%s models simulated, half width of 95%% CI: %s (tolerance %s)' % (nsimulated, ', '.join('%s %.4f' % (key, halfWidths[key]) for key in criteria), tolerance), flush = True)
+		
+		if max(halfWidths[key] for key in criteria) <= tolerance:
+			ifConverged = True
+			
+			break
+	
+	if ifOwnPool:
+		pool.close()
+		pool.join()
+	
+	if metrics is not None:
+		timings = [timing for batchMetric in batchMetrics for timing in batchMetric['simulation']['models']]
+		modelTimes = np.array([timing['time (s)'] for timing in timings])
+		elapsed = sum(batchMetric['simulation']['wall (s)'] for batchMetric in batchMetrics)
+		
+		metrics['simulation'] = dict(batchMetrics[0]['simulation'])
+		metrics['simulation'].update({'nmodels': nsimulated, 'nabandoned': sum(timing['status'] == 'abandoned' for timing in timings),
+		                              'wall (s)': elapsed, 'throughput (models/s)': nsimulated / elapsed if elapsed > 0 else None,
+		                              'model time (s)': {'mean': modelTimes.mean(), 'median': np.median(modelTimes), 'max': modelTimes.max()},
+		                              'mean enzyme time (s)': {enzyme: np.mean([timing['enzymes (s)'][enzyme] for timing in timings if enzyme in timing['enzymes (s)']] or [np.nan]) for enzyme in pertEnzymes},
+		                              'models': timings})
+		
+		metrics['sequential'] = {'tolerance': tolerance, 'batch size': batchSize, 'criteria': criteria, 'budget': nmodels, 'converged': ifConverged, 'history': history}
+	
+	return results, nsimulated, ifConverged
+	
+	
+def get_pair_directions(ndirections, enzymeLB, enzymeUB):
+	'''
+	Parameters
+	ndirections: int, # of directions in the plane of two enzymes
+	enzymeLB: float, lower bound of relative enzyme level
+	enzymeUB: float, upper bound of relative enzyme level
+	
+	Returns
+	directions: df, relative levels of the two enzymes at the end of each direction, angle (degree) in rows, 'A' and 'B' in columns
+	NOTE directions are evenly spaced in angle in the log10 plane of relative enzyme levels and end at the box of enzymeLB and enzymeUB
+	'''
+	
+	import numpy as np
+	import pandas as pd
+	
+	angles = np.arange(ndirections) * 360 / ndirections
+	
+	coss = np.cos(np.deg2rad(angles))
+	sins = np.sin(np.deg2rad(angles))
+	
+	# distance from the origin to the box along each direction
+	with np.errstate(divide = 'ignore'):
+		rhosA = np.where(coss > 0, np.log10(enzymeUB) / coss, np.log10(enzymeLB) / coss)
+		rhosB = np.where(sins > 0, np.log10(enzymeUB) / sins, np.log10(enzymeLB) / sins)
+	
+	rhos = np.fmin(np.abs(rhosA), np.abs(rhosB))
+	
+	directions = pd.DataFrame({'A': np.power(10, rhos * coss), 'B': np.power(10, rhos * sins)}, index = angles)
+	
+	return directions
+	
+	
+def pair_simulation_worker(i, ensembleModel, S, Smetab2rnx, Eini, Xini, enzymes, pairs, directions, nsteps, L = None, condThreshold = None):
+	'''
+	Parameters
+	i: int, model #
+	ensembleModel: lst
+	S: df, stoichiometric matrix, metabolite in rows, reaction in columns
+	Smetab2rnx: df, transforme X to metabolites needed in each reaction
+	Eini: array, initial enzyme concentrations, in order of enzymes
+	Xini: array, initial metabolites concentrations, in order of metabs
+	enzymes: lst, enzyme IDs
+	pairs: lst of 2-tuple, enzyme pairs
+	directions: df, relative levels of the two enzymes at the end of each direction, see get_pair_directions
+	nsteps: int, # of integration steps
+	L: df, link matrix from parse_network.get_conservation_relations
+	condThreshold: float, condition number of Jacobian above which continuation stops, see utilities.solve_dXdE
+	
+	Returns
+	stepsPerModel: array, steps completed, pair in rows, direction in columns
+	NOTE all directions of a pair run in kernels.continuation_batch_kernel
+	'''
+	
+	import numpy as np
+	import pandas as pd
+	import constants
+	from constants import eigThreshold
+	from utilities import get_rate_law_arrays
+	from kernels import continuation_batch_kernel
+	
+	if condThreshold is None: condThreshold = constants.condThreshold
+	
+	Lr = L if L is not None else pd.DataFrame(np.eye(S.shape[0]), index = S.index, columns = S.index)
+	
+	Sr = np.ascontiguousarray(S.loc[Lr.columns].values, dtype = float)
+	Lr = np.ascontiguousarray(Lr.values, dtype = float)
+	
+	rateLawArrays = {key: np.ascontiguousarray(value[0]) for key, value in get_rate_law_arrays(Smetab2rnx, [ensembleModel]).items()}
+	
+	Eini = np.asarray(Eini, dtype = float)
+	Xini = np.asarray(Xini, dtype = float)
+	
+	stepsPerModel = np.zeros((len(pairs), directions.shape[0]), dtype = int)
+	for p, (enzymeA, enzymeB) in enumerate(pairs):
+		
+		Eends = np.tile(Eini, (directions.shape[0], 1))
+		Eends[:, list(enzymes).index(enzymeA)] *= directions['A'].values
+		Eends[:, list(enzymes).index(enzymeB)] *= directions['B'].values
+		
+		stepsPerModel[p] = continuation_batch_kernel(Sr, Lr, rateLawArrays['kcats'], rateLawArrays['invKeqs'], rateLawArrays['subCoes'], rateLawArrays['subKms'], 
+		                                             rateLawArrays['proCoes'], rateLawArrays['proKms'], Eini, Eends, Xini, nsteps, float(eigThreshold), float(condThreshold))[0]
+	
+	return stepsPerModel
+	
+	
+def pooled_pair_simulation_worker(i, ensembleModel, pairs, directions):
+	'''
+	Parameters
+	i, ensembleModel, pairs, directions: see pair_simulation_worker
+	
+	Returns
+	stepsPerModel: see pair_simulation_worker
+	NOTE network data are taken from workerData of a pool created by create_worker_pool
+	'''
+	
+	d = workerData
+	
+	return pair_simulation_worker(i, ensembleModel, d['S'], d['Smetab2rnx'], d['Eini'], d['Xini'], d['enzymes'], pairs, directions, d['nsteps'], d['L'], d['condThreshold'])
+	
+	
+def simulate_pair_perturbation(ensembleModels, S, Smetab2rnx, enzymes, pairs, directions, nsteps, nprocess, Eini = [], Xini = [], L = None, threadsPerProcess = 1, metrics = None, pool = None, condThreshold = None):
+	'''
+	Parameters
+	ensembleModels: lst
+	S: df, stoichiometric matrix, metabolite in rows, reaction in columns
+	Smetab2rnx: df, transforme X to metabolites needed in each reaction
+	enzymes: lst, enzyme IDs
+	pairs: lst of 2-tuple, enzyme pairs
+	directions: df, relative levels of the two enzymes at the end of each direction, see get_pair_directions
+	nsteps: int, # of integration steps
+	nprocess: int, number of processes
+	Eini: ser, initial enzyme concentrations, if real values used
+	Xini: ser, initial metabolite concentrations, if real values used
+	L: df, link matrix from parse_network.get_conservation_relations
+	threadsPerProcess: int, # of BLAS threads of each worker process
+	metrics: dict, if provided, wall time and throughput are recorded in metrics['pair simulation']
+	pool: worker pool from create_worker_pool, see simulate_perturbation
+	condThreshold: float, see simulate_perturbation
+	
+	Returns
+	pairSteps: array, steps completed, model, pair and direction in the 3 axes
+	NOTE the numeric kernel is used whatever the backend of simulate_perturbation, each worker runs all pairs of a model
+	'''
+	
+	import time
+	import numpy as np
+	from constants import progressInterval
+	from metrics import print_progress
+	
+	nmodels = len(ensembleModels)
+	
+	t0 = time.perf_counter()
+	progress = {'ndone': 0, 'lastPrint': t0}
+	
+	def report_progress(res):
+		
+		progress['ndone'] += 1
+		
+		if time.perf_counter() - progress['lastPrint'] >= progressInterval or progress['ndone'] == nmodels:
+			print_progress(progress['ndone'], nmodels, t0)
+			
+			progress['lastPrint'] = time.perf_counter()
+	
+	ifOwnPool = pool is None
+	
+	if ifOwnPool: pool = create_worker_pool(nprocess, get_worker_data(S, Smetab2rnx, enzymes, S.index, nsteps, Eini, Xini, L, condThreshold = condThreshold), threadsPerProcess)
+	
+	tmp = []
+	for i in range(nmodels):
+		
+		res = pool.apply_async(func = pooled_pair_simulation_worker, args = (i, ensembleModels[i], pairs, directions), callback = report_progress)
+		
+		tmp.append(res)
+	
+	if ifOwnPool:
+		pool.close()
+		pool.join()
+	
+	else:
+		for res in tmp: res.wait()
+	
+	elapsed = time.perf_counter() - t0
+	
+	pairSteps = np.array([res.get() for res in tmp]).reshape(nmodels, len(pairs), directions.shape[0])
+	
+	if metrics is not None:
+		metrics['pair simulation'] = {'nmodels': nmodels, 'npairs': len(pairs), 'ndirections': directions.shape[0], 'nprocess': nprocess, 'wall (s)': elapsed,
+		                              'continuations/s': nmodels * len(pairs) * directions.shape[0] / elapsed if elapsed > 0 else None}
+	
+	return pairSteps
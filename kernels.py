@@ -0,0 +1,296 @@
+#!/usr/bin/env pyhton
+# -*- coding: UTF-8 -*-
+
+
+__author__ = 'Chao Wu'
+__date__ = '10/18/2026'
+__version__ = '1.0'
+
+
+'''
+Numeric kernels of the continuation, compiled by Numba (nopython, nogil) if installed, otherwise run as plain NumPy code. 
+continuation_batch_kernel runs on stacked arrays of NumPy only
+'''
+
+
+import numpy as np
+
+try:
+	from numba import njit
+
+	ifNumba = True
+
+except ImportError:
+	def njit(*args, **kwargs):
+		return lambda func: func
+
+	ifNumba = False
+
+
+
+
+@njit(nogil = True, cache = True)
+def rate_law_kernel(kcats, invKeqs, subCoes, subKms, proCoes, proKms, E, X):
+	'''
+	Parameters
+	kcats: array, kcat, in order of enzymes
+	invKeqs: array, 1/Keq, 0 for irreversible reactions
+	subCoes: array, substrate coefficients, enzyme in rows, metabolite in columns (plus a last column of unit concentration)
+	subKms: array, substrate Kms, in the same shape with subCoes
+	proCoes: array, product coefficients, in the same shape with subCoes
+	proKms: array, product Kms, in the same shape with subCoes
+	E: array, enzyme concentrations, in order of enzymes
+	X: array, metabolite concentrations, in order of metabs
+
+	Returns
+	V: array, fluxes
+	dVdX: array, dVdX, enzyme in rows, metabolite in columns
+	dVdE: array, diagonal of dVdE
+	NOTE single model counterpart of utilities.get_rate_law_derivatives, rate law arrays of one model from utilities.get_rate_law_arrays
+	'''
+
+	nmetabs = X.size
+
+	Xa = np.ones(nmetabs + 1)
+	Xa[:nmetabs] = X
+	logXa = np.log(Xa)
+
+	K = np.exp(-np.sum(subCoes * np.log(subKms), axis = 1))
+	Ps = np.exp(np.sum(subCoes * logXa, axis = 1))
+	Pp = np.exp(np.sum(proCoes * logXa, axis = 1))
+	Qs = np.exp(np.sum(subCoes * np.log(1 + Xa / subKms), axis = 1))
+	Qp = np.exp(np.sum(proCoes * np.log(1 + Xa / proKms), axis = 1))
+
+	N = Ps - Pp * invKeqs
+	D = Qs + Qp - 1
+
+	dNdX = (subCoes * Ps.reshape((-1, 1)) - proCoes * (Pp * invKeqs).reshape((-1, 1))) / Xa
+	dDdX = subCoes * Qs.reshape((-1, 1)) / (subKms + Xa) + proCoes * Qp.reshape((-1, 1)) / (proKms + Xa)
+
+	kin = K * N / D
+	dkindX = (K / D**2).reshape((-1, 1)) * (dNdX * D.reshape((-1, 1)) - N.reshape((-1, 1)) * dDdX)
+
+	V = kcats * E * kin
+	dVdX = (kcats * E).reshape((-1, 1)) * dkindX[:, :nmetabs]
+	dVdE = kcats * kin
+
+	return V, dVdX, dVdE
+
+
+@njit(nogil = True, cache = True)
+def pinv_kernel(J, rank):
+	'''
+	Parameters
+	J: array, Jacobian matrix
+	rank: int, rank of J at the start of continuation, 0 to take the rank of this J
+
+	Returns
+	Jinv: array, pseudo inverse of J
+	cond: float, condition number of J over rank
+	rank: int, rank of J at the start of continuation
+	NOTE singular values of conserved moieties are excluded from the condition number by the rank at the start
+	'''
+
+	cutoff = np.finfo(np.float64).eps * 1e6   # cutoff of scipy pinv2
+
+	U, s, Vh = np.linalg.svd(J)
+
+	if rank == 0: rank = max(np.sum(s > s[0] * cutoff), 1)
+
+	cond = s[0] / s[rank - 1] if s[rank - 1] > 0 else np.inf
+
+	sInv = np.zeros(s.size)
+	for k in range(s.size):
+		if s[k] > s[0] * cutoff: sInv[k] = 1 / s[k]
+
+	Jinv = (Vh.T * sInv) @ U.T
+
+	return Jinv, cond, rank
+
+
+@njit(nogil = True, cache = True)
+def continuation_kernel(S, L, kcats, invKeqs, subCoes, subKms, proCoes, proKms, Eini, Eend, Xini, nsteps, eigThreshold, condThreshold):
+	'''
+	Parameters
+	S: array, reduced stoichiometric matrix, independent metabolite in rows, reaction in columns
+	L: array, link matrix, metabolite in rows, independent metabolite in columns, see parse_network.get_conservation_relations
+	kcats, invKeqs, subCoes, subKms, proCoes, proKms: arrays, rate law arrays of one model, see rate_law_kernel
+	Eini: array, enzyme concentrations at the start of continuation
+	Eend: array, enzyme concentrations at the end of continuation
+	Xini: array, metabolite concentrations at the start of continuation
+	nsteps: int, # of integration steps
+	eigThreshold: float, max real part of Jacobian eigenvalues above which the system is considered unstable
+	condThreshold: float, condition number of Jacobian over its rank at the start above which it is considered singular, inf for no cutoff
+
+	Returns
+	Es: array, enzyme concentrations, step in rows, nan after termination
+	Xs: array, metabolite concentrations, step in rows, nan after termination
+	steps: int, steps completed
+	termination: int, 0 reached bound, 1 instability, 2 singular Jacobian, 3 negative concentration
+	maxEig: float, max real part of Jacobian eigenvalues at exit
+	cond: float, condition number of Jacobian over its rank at the start of continuation, at exit
+	NOTE the same scheme with utilities.solve_dXdE on the reduced Jacobian S*dVdX*L of independent metabolites, dependent metabolites 
+	follow by dX = L*dXi
+	'''
+
+	Es = np.full((nsteps + 1, Eini.size), np.nan)
+	Xs = np.full((nsteps + 1, Xini.size), np.nan)
+
+	dE = (Eend - Eini) / nsteps
+
+	E = Eini.copy()
+	X = Xini.copy()
+
+	Es[0] = E
+	Xs[0] = X
+
+	steps = nsteps
+	termination = 0
+	maxEig = np.nan
+	cond = np.nan
+	rank = 0
+
+	for i in range(1, nsteps + 1):
+
+		V, dVdX, dVdE = rate_law_kernel(kcats, invKeqs, subCoes, subKms, proCoes, proKms, E, X)
+
+		# update reduced Jacobian matrix and screen
+		J = S @ dVdX @ L
+
+		maxEig = np.linalg.eigvals(J.astype(np.complex128)).real.max()
+
+		if maxEig >= eigThreshold:
+			steps, termination = i - 1, 1
+			break
+
+		Jinv, cond, rank = pinv_kernel(J, rank)
+
+		if cond > condThreshold:
+			steps, termination = i - 1, 2
+			break
+
+		# update X, E and screen
+		X = X - L @ (Jinv @ (S @ (dVdE * dE)))
+		E = E + dE
+
+		if X.min() <= 0:
+			steps, termination = i - 1, 3
+			break
+
+		Es[i] = E
+		Xs[i] = X
+
+	return Es, Xs, steps, termination, maxEig, cond
+
+
+def continuation_batch_kernel(S, L, kcats, invKeqs, subCoes, subKms, proCoes, proKms, Eini, Eends, Xini, nsteps, eigThreshold, condThreshold):
+	'''
+	Parameters
+	S, L, kcats, invKeqs, subCoes, subKms, proCoes, proKms, Eini, Xini, nsteps, eigThreshold, condThreshold: see continuation_kernel
+	Eends: array, enzyme concentrations at the end of continuation, direction in rows
+
+	Returns
+	steps: array, steps completed in each direction
+	terminations: array, termination in each direction, see continuation_kernel
+	NOTE the same scheme with continuation_kernel in each direction. Directions still running are stacked and each step is taken for 
+	all of them at once by utilities.get_rate_law_derivatives and the stacked routines of numpy.linalg (not supported by Numba, so 
+	this kernel is not compiled). Only singular values are computed, the pseudo inverse is taken by solving J if none of them falls 
+	below the cutoff of pinv_kernel, and by SVD otherwise. Only steps and terminations are returned, e.g. for failure maps of many directions
+	'''
+
+	from utilities import get_rate_law_derivatives
+
+	cutoff = np.finfo(np.float64).eps * 1e6   # cutoff of scipy pinv2
+
+	rateLawArrays = {'kcats': kcats, 'invKeqs': invKeqs, 'subCoes': subCoes, 'subKms': subKms, 'proCoes': proCoes, 'proKms': proKms}
+
+	ndirs = Eends.shape[0]
+
+	steps = np.full(ndirs, nsteps)
+	terminations = np.zeros(ndirs, dtype = np.int64)
+
+	dEs = (Eends - Eini) / nsteps
+
+	alive = np.arange(ndirs)
+	E = np.tile(Eini, (ndirs, 1))
+	X = np.tile(Xini, (ndirs, 1))
+
+	rank = 0
+
+	for i in range(1, nsteps + 1):
+
+		dE = dEs[alive]
+
+		V, dVdX, dVdE = get_rate_law_derivatives(rateLawArrays, E, X)
+
+		# update reduced Jacobian matrices and screen, direction in axis 0
+		J = S @ dVdX @ L
+
+		maxEigs = np.linalg.eigvals(J).real.max(axis = 1)
+
+		if rank == 0: 
+			s0 = np.linalg.svd(J[0], compute_uv = False)   # all directions start from the same state
+			rank = max(int(np.sum(s0 > s0[0] * cutoff)), 1)
+
+		b = S @ (np.diagonal(dVdE, axis1 = 1, axis2 = 2) * dE)[..., np.newaxis]
+
+		# pseudo inverse by solving J if none of its singular values falls below the cutoff, by SVD otherwise (always if J is not of full rank)
+		ifSolve = np.zeros(J.shape[0], dtype = bool)
+
+		if rank == J.shape[-1]:
+			s = np.linalg.svd(J, compute_uv = False)
+
+			ifSolve = s[:, -1] > s[:, 0] * cutoff
+
+		dXi = np.zeros(b.shape)
+
+		if ifSolve.any(): dXi[ifSolve] = np.linalg.solve(J[ifSolve], b[ifSolve])
+
+		if not ifSolve.all():
+			U, sPinv, Vh = np.linalg.svd(J[~ifSolve])
+
+			if rank < J.shape[-1]: s = sPinv
+
+			sInv = np.where(sPinv > sPinv[:, :1] * cutoff, 1 / np.where(sPinv > 0, sPinv, 1), 0)
+
+			dXi[~ifSolve] = np.transpose(Vh, (0, 2, 1)) @ (sInv[..., np.newaxis] * (np.transpose(U, (0, 2, 1)) @ b[~ifSolve]))
+
+		with np.errstate(divide = 'ignore', invalid = 'ignore'):
+			conds = np.where(s[:, rank - 1] > 0, s[:, 0] / s[:, rank - 1], np.inf)
+
+		codes = np.where(maxEigs >= eigThreshold, 1, np.where(conds > condThreshold, 2, 0))
+
+		# update X, E and screen
+		Xnew = X - (L @ dXi)[..., 0]
+
+		codes[(codes == 0) & (Xnew.min(axis = 1) <= 0)] = 3
+
+		ifStop = codes > 0
+		steps[alive[ifStop]] = i - 1
+		terminations[alive[ifStop]] = codes[ifStop]
+
+		alive = alive[~ifStop]
+		X = Xnew[~ifStop]
+		E = E[~ifStop] + dE[~ifStop]
+
+		if alive.size == 0: break
+
+	return steps, terminations
+
+
+def compile_kernels():
+	'''
+	NOTE kernels are compiled (or loaded from the cache of Numba) on a system of one metabolite, e.g. once in each worker process, so 
+	that the first model is not slowed by compilation. The same array types are used with utilities.solve_dXdE_numeric
+	'''
+
+	if not ifNumba: return
+
+	S = np.full((1, 1), -1.0)
+	L = np.ones((1, 1))
+	coes = np.array([[1.0, 0.0]])
+	Kms = np.ones((1, 2))
+	E = np.ones(1)
+	X = np.ones(1)
+
+	continuation_kernel(S, L, E, np.zeros(1), coes, Kms, np.zeros((1, 2)), Kms, E, E * 2, X, 1, 1.0, 1e8)
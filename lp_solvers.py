@@ -0,0 +1,258 @@
+#!/usr/bin/env pyhton
+# -*- coding: UTF-8 -*-
+
+
+__author__ = 'Chao Wu'
+__date__ = '10/18/2026'
+__version__ = '1.0'
+
+
+import numpy as np
+
+
+
+
+def solve_lp_highs(f, A, b, lb, ub):
+	'''
+	Parameters
+	f: array, objective coefficients, f*x is minimized
+	A: array or sparse matrix, inequality constraints A*x <= b
+	b: array, inequality constraints A*x <= b
+	lb: array, lower bounds of x, -np.inf if unbounded
+	ub: array, upper bounds of x, np.inf if unbounded
+
+	Returns
+	x: array, optimal x
+	fopt: float, optimal objective
+	solverInfo: dict, status (0 if succeeded), message and niter
+	'''
+
+	from scipy.optimize import linprog
+
+	bnds = [(None if np.isinf(l) else l, None if np.isinf(u) else u) for l, u in zip(lb, ub)]
+
+	res = linprog(f, A_ub = A, b_ub = b, bounds = bnds, method = 'highs')
+
+	x = res.x if res.x is not None else np.full(len(f), np.nan)
+	fopt = res.fun if res.fun is not None else np.nan
+
+	return x, fopt, {'status': res.status, 'message': res.message, 'niter': res.nit}
+
+
+def solve_lp_openopt(f, A, b, lb, ub):
+	'''
+	Parameters
+	f: array, objective coefficients, f*x is minimized
+	A: array or sparse matrix, inequality constraints A*x <= b
+	b: array, inequality constraints A*x <= b
+	lb: array, lower bounds of x, -np.inf if unbounded
+	ub: array, upper bounds of x, np.inf if unbounded
+
+	Returns
+	x: array, optimal x
+	fopt: float, optimal objective
+	solverInfo: dict, status (0 if succeeded), message and niter
+	'''
+
+	from scipy.sparse import issparse
+	from openopt import LP
+
+	if issparse(A): A = A.toarray()
+
+	p = LP(f = f, A = A, b = b, lb = lb, ub = ub, iprint = -1)
+	r = p.solve('cvxopt_lp', plot = 0)
+
+	status = 0 if r.isFeasible else 1
+
+	return r.xf, r.ff, {'status': status, 'message': r.msg, 'niter': getattr(r, 'evals', {}).get('iter', np.nan)}
+
+
+lpSolvers = {'highs': solve_lp_highs, 'cvxopt_lp': solve_lp_openopt}
+
+
+def solve_lp(f, A, b, lb, ub, solver = 'highs'):
+	'''
+	Parameters
+	f: array, objective coefficients, f*x is minimized
+	A: array or sparse matrix, inequality constraints A*x <= b
+	b: array, inequality constraints A*x <= b
+	lb: array, lower bounds of x, -np.inf if unbounded
+	ub: array, upper bounds of x, np.inf if unbounded
+	solver: str, LP backend in lpSolvers, 'highs' (scipy linprog) or 'cvxopt_lp' (openopt)
+
+	Returns
+	x: array, optimal x
+	fopt: float, optimal objective
+	solverInfo: dict, solver, status (0 if succeeded), message, niter and time (s)
+	'''
+
+	import time
+
+	if solver not in lpSolvers:
+		raise ValueError('unknown LP solver %s, available: %s' % (solver, ', '.join(lpSolvers)))
+
+	t0 = time.perf_counter()
+
+	x, fopt, solverInfo = lpSolvers[solver](f, A, b, np.asarray(lb, dtype = float), np.asarray(ub, dtype = float))
+
+	solverInfo['solver'] = solver
+	solverInfo['time'] = time.perf_counter() - t0
+
+	return x, fopt, solverInfo
+
+
+def solve_lp_series_highspy(f, A, b, lb, ub, changes):
+	'''
+	Parameters
+	f: array, objective coefficients of the base LP, f*x is minimized
+	A: array or sparse matrix, inequality constraints A*x <= b, shared by all LPs
+	b: array, inequality constraints A*x <= b of the base LP
+	lb: array, lower bounds of x of the base LP
+	ub: array, upper bounds of x of the base LP
+	changes: lst of dict, 'f', 'b', 'lb' and/or 'ub' replacing those of the base LP, one dict for each LP
+
+	Returns
+	xs: array, optimal x, LP in rows
+	fopts: array, optimal objectives
+	solverInfos: lst of dict, status (0 if succeeded), message, niter and time (s)
+	NOTE the model is passed to HiGHS once, each LP is warm started from the basis of the previous one
+	'''
+
+	import time
+	import highspy
+	from scipy.sparse import csc_matrix
+
+	A = csc_matrix(A)
+	nrows, ncols = A.shape
+
+	lp = highspy.HighsLp()
+	lp.num_col_ = ncols
+	lp.num_row_ = nrows
+	lp.col_cost_ = np.asarray(f, dtype = float)
+	lp.col_lower_ = np.asarray(lb, dtype = float)
+	lp.col_upper_ = np.asarray(ub, dtype = float)
+	lp.row_lower_ = np.full(nrows, -highspy.kHighsInf)
+	lp.row_upper_ = np.asarray(b, dtype = float)
+	lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+	lp.a_matrix_.start_ = A.indptr
+	lp.a_matrix_.index_ = A.indices
+	lp.a_matrix_.value_ = A.data
+
+	h = highspy.Highs()
+	h.setOptionValue('output_flag', False)
+	h.passModel(lp)
+
+	colIdx = np.arange(ncols, dtype = np.int32)
+	rowIdx = np.arange(nrows, dtype = np.int32)
+	rowLBs = np.full(nrows, -highspy.kHighsInf)
+
+	xs = np.full((len(changes), ncols), np.nan)
+	fopts = np.full(len(changes), np.nan)
+	solverInfos = []
+	for i, change in enumerate(changes):
+
+		t0 = time.perf_counter()
+
+		h.changeColsCost(ncols, colIdx, np.asarray(change.get('f', f), dtype = float))
+		h.changeColsBounds(ncols, colIdx, np.asarray(change.get('lb', lb), dtype = float), np.asarray(change.get('ub', ub), dtype = float))
+		h.changeRowsBounds(nrows, rowIdx, rowLBs, np.asarray(change.get('b', b), dtype = float))
+
+		h.run()
+
+		modelStatus = h.getModelStatus()
+		status = 0 if modelStatus == highspy.HighsModelStatus.kOptimal else 1
+
+		if status == 0:
+			xs[i] = h.getSolution().col_value
+			fopts[i] = h.getInfo().objective_function_value
+
+		solverInfos.append({'status': status, 'message': h.modelStatusToString(modelStatus), 'niter': h.getInfo().simplex_iteration_count, 'time': time.perf_counter() - t0})
+
+	return xs, fopts, solverInfos
+
+
+def solve_lp_series(f, A, b, lb, ub, changes, solver = 'highs'):
+	'''
+	Parameters
+	f: array, objective coefficients of the base LP, f*x is minimized
+	A: array or sparse matrix, inequality constraints A*x <= b, shared by all LPs
+	b: array, inequality constraints A*x <= b of the base LP
+	lb: array, lower bounds of x of the base LP
+	ub: array, upper bounds of x of the base LP
+	changes: lst of dict, 'f', 'b', 'lb' and/or 'ub' replacing those of the base LP, one dict for each LP
+	solver: str, LP backend in lpSolvers
+
+	Returns
+	xs: array, optimal x, LP in rows
+	fopts: array, optimal objectives
+	solverInfos: lst of dict, solver, status (0 if succeeded), message, niter and time (s)
+	NOTE LPs are warm started if solver is 'highs' and highspy is installed, otherwise solved one by one from scratch
+	'''
+
+	from importlib.util import find_spec
+
+	if solver == 'highs' and find_spec('highspy'):
+		xs, fopts, solverInfos = solve_lp_series_highspy(f, A, b, lb, ub, changes)
+
+		for solverInfo in solverInfos: solverInfo['solver'] = 'highspy'
+
+	else:
+		xs = np.full((len(changes), len(f)), np.nan)
+		fopts = np.full(len(changes), np.nan)
+		solverInfos = []
+		for i, change in enumerate(changes):
+
+			xs[i], fopts[i], solverInfo = solve_lp(change.get('f', f), A, change.get('b', b), change.get('lb', lb), change.get('ub', ub), solver)
+
+			solverInfos.append(solverInfo)
+
+	return xs, fopts, solverInfos
+
+
+def solve_lp_series_parallel(f, A, b, lb, ub, changes, nprocess = 1, solver = 'highs'):
+	'''
+	Parameters
+	f: array, objective coefficients of the base LP, f*x is minimized
+	A: array or sparse matrix, inequality constraints A*x <= b, shared by all LPs
+	b: array, inequality constraints A*x <= b of the base LP
+	lb: array, lower bounds of x of the base LP
+	ub: array, upper bounds of x of the base LP
+	changes: lst of dict, 'f', 'b', 'lb' and/or 'ub' replacing those of the base LP, one dict for each LP
+	nprocess: int, number of processes
+	solver: str, LP backend in lpSolvers
+
+	Returns
+	xs: array, optimal x, LP in rows
+	fopts: array, optimal objectives
+	solverInfos: lst of dict, solver, status (0 if succeeded), message, niter and time (s)
+	NOTE LPs are split into contiguous chunks, one chunk per process, so that warm starts are kept within each chunk
+	'''
+
+	from multiprocessing import Pool
+
+	nprocess = max(min(nprocess, len(changes)), 1)
+
+	if nprocess == 1:
+		return solve_lp_series(f, A, b, lb, ub, changes, solver)
+
+	chunks = np.array_split(np.arange(len(changes)), nprocess)
+
+	pool = Pool(processes = nprocess)
+
+	tmp = []
+	for chunk in chunks:
+
+		res = pool.apply_async(func = solve_lp_series, args = (f, A, b, lb, ub, [changes[i] for i in chunk], solver))
+
+		tmp.append(res)
+
+	pool.close()
+	pool.join()
+
+	tmp = [res.get() for res in tmp]
+
+	xs = np.concatenate([res[0] for res in tmp])
+	fopts = np.concatenate([res[1] for res in tmp])
+	solverInfos = [solverInfo for res in tmp for solverInfo in res[2]]
+
+	return xs, fopts, solverInfos
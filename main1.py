@@ -16,6 +16,8 @@ import argparse
 import os
 import re
 from parse_network import parse_network, get_full_stoichiometric_matrix, get_steady_state_net_fluxes
+from metrics import get_resource_usage, record_stage
+from output import save_metrics
 
 
 
@@ -24,14 +26,26 @@ if __name__ == '__main__':
 
 	parser = argparse.ArgumentParser(description = 'This script does thermodynamic analysis: 1 maximizing the minimal driving force; 2 minimizing the totol enzyme protein cost of a given pathway')
 	parser.add_argument('-o', '--outDir', type = str, required = True, help = 'output directory')
-	parser.add_argument('-r', '--reactionFile', type = str, required = True, help = 'reaction list file, required fields: Enzyme ID, Reversibility, ΔrGm, Substrates, Products, and Enzyme MW')
+	parser.add_argument('-r', '--reactionFile', type = str, required = True, help = 'reaction list file, required fields: Enzyme ID, Reversibility, ΔrGm, Substrates, Products, and Enzyme MW. A directory of reaction files (*.tsv) or a manifest (*.txt) listing one reaction file per line runs all pathways in --nprocess processes and ranks them')
 	parser.add_argument('-i', '--iniMetabs', type = str, required = False, help = 'metabolites as initial substrates, sep by ",". By default, they will be detected automatically, sometimes they should be set explicitly, e.g. for cylic pathways')
 	parser.add_argument('-f', '--finMetabs', type = str, required = False, help = 'metabolites as end products, sep by ",". By default, they will be detected automatically, sometimes they should be set explicitly, e.g. for cylic pathways')
 	parser.add_argument('-eb', '--exBalMetabs', type = str, required = False, help = 'metabolites excluded from mass balance, sep by ","')
 	parser.add_argument('-eo', '--exOptMetabs', type = str, required = False, help = 'metabolites excluded from optimization, sep by ","')
 	parser.add_argument('-b', '--concBnds', type = str, required = True, help='concentration lower and upper bound (mM) for all metabolites, sep by ","')
 	parser.add_argument('-a', '--assignFlux', type = str, required = False, help='assign flux (no unit) to some enzyme in the format "enzyme ID:value", then flux distribution will be calculated. If not assigned, influx to pathway will be set to 1, flux distribution can also be calculated. NOTE the calculated flux distribution is equivalent to occurance not the real flux')
-	parser.add_argument('-w', '--runWhich', type = str, required = True, help = "which analysis to run, '1' for maximizing the minimal driving force, '2' for minimizing the totol enzyme protein cost, '12' for both")
+	parser.add_argument('-ls', '--lpSolver', type = str, required = False, default = 'highs', choices = ['highs', 'cvxopt_lp'], help = "LP solver for maximizing the minimal driving force, 'highs' (default) or 'cvxopt_lp'")
+	parser.add_argument('-ns', '--nlpSolver', type = str, required = False, default = 'trust-constr', choices = ['trust-constr', 'SLSQP', 'ralg'], help = "solver for minimizing the total enzyme protein cost, 'trust-constr' (default) or 'SLSQP' with analytic gradients, or 'ralg' (openopt with sympy)")
+	parser.add_argument('-ms', '--nstarts', type = int, required = False, default = 1, help = 'number of starts for minimizing the total enzyme protein cost, starts are run in --nprocess processes (one after another in each pathway in screening) and the best optimum is reported')
+	parser.add_argument('-sd', '--seed', type = int, required = False, help = 'random seed of the starts for minimizing the total enzyme protein cost')
+	parser.add_argument('-tf', '--tvaFraction', type = float, required = False, default = 1.0, help = 'fraction of the maximized minimal driving force kept in thermodynamic variability analysis, 1 (default) for the optimum')
+	parser.add_argument('-sf', '--sweepFile', type = str, required = False, help = 'scenario file for MDF sweep, fields: Scenario ID, concentration bounds "lb,ub", metabolite bounds "metabolite:lb,ub;..." and assigned flux "enzyme ID:value". Empty fields take values of --concBnds and --assignFlux')
+	parser.add_argument('-sg', '--sweepGrid', type = str, required = False, help = 'grid of concentration bounds for MDF sweep in the format "lb1,lb2,...:ub1,ub2,...", all combinations are solved')
+	parser.add_argument('-mc', '--nsamples', type = int, required = False, default = 200, help = "number of Monte Carlo samples of ΔrG'm for MDF under uncertainty, 200 by default, 0 to skip it in screening (-w 4)")
+	parser.add_argument('-cv', '--covFile', type = str, required = False, help = "covariance matrix file of ΔrG'm, (kJ/mol)^2, reaction IDs in the first row and column. If not set, Keqs are sampled log-uniformly within their bounds")
+	parser.add_argument('-p', '--nprocess', type = int, required = False, default = 1, help = 'number of processes to run simultaneously')
+	parser.add_argument('-pl', '--plots', type = str, required = False, default = 'full', choices = ['none', 'fast', 'full'], help = "how to plot results, 'none', 'fast' (low resolution) or 'full' (default). Figures are rendered in separate processes from the saved tables")
+	parser.add_argument('-pf', '--plotFormat', type = str, required = False, default = 'jpg', choices = ['jpg', 'png', 'svg', 'pdf'], help = "figure format, 'jpg' (default), 'png', or vector format 'svg' or 'pdf'")
+	parser.add_argument('-w', '--runWhich', type = str, required = True, help = "which analysis to run, '1' for maximizing the minimal driving force, '2' for minimizing the totol enzyme protein cost, '3' for thermodynamic variability analysis, '4' for MDF under ΔrG'm uncertainty, '12', '13', ... for combinations")
 	args = parser.parse_args()
 	
 	outDir = args.outDir
@@ -43,8 +57,102 @@ if __name__ == '__main__':
 	concBnds = args.concBnds
 	assignFlux = args.assignFlux
 	runWhich = args.runWhich
+	lpSolver = args.lpSolver
+	nlpSolver = args.nlpSolver
+	nstarts = args.nstarts
+	seed = args.seed
+	sweepFile = args.sweepFile
+	sweepGrid = args.sweepGrid
+	nprocess = args.nprocess
+	nsamples = args.nsamples
+	covFile = args.covFile
+	tvaFraction = args.tvaFraction
+	plots = args.plots
+	plotFormat = args.plotFormat
 	
 	os.makedirs(outDir, exist_ok = True)
+	
+	metrics = {'script': 'main1.py', 'arguments': vars(args), 'stages': {}}
+	
+	if plots != 'none':
+		from multiprocessing import Pool
+		from constants import nplotProcess
+		from output import submit_plots, wait_plots
+		
+		plotPool = Pool(processes = nplotProcess)
+		plotJobs = []
+	
+	
+	## screen a library of pathways -------------------------------------------------------------------------
+	if os.path.isdir(reactionFile) or os.path.splitext(reactionFile)[1] in ['.txt', '.lst', '.list']:
+	
+		import sys
+		from screening import get_reaction_files, screen_pathways
+		from output import save_screening_ranking
+		
+		print('\n\nScreening pathways')
+		print('.' * 50)
+		
+		stageStart = get_resource_usage()
+		
+		if sweepFile or sweepGrid or covFile:
+			raise ValueError('--sweepFile, --sweepGrid and --covFile are not supported in screening')
+		
+		reactionFiles = get_reaction_files(reactionFile)
+		
+		iniMetabs = iniMetabs.split(',') if iniMetabs else []
+		finMetabs = finMetabs.split(',') if finMetabs else []
+		exBalMetabs = exBalMetabs.split(',') if exBalMetabs else []
+		exOptMetabs = exOptMetabs.split(',') if exOptMetabs else []
+		
+		concLB, concUB = map(float, concBnds.split(','))
+		
+		ifSamples = re.search(r'4', runWhich) and nsamples > 0
+		ifStarts = re.search(r'2', runWhich) and nstarts > 1 and nlpSolver != 'ralg'
+		
+		if ifSamples or ifStarts:
+			import numpy as np
+			
+			if seed is None:
+				seed = int(np.random.SeedSequence().entropy % 2**32)
+		
+		if ifSamples: print('\nMDF under ΔrG\'m uncertainty with %s samples (seed %s)' % (nsamples, seed))
+		
+		if ifStarts: print('\nminimizing enzyme cost with %s starts in each pathway (seed %s)' % (nstarts, seed))
+		
+		ranking = screen_pathways(reactionFiles, iniMetabs, finMetabs, exBalMetabs, exOptMetabs, concLB, concUB, assignFlux, runWhich, lpSolver, nlpSolver, outDir, nprocess, nsamples, seed, nstarts, tvaFraction)
+		
+		# output results
+		print('\n%s of %s pathways screened successfully' % ((ranking['Status'] == 'ok').sum(), ranking.shape[0]))
+		
+		for pathway, status in ranking.loc[ranking['Status'] != 'ok', ['Pathway', 'Status']].values:
+			print('%s failed, %s' % (pathway, status))
+		
+		save_screening_ranking(ranking, outDir)
+		
+		record_stage(metrics, 'screening', stageStart)
+		
+		metrics['screening'] = {'npathways': ranking.shape[0], 'nfailed': int((ranking['Status'] != 'ok').sum()),
+		                        'throughput (pathways/s)': ranking.shape[0] / metrics['stages']['screening']['wall (s)']}
+		
+		if plots != 'none':
+			stageStart = get_resource_usage()
+			
+			plotNames = [plotName for flag, plotName in [('1', 'minimal_driving_forces'), ('2', 'enzyme_protein_costs')] if flag in runWhich]
+			
+			for pathway in ranking.loc[ranking['Status'] == 'ok', 'Pathway']:
+				plotJobs.extend(submit_plots(plotPool, plotNames, os.path.join(outDir, pathway), plots, plotFormat))
+			
+			wait_plots(plotPool, plotJobs)
+			
+			record_stage(metrics, 'render figures', stageStart)
+		
+		metrics['seed'] = seed
+		save_metrics(metrics, outDir)
+		
+		print('\nDone.')
+		
+		sys.exit()
 
 	
 	## get stoichiometric matrix ---------------------------------------------------------------------------
@@ -52,6 +160,8 @@ if __name__ == '__main__':
 	print('.' * 50)	
 	
 	# get the stoichiometric matrix of a pathway
+	stageStart = get_resource_usage()
+	
 	iniMetabs = iniMetabs.split(',') if iniMetabs else []
 	finMetabs = finMetabs.split(',') if finMetabs else []
 	exBalMetabs = exBalMetabs.split(',') if exBalMetabs else []
@@ -61,7 +171,11 @@ if __name__ == '__main__':
 	
 	S4BalFull = get_full_stoichiometric_matrix(S4Bal, metabInfo)   # S4BalFull also includes input and output reactions of the pathway
 	
+	record_stage(metrics, 'parse', stageStart)
+	
 	# get flux distribution in steady state
+	stageStart = get_resource_usage()
+	
 	if assignFlux:
 		speEnz, speFlux = assignFlux.split(':')
 		speFlux = float(speFlux)
@@ -70,6 +184,8 @@ if __name__ == '__main__':
 
 	else:
 		Vss = get_steady_state_net_fluxes(S4BalFull, enzymeInfo, metabInfo)
+	
+	record_stage(metrics, 'flux solve', stageStart)
 			
 	print('\nDone.')
 	
@@ -79,53 +195,213 @@ if __name__ == '__main__':
 	if re.search(r'1', runWhich):
 	
 		from thermodynamics import optimize_minimal_driving_force
-		from output import print_driving_force_optimization_results, plot_cumulative_deltaGs, save_driving_force_optimization_results	
+		from output import print_driving_force_optimization_results, save_driving_force_optimization_results
 			
 		print('\n\nMaximize minimal driving force')
 		print('.' * 50)
 		
+		stageStart = get_resource_usage()
+		
 		# maximize minimal driving force
 		concLB, concUB = map(float, concBnds.split(','))
 			
-		optConcs, optDeltaGs, refDeltaGs = optimize_minimal_driving_force(S4Opt, Vss, enzymeInfo, concLB, concUB)
+		optConcs, optDeltaGs, refDeltaGs, solverInfo = optimize_minimal_driving_force(S4Opt, Vss, enzymeInfo, concLB, concUB, lpSolver)
 			
 		# output results
 		print_driving_force_optimization_results(optConcs, optDeltaGs, refDeltaGs)
-			
-		plot_cumulative_deltaGs(optDeltaGs, refDeltaGs, outDir)
 		
+		print('\nLP solved by %s in %.3f s, %s iterations' % (solverInfo['solver'], solverInfo['time'], solverInfo['niter']))
+			
 		save_driving_force_optimization_results(optConcs, optDeltaGs, refDeltaGs, outDir)
+		
+		if plots != 'none': plotJobs.extend(submit_plots(plotPool, ['minimal_driving_forces'], outDir, plots, plotFormat))
 	
+		record_stage(metrics, 'minimal driving force', stageStart)
+		
 		print('\nDone.')
+		
 	
+	# sweep minimal driving force over scenarios of concentration bounds and flux assignments
+	if re.search(r'1', runWhich) and (sweepFile or sweepGrid):
+	
+		import itertools
+		import pandas as pd
+		from parse_network import read_scenarios
+		from thermodynamics import sweep_minimal_driving_force
+		from output import save_driving_force_sweep_results
+		
+		print('\n\nSweeping minimal driving force')
+		print('.' * 50)
+		
+		stageStart = get_resource_usage()
+		
+		# get scenarios
+		concLB, concUB = map(float, concBnds.split(','))
+		
+		if sweepFile:
+			scenarios = read_scenarios(sweepFile, concLB, concUB, assignFlux or '')
+			
+		else:
+			LBsStr, UBsStr = sweepGrid.split(':')
+			grid = list(itertools.product(map(float, LBsStr.split(',')), map(float, UBsStr.split(','))))
+			
+			scenarios = pd.DataFrame(grid, index = ['S%s' % (i + 1) for i in range(len(grid))], columns = ['concLB', 'concUB'])
+			scenarios['metabBnds'] = [{} for i in range(len(grid))]
+			scenarios['assignFlux'] = assignFlux or ''
+		
+		# get flux distribution of each flux assignment
+		from parse_network import get_steady_state_net_fluxes_batch
+		
+		speAssigns = scenarios['assignFlux'].unique()
+		assignments = [(speAssign.split(':')[0], float(speAssign.split(':')[1])) if speAssign else (None, None) for speAssign in speAssigns]
+		
+		VssAll = get_steady_state_net_fluxes_batch(S4BalFull, enzymeInfo, metabInfo, assignments)
+		
+		Vsss = {speAssign: VssAll.iloc[:, i] for i, speAssign in enumerate(speAssigns)}
+		
+		# sweep minimal driving force
+		sweepResults = sweep_minimal_driving_force(S4Opt, Vsss, enzymeInfo, scenarios, nprocess, lpSolver)
+		
+		# output results
+		print('\n%s scenarios solved in %.3f s' % (sweepResults.shape[0], sweepResults['Time (s)'].sum()))
+		
+		save_driving_force_sweep_results(sweepResults, outDir)
+		
+		record_stage(metrics, 'minimal driving force sweep', stageStart)
+		
+		print('\nDone.')
+	
+	
+	# thermodynamic variability analysis
+	if re.search(r'3', runWhich):
+		
+		from thermodynamics import thermodynamic_variability_analysis
+		from output import save_variability_analysis_results
+		
+		print('\n\nThermodynamic variability analysis')
+		print('.' * 50)
+		
+		stageStart = get_resource_usage()
+		
+		concLB, concUB = map(float, concBnds.split(','))
+		
+		concRanges, deltaGRanges, MDF = thermodynamic_variability_analysis(S4Opt, Vss, enzymeInfo, concLB, concUB, tvaFraction, nprocess, lpSolver)
+		
+		# output results
+		print("\nReaction\tmin ΔG'\tmax ΔG' (MDF %.1f, %.0f%% kept)" % (MDF, tvaFraction * 100))
+		for rnx in deltaGRanges.index:
+			print('%s\t%.1f\t%.1f' % (rnx, deltaGRanges.loc[rnx, 'min'], deltaGRanges.loc[rnx, 'max']))
+		
+		print('\nMetabolite\tmin conc. (mM)\tmax conc. (mM)')
+		for metab in concRanges.index:
+			print('%s\t%6.3f\t%6.3f' % (metab, concRanges.loc[metab, 'min'], concRanges.loc[metab, 'max']))
+		
+		save_variability_analysis_results(concRanges, deltaGRanges, outDir)
+		
+		record_stage(metrics, 'thermodynamic variability analysis', stageStart)
+		
+		print('\nDone.')
+		
+	
+	# maximize minimal driving force under ΔrG'm uncertainty
+	if re.search(r'4', runWhich):
+		
+		import numpy as np
+		from thermodynamics import sample_minimal_driving_force
+		from output import save_driving_force_sampling_results
+		
+		print('\n\nMaximize minimal driving force under ΔrG\'m uncertainty')
+		print('.' * 50)
+		
+		stageStart = get_resource_usage()
+		
+		concLB, concUB = map(float, concBnds.split(','))
+		
+		if covFile:
+			from parse_network import read_covariance
+			
+			cov = read_covariance(covFile)
+			
+		else:
+			cov = None
+		
+		if seed is None:
+			seed = int(np.random.SeedSequence().entropy % 2**32)
+		
+		MDFs, bottleneckPro = sample_minimal_driving_force(S4Opt, Vss, enzymeInfo, concLB, concUB, nsamples, cov, seed, nprocess, lpSolver)
+		
+		# output results
+		print('\n%s samples (seed %s), MDF (kJ/mol): mean %.1f, 5%% %.1f, 95%% %.1f, P(MDF > 0) %.3f' % (nsamples, seed, MDFs.mean(), MDFs.quantile(0.05), MDFs.quantile(0.95), (MDFs > 0).mean()))
+		
+		print('\nReaction\tbottleneck probability')
+		for rnx in bottleneckPro.index:
+			print('%s\t%.3f' % (rnx, bottleneckPro.loc[rnx]))
+		
+		save_driving_force_sampling_results(MDFs, bottleneckPro, outDir)
+		
+		record_stage(metrics, 'minimal driving force under uncertainty', stageStart)
+		
+		print('\nDone.')
+		
 	
 	# minimize enzyme cost	
 	if re.search(r'2', runWhich):
 		
 		from parse_network import get_full_stoichiometric_matrix, get_steady_state_net_fluxes
 		from thermodynamics import optimize_enzyme_cost
-		from output import print_enzyme_cost_optimization_results, plot_enzyme_costs, save_enzyme_cost_optimization_results
+		from output import print_enzyme_cost_optimization_results, save_enzyme_cost_optimization_results
 	
 		print('\n\nMinimizing enzyme cost')
 		print('.' * 50)
 		
+		stageStart = get_resource_usage()
+		
 		# minimize enzyme cost
 		concLB, concUB = map(float, concBnds.split(','))
 			
-		optConcs, optEnzyCosts, optEnzyCostTotal = optimize_enzyme_cost(S4Opt, Vss, enzymeInfo, concLB, concUB)	
+		if nstarts > 1 and nlpSolver != 'ralg':
+			import numpy as np
+			from thermodynamics import optimize_enzyme_cost_multistart
+			from output import save_enzyme_cost_multistart_results
+			
+			if seed is None:
+				seed = int(np.random.SeedSequence().entropy % 2**32)
+			
+			optConcs, optEnzyCosts, optEnzyCostTotal, startResults = optimize_enzyme_cost_multistart(S4Opt, Vss, enzymeInfo, concLB, concUB, nstarts, nprocess, nlpSolver, seed = seed, lpSolver = lpSolver)
+			
+			startCosts = startResults['Total cost'] * 1000   # MW in kDa
+			print('\n%s starts (seed %s), total enzyme cost (g/mol/s): best %.3e, median %.3e, worst %.3e' % (nstarts, seed, startCosts.min(), startCosts.median(), startCosts.max()))
+			
+			nfailed = (startResults['Status'] != 'ok').sum()
+			if nfailed: print('%s starts failed and are excluded, see enzyme_protein_costs_multistart.tsv' % nfailed)
+			
+			save_enzyme_cost_multistart_results(startResults, outDir)
+			
+		else:
+			optConcs, optEnzyCosts, optEnzyCostTotal = optimize_enzyme_cost(S4Opt, Vss, enzymeInfo, concLB, concUB, nlpSolver)	
 			
 		# output results
 		print_enzyme_cost_optimization_results(optConcs, optEnzyCosts, optEnzyCostTotal)
 			
-		plot_enzyme_costs(optEnzyCosts, outDir)
-		
 		save_enzyme_cost_optimization_results(optConcs, optEnzyCosts, optEnzyCostTotal, outDir)
+		
+		if plots != 'none': plotJobs.extend(submit_plots(plotPool, ['enzyme_protein_costs'], outDir, plots, plotFormat))
 
+		record_stage(metrics, 'enzyme cost', stageStart)
+		
 		print('\nDone.')
 	
-
-
-		
-		
+	
+	## render figures --------------------------------------------------------------------------------------
+	if plots != 'none':
+		stageStart = get_resource_usage()
 		
+		wait_plots(plotPool, plotJobs)
 		
+		record_stage(metrics, 'render figures', stageStart)
+	
+	metrics['seed'] = seed
+	save_metrics(metrics, outDir)
+	
+
+
@@ -17,9 +17,11 @@ import os
 import re
 import numpy as np
 import pandas as pd
-from constants import nsteps
-from parse_network import parse_network, get_full_stoichiometric_matrix, get_steady_state_net_fluxes
-from ensemble_models import generate_ensemble_models, simulate_perturbation
+from constants import nsteps, seqBatchSize, npairDirections
+from parse_network import parse_network, get_full_stoichiometric_matrix, get_steady_state_net_fluxes, prune_network, get_conservation_relations
+from ensemble_models import generate_stable_ensemble_models, simulate_perturbation
+from metrics import get_resource_usage, record_stage
+from output import save_metrics
 
 
 
@@ -36,8 +38,21 @@ if __name__ == '__main__':
 	parser.add_argument('-n', '--nmodels', type = int, required = True, help = 'number of models in an ensemble')
 	parser.add_argument('-b', '--enzymeBnds', type = str, required = True, help = 'lower and upper bound of relative enzyme level, sep by ","')
 	parser.add_argument('-d', '--ifDump', type = str, required = True, choices = ['yes', 'no'], help = "whether to dump generated models, 'yes' or 'no'")
-	parser.add_argument('-w', '--runWhich', type = str, required = True, help = "which analysis to run, '1' for robustmess index, '2' for probability of system failure, '3' for flux fold change, '12', '23', ... for combinations")
+	parser.add_argument('-w', '--runWhich', type = str, required = True, help = "which analysis to run, '1' for robustmess index, '2' for probability of system failure, '3' for flux fold change, '4' for control coefficients at the reference state (no continuation needed), '5' for probability of system failure under simultaneous perturbation of two enzymes, '12', '23', ... for combinations")
 	parser.add_argument('-p', '--nprocess', type = int, required = True, help = "number of processes to run simultaneously")
+	parser.add_argument('-pr', '--pairs', type = str, required = False, help = 'enzyme pairs perturbed simultaneously with -w 5 in the format "A:B,C:D", or "all" for all pairs of enzymes except input and output reactions, required with -w 5. Each pair takes --ndirections continuations per model, e.g. about 0.45 s per pair and model in one process for CBB.tsv with 32 directions, so all 78 pairs of 40 models take about 23 min')
+	parser.add_argument('-nd', '--ndirections', type = int, required = False, help = 'number of directions in the plane of each enzyme pair with -w 5, %s by default' % npairDirections)
+	parser.add_argument('-sh', '--shard', type = str, required = False, help = 'run only shard i of N of the ensemble in the format "i/N", --nmodels is the size of the whole ensemble and --seed is required. Shard outputs are combined by merge_shards.py')
+	parser.add_argument('-sd', '--seed', type = int, required = False, help = 'random seed of the ensemble, model k is drawn from its own stream seeded by (seed, k). Printed if not set so that runs can be reproduced')
+	parser.add_argument('-sp', '--sampler', type = str, required = False, default = 'random', choices = ['random', 'sobol', 'lhs'], help = "sampler of Kms and Keqs, 'random' (default), 'sobol' (scrambled Sobol sequence) or 'lhs' (Latin hypercube) over the ensemble of --nmodels models")
+	parser.add_argument('-pl', '--plots', type = str, required = False, default = 'full', choices = ['none', 'fast', 'full'], help = "how to plot results, 'none', 'fast' (low resolution, simplified heatmaps) or 'full' (default). Figures are rendered in separate processes from the saved tables")
+	parser.add_argument('-pf', '--plotFormat', type = str, required = False, default = 'jpg', choices = ['jpg', 'png', 'svg', 'pdf'], help = "figure format, 'jpg' (default), 'png', or vector format 'svg' or 'pdf'")
+	parser.add_argument('-bk', '--backend', type = str, required = False, default = 'numeric', choices = ['numeric', 'sympy'], help = "continuation backend, 'numeric' (default, compiled by Numba if installed, otherwise NumPy) or 'sympy' (symbolic Jacobian on all metabolites as in earlier versions, slow)")
+	parser.add_argument('-ct', '--condThreshold', type = float, required = False, help = 'stop continuation as singular Jacobian once the condition number of the Jacobian (over its rank at the reference state) exceeds this value, no cutoff by default, i.e. the condition number is only recorded in continuation_diagnostics.tsv and the step uses the pseudo inverse')
+	parser.add_argument('-tol', '--tolerance', type = float, required = False, help = 'simulate models in batches until the max half width of 95%% bootstrap confidence intervals of robustness index (-w 1) and probability of system failure (-w 2) is below this tolerance, --nmodels is then the budget')
+	parser.add_argument('-bs', '--batchSize', type = int, required = False, help = 'number of models simulated in each batch with --tolerance, %s by default' % seqBatchSize)
+	parser.add_argument('-tp', '--threadsPerProcess', type = int, required = False, default = 1, help = 'number of BLAS threads of each process, 1 by default. --nprocess x --threadsPerProcess should not exceed the # of cores, see benchmark.py for the best split')
+	parser.add_argument('-th', '--ifThreads', type = str, required = False, default = 'no', choices = ['yes', 'no'], help = "whether to simulate models in threads instead of processes, 'yes' or 'no' (default). Worthwhile only with the numeric backend compiled by Numba")
 	parser.add_argument('-t', '--ifReal', action = 'store_true', required = True, help = "whether to use the real value of concentrations, Kms and Keqs, 'yes' or 'no'")
 	subparsers = parser.add_subparsers(dest = 'ifReal')
 	parser_yes = subparsers.add_parser('yes')
@@ -58,6 +73,19 @@ if __name__ == '__main__':
 	ifDump = args.ifDump
 	runWhich = args.runWhich
 	nprocess = args.nprocess
+	shard = args.shard
+	pairs = args.pairs
+	ndirections = args.ndirections or npairDirections
+	seed = args.seed
+	sampler = args.sampler
+	plots = args.plots
+	plotFormat = args.plotFormat
+	backend = args.backend
+	ifThreads = args.ifThreads == 'yes'
+	threadsPerProcess = args.threadsPerProcess
+	condThreshold = args.condThreshold
+	tolerance = args.tolerance
+	batchSize = args.batchSize or seqBatchSize
 	ifReal = args.ifReal
 	if ifReal == 'yes':
 		assignFlux = args.assignFlux
@@ -65,14 +93,42 @@ if __name__ == '__main__':
 		enzConcFile = args.enzConcFile
 		
 	
+	if shard and seed is None:
+		raise ValueError('--seed is required with --shard so that all shards sample the same ensemble')
+	
+	if tolerance is not None:
+		if shard:
+			raise ValueError('--tolerance is not supported with --shard, shards are sized by --nmodels')
+		
+		if not re.search(r'[12]', runWhich):
+			raise ValueError('--tolerance requires robustness index (-w 1) or probability of system failure (-w 2)')
+	
+	if re.search(r'5', runWhich) and not pairs:
+		raise ValueError('--pairs is required with -w 5, e.g. "A:B,C:D", or "all" for all pairs of enzymes except input and output reactions')
+	
+	if seed is None:
+		seed = int(np.random.SeedSequence().entropy % 2**32)
+	
 	os.makedirs(outDir, exist_ok = True)
 	
+	metrics = {'script': 'main2.py', 'arguments': vars(args), 'seed': seed, 'stages': {}}
+	
+	if plots != 'none':
+		from multiprocessing import Pool
+		from constants import nplotProcess
+		from output import submit_plots, wait_plots
+		
+		plotPool = Pool(processes = nplotProcess)
+		plotJobs = []
+	
 	
 	## get stoichiometric matrix ---------------------------------------------------------------------------
 	print('\n\nParsing network')
 	print('.' * 50)	
 		
 	# get the stoichiometric matrix of a pathway
+	stageStart = get_resource_usage()
+	
 	iniMetabs = iniMetabs.split(',') if iniMetabs else []
 	finMetabs = finMetabs.split(',') if finMetabs else []
 	exBalMetabs = exBalMetabs.split(',') if exBalMetabs else []
@@ -81,8 +137,12 @@ if __name__ == '__main__':
 	S4Bal, S4Opt, enzymeInfo, metabInfo = parse_network(reactionFile, iniMetabs, finMetabs, exBalMetabs, exOptMetabs)   
 	
 	S4BalFull = get_full_stoichiometric_matrix(S4Bal, metabInfo)   
+	
+	record_stage(metrics, 'parse', stageStart)
 
 	# get flux distribution in steady state
+	stageStart = get_resource_usage()
+	
 	if ifReal == 'yes':
 		speEnz, speFlux = assignFlux.split(':')
 		speFlux = float(speFlux)
@@ -92,6 +152,8 @@ if __name__ == '__main__':
 	else:
 		Vss = get_steady_state_net_fluxes(S4BalFull, enzymeInfo, metabInfo)
 	
+	record_stage(metrics, 'flux solve', stageStart)
+	
 	print('\nDone.')
 	
 	
@@ -99,10 +161,50 @@ if __name__ == '__main__':
 	print('\n\nGenerating ensemble models')
 	print('.' * 50)
 	
-	# generate ensemble models
-
+	# generate ensemble models stable in reference state
+	stageStart = get_resource_usage()
+	
 	S4OptFull = get_full_stoichiometric_matrix(S4Opt, metabInfo)   
 	
+	# remove blocked reactions and orphan metabolites
+	S4OptFull, blockedRxns, orphanMetabs = prune_network(S4OptFull, Vss)
+	
+	if blockedRxns:
+		print('\n%s blocked reactions pruned: %s' % (len(blockedRxns), ', '.join(blockedRxns)))
+		if orphanMetabs: print('%s orphan metabolites pruned: %s' % (len(orphanMetabs), ', '.join(orphanMetabs)))
+	
+	metrics['pruning'] = {'blocked reactions': blockedRxns, 'orphan metabolites': orphanMetabs}
+	
+	metabs = S4OptFull.index
+	enzymes = S4OptFull.columns
+	
+	innerEnzymes = [enz for enz in enzymes if not re.match(r'.+_(in|out)', enz)]   # input and output reactions are not perturbed
+	
+	# conserved moieties, continuation runs on independent metabolites
+	linkMat, consRelations = get_conservation_relations(S4OptFull)
+	
+	if consRelations.shape[0] > 0:
+		from output import save_conservation_relations
+		
+		print('\n%s conserved moieties, %s of %s metabolites independent' % (consRelations.shape[0], linkMat.shape[1], len(metabs)))
+		
+		save_conservation_relations(consRelations, outDir)
+	
+	Smetab2rnx = S4OptFull.T / S4OptFull.T.abs()
+	Smetab2rnx = Smetab2rnx.replace(np.nan, 0)
+	
+	if shard:
+		from shards import get_shard_model_ids
+		
+		ishard, nshards, modelIDs = get_shard_model_ids(nmodels, shard)
+		
+		print('\nshard %s of %s, models %s to %s of %s' % (ishard, nshards, modelIDs[0] + 1, modelIDs[-1] + 1, nmodels))
+	
+	else:
+		modelIDs = list(range(nmodels))
+	
+	nmodelsTotal = nmodels
+	
 	if ifReal == 'yes':
 		from parse_network import read_concentrations
 		
@@ -113,60 +215,199 @@ if __name__ == '__main__':
 		for enzyme in S4OptFull.columns: 
 			Ess.loc[enzyme] = Ess.get(enzyme, EssMean)   
 		
-		ensembleModels = generate_ensemble_models(S4OptFull, enzymeInfo, Vss, nmodels, Ess, Css)
+		ensembleModels, acceptRate, modelIDs = generate_stable_ensemble_models(S4OptFull, enzymeInfo, Vss, nmodels, Smetab2rnx, Ess, Css, seed, modelIDs, linkMat, sampler)
 
 	else:	
-		ensembleModels = generate_ensemble_models(S4OptFull, enzymeInfo, Vss, nmodels)
+		ensembleModels, acceptRate, modelIDs = generate_stable_ensemble_models(S4OptFull, enzymeInfo, Vss, nmodels, Smetab2rnx, seed = seed, modelIDs = modelIDs, L = linkMat, sampler = sampler)
+	
+	print('\n%s stable models generated (seed %s), acceptance rate %.1f%%' % (len(ensembleModels), seed, acceptRate * 100))
+	
+	nmodels = len(ensembleModels)
+	
+	record_stage(metrics, 'ensemble generation', stageStart)
+	
+	metrics['ensemble generation'] = {'nmodels': nmodels, 'acceptance rate': acceptRate}
+	
+	# one worker pool shared by simulation, pair simulation and flux fold change, network data and models are loaded once in each worker
+	if re.search(r'[1235]', runWhich):
+		from ensemble_models import get_worker_data, create_worker_pool
 		
+		if ifReal == 'yes':
+			poolData = get_worker_data(S4OptFull, Smetab2rnx, enzymes, metabs, nsteps, Ess, Css, linkMat, Vss, ensembleModels, condThreshold)
 		
-	# simulate perturbation (estimate metabolite concentrations at different enzyme levels)
-	metabs = S4OptFull.index
-	enzymes = S4OptFull.columns
+		else:
+			poolData = get_worker_data(S4OptFull, Smetab2rnx, enzymes, metabs, nsteps, L = linkMat, Vss = Vss, ensembleModels = ensembleModels, condThreshold = condThreshold)
+		
+		workerPool = create_worker_pool(nprocess, poolData, threadsPerProcess, ifThreads)
+		
+	# calculate control coefficients at the reference state
+	if re.search(r'4', runWhich):
+		
+		from robustness import calculate_control_coefficients
+		from output import save_control_coefficients
+		
+		stageStart = get_resource_usage()
+		
+		if ifReal == 'yes':
+			concConCoes, fluxConCoes = calculate_control_coefficients(ensembleModels, S4OptFull, Smetab2rnx, Ess.loc[enzymes].values, Css.loc[metabs].values, linkMat)
+			
+		else:
+			concConCoes, fluxConCoes = calculate_control_coefficients(ensembleModels, S4OptFull, Smetab2rnx, np.ones(len(enzymes)), np.ones(len(metabs)), linkMat)
+		
+		nsingular = np.isnan(fluxConCoes).all(axis = (1, 2)).sum()
+		if nsingular: print('\n%s of %s models have a singular Jacobian at the reference state, their control coefficients are nan' % (nsingular, len(ensembleModels)))
+		
+		# output results
+		ownFluxConCoes = save_control_coefficients(concConCoes, fluxConCoes, metabs, enzymes, innerEnzymes, modelIDs, outDir)
+		
+		definedFluxConCoes = ownFluxConCoes.dropna(how = 'all')
+		if definedFluxConCoes.shape[0]:
+			print('\nReaction\tflux control coefficient, median (5%, 95%)')
+			for enzyme in definedFluxConCoes.median().sort_values(ascending = False).index:
+				print('%s\t%.3f (%.3f, %.3f)' % (enzyme, definedFluxConCoes[enzyme].median(), definedFluxConCoes[enzyme].quantile(0.05), definedFluxConCoes[enzyme].quantile(0.95)))
+		
+		if plots != 'none': plotJobs.extend(submit_plots(plotPool, ['flux_control_coefficients'], outDir, plots, plotFormat))
+		
+		record_stage(metrics, 'control coefficients', stageStart)
 	
-	Smetab2rnx = S4OptFull.T / S4OptFull.T.abs()
-	Smetab2rnx = Smetab2rnx.replace(np.nan, 0)
+	# simulate simultaneous perturbation of enzyme pairs
+	if re.search(r'5', runWhich):
+		
+		from itertools import combinations
+		from ensemble_models import get_pair_directions, simulate_pair_perturbation
+		from robustness import calculate_pair_failure_probability
+		from output import save_pair_failure_probability
+		
+		print('\n\nSimulating perturbation of enzyme pairs')
+		print('.' * 50)
+		
+		stageStart = get_resource_usage()
+		
+		enzymeLB, enzymeUB = map(float, enzymeBnds.split(','))
+		
+		pairList = list(combinations(innerEnzymes, 2)) if pairs == 'all' else [tuple(pair.split(':')) for pair in pairs.split(',')]
+		
+		directions = get_pair_directions(ndirections, enzymeLB, enzymeUB)
+		
+		print('\n%s pairs, %s directions each' % (len(pairList), ndirections))
+		
+		if ifReal == 'yes':
+			pairSteps = simulate_pair_perturbation(ensembleModels, S4OptFull, Smetab2rnx, enzymes, pairList, directions, nsteps, nprocess, Ess, Css, L = linkMat, threadsPerProcess = threadsPerProcess, metrics = metrics, pool = workerPool)
+		
+		else:
+			pairSteps = simulate_pair_perturbation(ensembleModels, S4OptFull, Smetab2rnx, enzymes, pairList, directions, nsteps, nprocess, L = linkMat, threadsPerProcess = threadsPerProcess, metrics = metrics, pool = workerPool)
+		
+		pairFailurePro = calculate_pair_failure_probability(pairSteps, pairList, directions, nsteps)
+		
+		# output results
+		save_pair_failure_probability(pairFailurePro, directions, outDir)
+		
+		if plots != 'none': plotJobs.extend(submit_plots(plotPool, ['pair_failure'], outDir, plots, plotFormat))
+		
+		record_stage(metrics, 'pair simulation', stageStart)
+		
+		print('\nDone.')
 	
-	enzymeLB, enzymeUB = map(float, enzymeBnds.split(','))
+	if re.search(r'[123]', runWhich):
+		
+		# simulate perturbation (estimate metabolite concentrations at different enzyme levels)
+		stageStart = get_resource_usage()
 	
-	if ifReal == 'yes':
-		enzymeLBs = Ess * enzymeLB
-		enzymeUBs = Ess * enzymeUB
+		enzymeLB, enzymeUB = map(float, enzymeBnds.split(','))
 	
-		pertResults = simulate_perturbation(ensembleModels, S4OptFull, Smetab2rnx, enzymes, metabs, nsteps, enzymeLBs, enzymeUBs, nmodels, nprocess, Ess, Css)
+		if ifReal == 'yes':
+			enzymeLBs = Ess * enzymeLB
+			enzymeUBs = Ess * enzymeUB
+			
+			Eini, Xini = Ess, Css
 	
-	else:
-		enzymeLBs = pd.Series(np.full(len(enzymes), enzymeLB), index = enzymes)
-		enzymeUBs = pd.Series(np.full(len(enzymes), enzymeUB), index = enzymes)
+		else:
+			enzymeLBs = pd.Series(np.full(len(enzymes), enzymeLB), index = enzymes)
+			enzymeUBs = pd.Series(np.full(len(enzymes), enzymeUB), index = enzymes)
+			
+			Eini, Xini = [], []
 		
-		pertResults = simulate_perturbation(ensembleModels, S4OptFull, Smetab2rnx, enzymes, metabs, nsteps, enzymeLBs, enzymeUBs, nmodels, nprocess)	
-	
+		if tolerance is None:
+			pertResults = simulate_perturbation(ensembleModels, S4OptFull, Smetab2rnx, enzymes, metabs, nsteps, enzymeLBs, enzymeUBs, nmodels, nprocess, Eini, Xini, metrics = metrics, modelIDs = modelIDs, backend = backend, ifThreads = ifThreads, L = linkMat, pertEnzymes = innerEnzymes, threadsPerProcess = threadsPerProcess, pool = workerPool)
+		
+		else:
+			from ensemble_models import simulate_perturbation_sequential
+			
+			criteria = [criterion for num, criterion in [('1', 'robustness index'), ('2', 'system failure')] if num in runWhich]
+			
+			pertResults, nmodels, ifConverged = simulate_perturbation_sequential(ensembleModels, S4OptFull, Smetab2rnx, enzymes, metabs, nsteps, enzymeLBs, enzymeUBs, nprocess, enzymeLB, enzymeUB, tolerance, batchSize, criteria, 
+			                                                                     Eini, Xini, metrics = metrics, modelIDs = modelIDs, backend = backend, ifThreads = ifThreads, L = linkMat, pertEnzymes = innerEnzymes, seed = seed, threadsPerProcess = threadsPerProcess, pool = workerPool)
 			
-	if ifDump == 'yes':
-		from output import dump_ensemble_models
+			if ifConverged:
+				print('\ntolerance met with %s of %s models' % (nmodels, len(ensembleModels)))
 			
-		dump_ensemble_models(pertResults, outDir)	
+			else:
+				print('\ntolerance not met within the budget of %s models' % len(ensembleModels))
+			
+			# models not simulated are dropped
+			ensembleModels = ensembleModels[:nmodels]
+			modelIDs = modelIDs[:nmodels]
+	
+		record_stage(metrics, 'simulation', stageStart)
+	
+		from robustness import get_continuation_diagnostics
+		from output import save_continuation_diagnostics
+	
+		contDiagnostics = get_continuation_diagnostics(pertResults)
+	
+		terminations = contDiagnostics['Termination'].value_counts()
+		print('\ncontinuation terminated by %s' % ', '.join('%s %s' % (reason, count) for reason, count in terminations.items()))
+	
+		metrics['continuation'] = {'terminations': terminations.to_dict(), 'mean steps': contDiagnostics['Steps'].mean()}
+	
+		save_continuation_diagnostics(contDiagnostics, outDir)
+	
+		if ifDump == 'yes':
+			from output import dump_ensemble_models
+			
+			dump_ensemble_models(pertResults, outDir)	
+	
+	if shard:
+		from output import save_shard_info
+		
+		save_shard_info({'shard': ishard, 'nshards': nshards, 'seed': seed, 'sampler': sampler, 'nmodelsTotal': nmodelsTotal, 'modelIDs': modelIDs, 
+		                 'nsimulated': len(pertResults[innerEnzymes[0]]) if re.search(r'[123]', runWhich) else nmodels}, outDir)
 	
 	print('\nDone.')
 	
 	
 	## estimate robustmess ----------------------------------------------------------------------------------
-	innerEnzymes = [enz for enz in enzymes if not re.match(r'.+_(in|out)', enz)]
+	# bootstrap confidence intervals of robustness index and probability of system failure
+	if re.search(r'[12]', runWhich):
+		
+		from robustness import calculate_bootstrap_intervals
+		
+		stageStart = get_resource_usage()
+		
+		robustIdxCI, failureProLower, failureProUpper = calculate_bootstrap_intervals(pertResults, innerEnzymes, nsteps, enzymeLB, enzymeUB, seed = seed)
 		
+		record_stage(metrics, 'bootstrap', stageStart)
+	
 	# calculate robustness index
 	if re.search(r'1', runWhich):
 		
 		from robustness import calculate_robustness_index
-		from output import plot_robustness_index, save_robustness_index
+		from output import save_robustness_index
 		
 		print('\n\nCalculating robustness index')
 		print('.' * 50)
 		
+		stageStart = get_resource_usage()
+		
 		# calculate robustness index
 		robustIdx = calculate_robustness_index(pertResults, innerEnzymes, nsteps)
 		
 		# output results	
-		plot_robustness_index(robustIdx, outDir)
-		save_robustness_index(robustIdx, outDir)	
+		save_robustness_index(robustIdx, outDir, robustIdxCI)
+		
+		if plots != 'none': plotJobs.extend(submit_plots(plotPool, ['robustness_index'], outDir, plots, plotFormat))
+		
+		record_stage(metrics, 'robustness index', stageStart)
 		
 		print('\nDone.')	
 	
@@ -174,48 +415,72 @@ if __name__ == '__main__':
 	if re.search(r'2', runWhich):	
 		
 		from robustness import calculate_system_failure_probability
-		from output import plot_system_failure_probability, save_system_failure_probability
+		from output import save_system_failure_probability
 		
 		print('\n\nCalculating probability of system failure')
 		print('.' * 50)
 		
+		stageStart = get_resource_usage()
+		
 		# calculate probability of system failure
 		failurePro = calculate_system_failure_probability(pertResults, innerEnzymes, nsteps, nmodels, enzymeLB, enzymeUB)
 		
 		# output results	
-		plot_system_failure_probability(failurePro, outDir)
-		save_system_failure_probability(failurePro, outDir)	
+		save_system_failure_probability(failurePro, outDir, (failureProLower, failureProUpper))
+		
+		if plots != 'none': plotJobs.extend(submit_plots(plotPool, ['system_failure'], outDir, plots, plotFormat))
 			
+		record_stage(metrics, 'system failure', stageStart)
+		
 		print('\nDone.')
 	
 	# calculate flux fold change under enzyme perturbation
 	if re.search(r'3', runWhich):
 		
-		from robustness import calculate_flux_fold_change, calculate_flux_control_index
-		from output import plot_flux_fold_change, plot_flux_control_index, save_flux_fold_change
+		from robustness import calculate_flux_fold_change
+		from output import save_flux_fold_change
 		
 		print('\n\nCalculating flux fold change')
 		print('.' * 50)
+		
+		stageStart = get_resource_usage()
 			
 		fluxChangeBnds = (0.2, 5)   # may need to set for plot
 		
-		# calculate flux fold change and flux control index
-		fluxChange = calculate_flux_fold_change(ifReal, Smetab2rnx, ensembleModels, Vss, pertResults, enzymes, innerEnzymes, nsteps, enzymeLB, enzymeUB, nprocess, fluxBnds = fluxChangeBnds)
+		# calculate flux fold change
+		# flux fold change runs in processes, the shared pool is used unless it holds threads
+		fluxChange = calculate_flux_fold_change(ifReal, Smetab2rnx, ensembleModels, Vss, pertResults, enzymes, innerEnzymes, nsteps, enzymeLB, enzymeUB, nprocess, fluxBnds = fluxChangeBnds, 
+		                                        threadsPerProcess = threadsPerProcess, pool = None if ifThreads else workerPool)
 		
-		fluxConIdx = calculate_flux_control_index(fluxChange, innerEnzymes, fluxBnds = fluxChangeBnds)	
-
-		# output results	
-		plot_flux_fold_change(innerEnzymes, fluxChange, outDir, fluxBndsShow = fluxChangeBnds)
-		plot_flux_control_index(fluxConIdx, outDir)
-		save_flux_fold_change(innerEnzymes, fluxChange, outDir)	
+		# output results, flux control index is calculated from the saved flux fold change when plotted
+		save_flux_fold_change(innerEnzymes, fluxChange, outDir)
+		
+		if plots != 'none': plotJobs.extend(submit_plots(plotPool, ['flux_change', 'flux_control_index'], outDir, plots, plotFormat, enzymes = innerEnzymes, fluxBnds = fluxChangeBnds))
+		
+		record_stage(metrics, 'flux fold change', stageStart)
 		
 		print('\nDone.')
 	
 	
+	# CPU time of worker processes is counted once they are joined
+	if re.search(r'[1235]', runWhich):
+		stageStart = get_resource_usage()
+		
+		workerPool.close()
+		workerPool.join()
+		
+		record_stage(metrics, 'worker pool', stageStart)
+	
+	
+	## render figures --------------------------------------------------------------------------------------
+	if plots != 'none':
+		stageStart = get_resource_usage()
+		
+		wait_plots(plotPool, plotJobs)
+		
+		record_stage(metrics, 'render figures', stageStart)
 	
+	save_metrics(metrics, outDir)
 	
 
 
-
-
-
@@ -0,0 +1,104 @@
+#!/usr/bin/env pyhton
+# -*- coding: UTF-8 -*-
+
+
+__author__ = 'Chao Wu'
+__date__ = '10/18/2026'
+__version__ = '1.0'
+
+
+'''
+This script merges outputs of main2.py shards (--shard i/N) into robustness index, probability of system failure and flux fold change of the whole ensemble
+'''
+
+
+import argparse
+import os
+from glob import glob
+from shards import merge_shard_results
+
+
+
+
+if __name__ == '__main__':
+
+	parser = argparse.ArgumentParser(description = 'This script merges outputs of main2.py shards into results of the whole ensemble')
+	parser.add_argument('-o', '--outDir', type = str, required = True, help = 'output directory')
+	parser.add_argument('-s', '--shardDirs', type = str, required = True, nargs = '+', help = 'output directories of shards, wildcards are allowed, e.g. "path/to/shard_*"')
+	parser.add_argument('-pl', '--plots', type = str, required = False, default = 'full', choices = ['none', 'fast', 'full'], help = "how to plot results, 'none', 'fast' (low resolution) or 'full' (default)")
+	parser.add_argument('-pf', '--plotFormat', type = str, required = False, default = 'jpg', choices = ['jpg', 'png', 'svg', 'pdf'], help = "figure format, 'jpg' (default), 'png', or vector format 'svg' or 'pdf'")
+	args = parser.parse_args()
+
+	outDir = args.outDir
+	shardDirs = sorted({shardDir for pattern in args.shardDirs for shardDir in (glob(pattern) or [pattern])})
+	plots = args.plots
+	plotFormat = args.plotFormat
+
+	os.makedirs(outDir, exist_ok = True)
+
+
+	## merge shards ----------------------------------------------------------------------------------------
+	print('\n\nMerging shards')
+	print('.' * 50)
+
+	merged = merge_shard_results(shardDirs)
+
+	print('\n%s shards merged, %s models simulated' % (len(shardDirs), merged['nmodels']))
+
+	if merged['missingShards']:
+		print('shards %s missing, results are of the merged shards only' % ', '.join(map(str, merged['missingShards'])))
+
+
+	## output results --------------------------------------------------------------------------------------
+	plotNames = []
+
+	if merged['robustIdx'] is not None:
+		from output import save_robustness_index
+
+		save_robustness_index(merged['robustIdx'], outDir)
+
+		plotNames.append('robustness_index')
+
+	if merged['failurePro'] is not None:
+		from output import save_system_failure_probability
+
+		save_system_failure_probability(merged['failurePro'], outDir)
+
+		plotNames.append('system_failure')
+
+	if merged['fluxChange'] is not None:
+		from output import save_flux_fold_change
+
+		innerEnzymes = list(merged['fluxChange'])
+
+		save_flux_fold_change(innerEnzymes, merged['fluxChange'], outDir)
+
+		plotNames.extend(['flux_change', 'flux_control_index'])
+
+	if merged['diagnostics'] is not None:
+		from output import save_continuation_diagnostics
+
+		save_continuation_diagnostics(merged['diagnostics'], outDir)
+
+	if merged['ownFluxConCoes'] is not None:
+		merged['ownFluxConCoes'].to_csv('%s/flux_control_coefficients.tsv' % outDir, sep = '\t', index_label = '#Model')
+
+		plotNames.append('flux_control_coefficients')
+
+	if plots != 'none' and plotNames:
+		from multiprocessing import Pool
+		from constants import nplotProcess
+		from output import submit_plots, wait_plots
+
+		fluxChangeBnds = (0.2, 5)   # the same with main2.py
+
+		plotPool = Pool(processes = nplotProcess)
+
+		plotJobs = submit_plots(plotPool, plotNames, outDir, plots, plotFormat, enzymes = innerEnzymes if merged['fluxChange'] is not None else None, fluxBnds = fluxChangeBnds)
+
+		wait_plots(plotPool, plotJobs)
+
+	print('\nDone.')
+
+
+
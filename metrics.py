@@ -0,0 +1,102 @@
+#!/usr/bin/env pyhton
+# -*- coding: UTF-8 -*-
+
+
+__author__ = 'Chao Wu'
+__date__ = '10/18/2026'
+__version__ = '1.0'
+
+
+
+
+def get_resource_usage():
+	'''
+	Returns
+	usage: dict, wall clock (s), CPU time (s) of this process and its terminated child processes,
+	peak RSS (MB) of this process and of the largest child process, None if not available on this platform
+	'''
+
+	import os
+	import time
+
+	times = os.times()
+
+	usage = {'wall': time.perf_counter(), 'cpu': times.user + times.system + times.children_user + times.children_system}
+
+	try:
+		import resource
+
+		usage['peakRSS'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024   # KB on Linux
+		usage['peakRSSChildren'] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+	except ImportError:
+		usage['peakRSS'] = None
+		usage['peakRSSChildren'] = None
+
+	return usage
+
+
+def record_stage(metrics, stage, start):
+	'''
+	Parameters
+	metrics: dict, wall time, CPU time and peak RSS of the stage are recorded in metrics['stages'][stage]
+	stage: str, stage name
+	start: dict, resource usage at the start of the stage returned by get_resource_usage
+	NOTE CPU time of child processes is only counted once they are joined, i.e. pools should be closed within the stage
+	'''
+
+	end = get_resource_usage()
+
+	metrics.setdefault('stages', {})[stage] = {'wall (s)': end['wall'] - start['wall'], 'cpu (s)': end['cpu'] - start['cpu'],
+	                                           'peak RSS (MB)': end['peakRSS'], 'peak RSS of child processes (MB)': end['peakRSSChildren']}
+
+
+def print_progress(ndone, ntotal, t0, what = 'models'):
+	'''
+	Parameters
+	ndone: int, # of items finished
+	ntotal: int, # of items in total
+	t0: float, start time (time.perf_counter())
+	what: str, name of items
+
+	Returns
+	throughput: float, items per second
+	'''
+
+	import time
+
+	elapsed = time.perf_counter() - t0
+	throughput = ndone / elapsed if elapsed > 0 else 0
+
+	eta = (ntotal - ndone) / throughput if throughput > 0 else float('inf')
+
+	print('%s/%s %s done, %.2f %s/s, elapsed %.0f s, ETA %.0f s' % (ndone, ntotal, what, throughput, what, elapsed, eta), flush = True)
+
+	return throughput
+
+
+def limit_blas_threads(nthreads):
+	'''
+	Parameters
+	nthreads: int, max # of BLAS (and OpenMP) threads of this process
+
+	Returns
+	ifLimited: bool, whether the limit is applied to BLAS already loaded, False if threadpoolctl is not installed
+	NOTE used as the initializer of worker pools, so that nprocess workers with nthreads each do not oversubscribe the cores. 
+	Environment variables are set as well for libraries loaded later
+	'''
+
+	import os
+
+	for var in ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'BLIS_NUM_THREADS']:
+		os.environ[var] = str(nthreads)
+
+	try:
+		from threadpoolctl import threadpool_limits
+
+		threadpool_limits(limits = nthreads)
+
+		return True
+
+	except ImportError:
+		return False
@@ -47,12 +47,77 @@ def save_driving_force_optimization_results(optConcs, optDeltaGs, refDeltaGs, ou
 	optConcs.to_csv('%s/metabConc_MDF.tsv' % outDir, sep = '\t', header = ['Optimized Concentration (mM)'], index_label = '#Metabolite')
 	
 
-def plot_cumulative_deltaGs(optDeltaGs, refDeltaGs, outDir):
+def save_variability_analysis_results(concRanges, deltaGRanges, outDir):
+	'''
+	Parameters
+	concRanges: df, metabolite in rows, columns are min and max concentrations (mM)
+	deltaGRanges: df, reaction in rows, columns are min and max ΔG'
+	outDir: str, output directory
+	'''
+	
+	concRanges.to_csv('%s/metabConc_TVA.tsv' % outDir, sep = '\t', header = ['min Concentration (mM)', 'max Concentration (mM)'], index_label = '#Metabolite')
+	
+	deltaGRanges.to_csv('%s/driving_forces_TVA.tsv' % outDir, sep = '\t', header = ["min ΔG'", "max ΔG'"], index_label = '#Reaction')
+	
+	
+def save_driving_force_sweep_results(sweepResults, outDir):
+	'''
+	Parameters
+	sweepResults: df, scenario in rows, MDF, bottleneck reactions and solver info appended to scenarios
+	outDir: str, output directory
+	'''
+	
+	sweepResults = sweepResults.copy()
+	sweepResults['metabBnds'] = sweepResults['metabBnds'].apply(lambda metabBnds: ';'.join('%s:%s,%s' % (metab, lb, ub) for metab, (lb, ub) in metabBnds.items()))
+	
+	sweepResults = sweepResults.rename(columns = {'concLB': 'Concentration LB (mM)', 'concUB': 'Concentration UB (mM)', 'metabBnds': 'Metabolite bounds (mM)', 'assignFlux': 'Assigned flux'})
+	sweepResults.to_csv('%s/minimal_driving_force_sweep.tsv' % outDir, sep = '\t', index_label = '#Scenario')
+	
+
+def save_driving_force_sampling_results(MDFs, bottleneckPro, outDir):
+	'''
+	Parameters
+	MDFs: ser, maximized minimal driving force of each sample
+	bottleneckPro: ser, probability of each reaction being a bottleneck
+	outDir: str, output directory
+	'''
+	
+	MDFs.to_csv('%s/minimal_driving_force_samples.tsv' % outDir, sep = '\t', header = ['MDF (kJ/mol)'], index_label = '#Sample')
+	
+	bottleneckPro.to_csv('%s/bottleneck_probability.tsv' % outDir, sep = '\t', header = ['Bottleneck probability'], index_label = '#Reaction')
+	
+
+def save_screening_ranking(ranking, outDir):
+	'''
+	Parameters
+	ranking: df, pathway in rows, ranked by MDF then total enzyme cost
+	outDir: str, output directory
+	'''
+	
+	ranking.to_csv('%s/pathway_ranking.tsv' % outDir, sep = '\t', index_label = '#Rank')
+	
+
+def save_metrics(metrics, outDir):
+	'''
+	Parameters
+	metrics: dict, stage timings, resource usage and throughput
+	outDir: str, output directory
+	'''
+	
+	import json
+	
+	with open('%s/metrics.json' % outDir, 'w') as f:
+		json.dump(metrics, f, indent = 2, default = float)
+	
+
+def plot_cumulative_deltaGs(optDeltaGs, refDeltaGs, outDir, dpi = 300, fmt = 'jpg'):
 	'''
 	Parameters	
 	optDeltaGs: ser, optimal minimal driving forces
 	refDeltaGs: float, reference minimal driving forces (all concentrations at 1 mM)
 	outDir: str, output directory
+	dpi: int, resolution of raster figures
+	fmt: str, figure format, 'jpg', 'png', 'svg' or 'pdf'
 	'''
 	
 	import re
@@ -91,7 +156,7 @@ def plot_cumulative_deltaGs(optDeltaGs, refDeltaGs, outDir):
 		
 	plt.legend(fontsize = 15)
 
-	plt.savefig('%s/minimal_driving_forces.jpg' % outDir, dpi = 300, bbox_inches = 'tight')
+	plt.savefig('%s/minimal_driving_forces.%s' % (outDir, fmt), dpi = dpi, bbox_inches = 'tight')
 	
 	
 def print_enzyme_cost_optimization_results(optConcs, optEnzyCosts, optEnzyCostTotal):
@@ -130,11 +195,27 @@ def save_enzyme_cost_optimization_results(optConcs, optEnzyCosts, optEnzyCostTot
 	optConcs.to_csv('%s/metabConc_EPC.tsv' % outDir, sep = '\t', header = ['Optimized Concentration (mM)'], index_label = '#Metabolite')
 	
 			
-def plot_enzyme_costs(optEnzyCosts, outDir):
+def save_enzyme_cost_multistart_results(startResults, outDir):
+	'''
+	Parameters
+	startResults: df, start in rows, columns are start type, total enzyme cost, status and optimal concentrations of each start
+	outDir: str, output directory
+	'''
+	
+	startResults = startResults.copy()
+	startResults['Total cost'] = startResults['Total cost'] * 1000   # MW in kDa
+	startResults = startResults.rename(columns = {'Total cost': 'optimized total enzyme cost (g/mol/s)'})
+	
+	startResults.to_csv('%s/enzyme_protein_costs_multistart.tsv' % outDir, sep = '\t', index_label = '#Start')
+	
+	
+def plot_enzyme_costs(optEnzyCosts, outDir, dpi = 300, fmt = 'jpg'):
 	'''
 	Parameters	
 	optEnzyCosts: ser, optimal enzyme costs
 	outDir: str, output directory
+	dpi: int, resolution of raster figures
+	fmt: str, figure format, 'jpg', 'png', 'svg' or 'pdf'
 	'''
 	
 	import re
@@ -157,7 +238,17 @@ def plot_enzyme_costs(optEnzyCosts, outDir):
 	plt.xticks(fontsize = 15)
 	plt.ylabel("Enzyme protein cost (g/(mol s$^{-1}$)", fontsize = 20)
 	
-	plt.savefig('%s/enzyme_protein_costs.jpg' % outDir, dpi = 300, bbox_inches = 'tight')	
+	plt.savefig('%s/enzyme_protein_costs.%s' % (outDir, fmt), dpi = dpi, bbox_inches = 'tight')	
+	
+	
+def save_conservation_relations(G, outDir):
+	'''
+	Parameters
+	G: df, conservation relations, conserved moiety in rows, metabolite in columns
+	outDir: str, output directory
+	'''
+	
+	G.loc[:, (G != 0).any()].to_csv('%s/conservation_relations.tsv' % outDir, sep = '\t', index_label = '#Moiety')
 	
 	
 def dump_ensemble_models(pertResults, outDir):
@@ -174,21 +265,71 @@ def dump_ensemble_models(pertResults, outDir):
 		pickle.dump(pertResults, f)
 	
 	
-def save_robustness_index(robustIdx, outDir):
+def save_shard_info(shardInfo, outDir):
+	'''
+	Parameters
+	shardInfo: dict, shard #, # of shards, seed, ensemble size, IDs of models generated and # of models simulated
+	outDir: str, output directory
+	'''
+	
+	import json
+	
+	with open('%s/shard.json' % outDir, 'w') as f:
+		json.dump(shardInfo, f, indent = 2)
+	
+	
+def save_continuation_diagnostics(diagnostics, outDir):
+	'''
+	Parameters
+	diagnostics: df, steps, termination reason, max eigenvalue and condition number of each model, enzyme and direction
+	outDir: str, output directory
+	'''
+	
+	diagnostics.to_csv('%s/continuation_diagnostics.tsv' % outDir, sep = '\t', index = False)
+	
+	
+def save_parallel_benchmark(benchmark, outDir):
+	'''
+	Parameters
+	benchmark: df, wall time and throughput of each split of cores into processes x threads per process
+	outDir: str, output directory
+	'''
+	
+	benchmark.to_csv('%s/parallel_benchmark.tsv' % outDir, sep = '\t', index = False)
+	
+	
+def save_sparse_benchmark(sparseBenchmark, outDir):
+	'''
+	Parameters
+	sparseBenchmark: df, wall time of the dense and sparse continuation of one model and enzyme
+	outDir: str, output directory
+	'''
+	
+	sparseBenchmark.to_csv('%s/sparse_benchmark.tsv' % outDir, sep = '\t', index = False)
+	
+	
+def save_robustness_index(robustIdx, outDir, robustIdxCI = None):
 	'''
 	Parameters
 	robustIdx: ser, median of robustness index Si for each enzyme
 	outDir: str, output directory
+	robustIdxCI: df, bootstrap confidence interval of robustness index, saved in robustness_index_CI.tsv if provided
 	'''
 	
 	robustIdx.to_csv('%s/robustness_index.tsv' % outDir, sep = '\t', header = ['S index'], index_label = '#Reaction')
 	
+	if robustIdxCI is not None:
+		robustIdxCI.to_csv('%s/robustness_index_CI.tsv' % outDir, sep = '\t', index_label = '#Reaction')
+	
 			
-def plot_robustness_index(robustIdx, outDir):
+def plot_robustness_index(robustIdx, outDir, dpi = 300, fmt = 'jpg', robustIdxCI = None):
 	'''
 	Parameters
 	robustIdx: ser, median of robustness index Si for each enzyme
 	outDir: str, output directory
+	dpi: int, resolution of raster figures
+	fmt: str, figure format, 'jpg', 'png', 'svg' or 'pdf'
+	robustIdxCI: df, bootstrap confidence interval of robustness index, drawn as error bars if provided
 	'''
 	
 	import re
@@ -208,27 +349,41 @@ def plot_robustness_index(robustIdx, outDir):
 	
 	plt.bar(range(enzymes.size), Sindex, tick_label = enzymes, color = '#E24A33')
 	
+	if robustIdxCI is not None:
+		yerr = [Sindex - robustIdxCI.loc[enzymes, 'Lower'].values, robustIdxCI.loc[enzymes, 'Upper'].values - Sindex]
+		
+		plt.errorbar(range(enzymes.size), Sindex, yerr = yerr, fmt = 'none', ecolor = 'black', capsize = 5)
+	
 	plt.xticks(fontsize = 15)
 	plt.ylabel('Robustness index (totally %.3f)' % np.sum(Sindex), fontsize = 20)
 	
-	plt.savefig('%s/robustness_index.jpg' % outDir, dpi = 300, bbox_inches = 'tight')
+	plt.savefig('%s/robustness_index.%s' % (outDir, fmt), dpi = dpi, bbox_inches = 'tight')
 	
 
-def save_system_failure_probability(failurePro, outDir):
+def save_system_failure_probability(failurePro, outDir, failureProCI = None):
 	'''
 	Parameters
 	failurePro: df, probability of system failure, enzyme in rows, enzyme level in columns
 	outDir: str, output directory	
+	failureProCI: 2-tuple of df, lower and upper bound of bootstrap confidence interval, saved in system_failure_CI_lower.tsv and 
+	system_failure_CI_upper.tsv if provided
 	'''
 	
 	failurePro.to_csv('%s/system_failure.tsv' % outDir, sep = '\t', index_label = '#Reaction')
 	
+	if failureProCI is not None:
+		for bound, failureProBound in zip(['lower', 'upper'], failureProCI):
+			failureProBound.to_csv('%s/system_failure_CI_%s.tsv' % (outDir, bound), sep = '\t', index_label = '#Reaction')
 	
-def plot_system_failure_probability(failurePro, outDir):
+	
+def plot_system_failure_probability(failurePro, outDir, dpi = 300, fmt = 'jpg', failureProCI = None):
 	'''
 	Parameters
 	failurePro: df, probability of system failure, enzyme in rows, enzyme level in columns
 	outDir: str, output directory
+	dpi: int, resolution of raster figures
+	fmt: str, figure format, 'jpg', 'png', 'svg' or 'pdf'
+	failureProCI: 2-tuple of df, lower and upper bound of bootstrap confidence interval, drawn as a band if provided
 	'''
 	
 	import re
@@ -241,7 +396,7 @@ def plot_system_failure_probability(failurePro, outDir):
 	
 	nEnzyme = failurePro.shape[0]
 	nCol = 3
-	nRow = np.ceil(nEnzyme / nCol)
+	nRow = int(np.ceil(nEnzyme / nCol))
 	
 	#plt.style.use('ggplot')
 	
@@ -257,6 +412,9 @@ def plot_system_failure_probability(failurePro, outDir):
 		
 		ax.semilogx(x, y, color = '#E24A33')
 		
+		if failureProCI is not None:
+			ax.fill_between(x, failureProCI[0].loc[enzyme, :], failureProCI[1].loc[enzyme, :], color = '#E24A33', alpha = 0.3, linewidth = 0)
+		
 		ax.set_xlabel('%s fold change' % enzyme, fontsize = 12)
 		
 		ax.set_xticks([x.min(), 0.5, 1, 2, x.max()])
@@ -270,7 +428,86 @@ def plot_system_failure_probability(failurePro, outDir):
 	
 	plt.suptitle('Probability of system failure', fontsize = 20) 
 	
-	plt.savefig('%s/system_failure.jpg' % outDir, dpi = 300)
+	plt.savefig('%s/system_failure.%s' % (outDir, fmt), dpi = dpi)
+	
+	
+def save_pair_failure_probability(pairFailurePro, directions, outDir):
+	'''
+	Parameters
+	pairFailurePro: dict, pair => df, probability of system failure, direction in rows, fraction of the way in columns
+	directions: df, relative levels of the two enzymes at the end of each direction
+	outDir: str, output directory
+	NOTE maps of all pairs are saved in pair_failure.tsv with enzyme A, enzyme B and angle in rows, directions in pair_directions.tsv
+	'''
+	
+	directions.to_csv('%s/pair_directions.tsv' % outDir, sep = '\t', index_label = '#Angle (degree)')
+	
+	pairFailureProAll = pd.concat(pairFailurePro, names = ['#Enzyme A', 'Enzyme B', 'Angle (degree)'])
+	
+	pairFailureProAll.to_csv('%s/pair_failure.tsv' % outDir, sep = '\t')
+	
+	
+def plot_pair_failure_probability(pairFailurePro, directions, outDir, dpi = 300, fmt = 'jpg'):
+	'''
+	Parameters
+	pairFailurePro: dict, pair => df, probability of system failure, direction in rows, fraction of the way in columns
+	directions: df, relative levels of the two enzymes at the end of each direction
+	outDir: str, output directory
+	dpi: int, resolution of raster figures
+	fmt: str, figure format, 'jpg', 'png', 'svg' or 'pdf'
+	'''
+	
+	import re
+	import platform
+	system = platform.system()
+	if re.search(r'linux', system, flags = re.I):
+		import matplotlib
+		matplotlib.use('agg')
+	import matplotlib.pyplot as plt
+	
+	npairs = len(pairFailurePro)
+	nCol = min(npairs, 3)
+	nRow = int(np.ceil(npairs / nCol))
+	
+	# directions are closed to a loop
+	ends = pd.concat((directions, directions.iloc[:1]))
+	
+	fig = plt.figure(figsize = (nCol * 3.2, nRow * 3))
+	
+	for i, ((enzymeA, enzymeB), failurePro) in enumerate(pairFailurePro.items()):
+		
+		ax = plt.subplot(nRow, nCol, i + 1)
+		
+		fractions = failurePro.columns.values.astype(float)
+		
+		# relative enzyme levels along each direction, drawn in log10 scale
+		x = np.log10(1 + np.outer(ends['A'].values - 1, fractions))
+		y = np.log10(1 + np.outer(ends['B'].values - 1, fractions))
+		c = pd.concat((failurePro, failurePro.iloc[:1])).values
+		
+		mesh = ax.pcolormesh(x, y, c, shading = 'gouraud', cmap = 'Reds', vmin = 0, vmax = 1)
+		
+		ticks = np.log10([directions.values.min(), 1, directions.values.max()])
+		ticklabels = ['%.2g' % 10**tick for tick in ticks]
+		
+		ax.set_xticks(ticks)
+		ax.set_xticklabels(ticklabels)
+		ax.set_yticks(ticks)
+		ax.set_yticklabels(ticklabels)
+		
+		ax.set_xlabel('%s fold change' % enzymeA, fontsize = 12)
+		ax.set_ylabel('%s fold change' % enzymeB, fontsize = 12)
+		
+		ax.set_aspect('equal')
+	
+	plt.subplots_adjust(left = 0.1, bottom = 0.1, right = 0.85, top = 0.9, wspace = 0.5, hspace = 0.5)
+	
+	cax = fig.add_axes([0.88, 0.1, 0.02, 0.8])
+	fig.colorbar(mesh, cax = cax, ticks = [0, 0.5, 1]).ax.set_yticklabels(['0', '50%', '100%'])
+	
+	plt.suptitle('Probability of system failure', fontsize = 20)
+	
+	plt.savefig('%s/pair_failure.%s' % (outDir, fmt), dpi = dpi)
 	
 	
 def save_flux_fold_change(enzymes, fluxChange, outDir):
@@ -285,13 +522,16 @@ def save_flux_fold_change(enzymes, fluxChange, outDir):
 		fluxChange[enzyme].to_csv('%s/flux_change_%s.tsv' % (outDir, enzyme), sep = '\t', index_label = '#Flux change no.')
 	
 	
-def plot_flux_fold_change(enzymes, fluxChange, outDir, fluxBndsShow = (0.1, 10)):
+def plot_flux_fold_change(enzymes, fluxChange, outDir, fluxBndsShow = (0.1, 10), dpi = 300, fmt = 'jpg', ifFast = False):
 	'''
 	Parameters	
 	enzymes: lst, enzyme IDs
 	fluxChange: dict
 	outDir: str, output directory
 	fluxBndsShow: 2-tuple, flux change for show
+	dpi: int, resolution of raster figures
+	fmt: str, figure format, 'jpg', 'png', 'svg' or 'pdf'
+	ifFast: bool, whether to draw heatmaps as images instead of seaborn heatmaps
 	'''
 	
 	import re
@@ -302,11 +542,13 @@ def plot_flux_fold_change(enzymes, fluxChange, outDir, fluxBndsShow = (0.1, 10))
 		matplotlib.use('agg')
 	import matplotlib.pyplot as plt
 	from matplotlib.colors import LinearSegmentedColormap
-	import seaborn as sns
+	
+	if not ifFast:
+		import seaborn as sns
 	
 	nEnzyme = len(enzymes)
 	nCol = 3
-	nRow = np.ceil(nEnzyme / nCol)
+	nRow = int(np.ceil(nEnzyme / nCol))
 	
 	cmap = LinearSegmentedColormap.from_list(name = 'mycolor', colors = [(1,1,1), (31/256,119/256,180/256)], N=10)
 	
@@ -320,7 +562,12 @@ def plot_flux_fold_change(enzymes, fluxChange, outDir, fluxBndsShow = (0.1, 10))
 		ax = plt.subplot(nRow, nCol, ind)
 		
 		
-		sns.heatmap(data, cmap = cmap, ax = ax, cbar = True)
+		if ifFast:
+			im = ax.imshow(data.values, cmap = cmap, aspect = 'auto', interpolation = 'nearest', extent = (0, data.shape[1], data.shape[0], 0))
+			plt.colorbar(im, ax = ax)
+			
+		else:
+			sns.heatmap(data, cmap = cmap, ax = ax, cbar = True)
 		
 		ax.set_xlabel('%s fold change' % enzyme, fontsize = 12)
 		
@@ -339,14 +586,16 @@ def plot_flux_fold_change(enzymes, fluxChange, outDir, fluxBndsShow = (0.1, 10))
 	
 	plt.suptitle('Flux fold change', fontsize = 20) 
 	
-	plt.savefig('%s/flux_change.jpg' % outDir, dpi = 300)	
+	plt.savefig('%s/flux_change.%s' % (outDir, fmt), dpi = dpi)	
 	
 	
-def plot_flux_control_index(ConIdx, outDir):
+def plot_flux_control_index(ConIdx, outDir, dpi = 300, fmt = 'jpg'):
 	'''
 	Parameters
-	ConIdx: df, enyzmes in rows, each cell is the list of flux_control_index
+	ConIdx: df, enyzmes in rows, each cell is a 2-tuple of flux control indices and their counts
 	outDir: str, output directory
+	dpi: int, resolution of raster figures
+	fmt: str, figure format, 'jpg', 'png', 'svg' or 'pdf'
 	'''
 	
 	import re
@@ -364,7 +613,9 @@ def plot_flux_control_index(ConIdx, outDir):
 	x = np.arange(nenzymes)
 	x0 = x - 0.5 * singleWidth
 
-	ConIdxMed = ConIdx.applymap(np.mean)
+	boxStats = ConIdx.applymap(lambda item: get_weighted_boxplot_stats(*item))
+	
+	ConIdxMed = boxStats.applymap(lambda stats: stats['mean'])
 	xticks = ConIdx.index + '\n\n' + ConIdxMed['Up regulation'].round(2).apply(str) + '\n' + ConIdxMed['Down regulation'].round(2).apply(str)
 
 
@@ -376,7 +627,7 @@ def plot_flux_control_index(ConIdx, outDir):
 
 	for i in range(ConIdx.shape[1]):
 		
-		plt.boxplot(ConIdx.iloc[:, i], positions = x0 + i * singleWidth, widths = 0.7*singleWidth, notch = True, patch_artist = True, showmeans = True, meanline = True, meanprops = {'color':'k'}, boxprops = {'facecolor':colors[i]}, showfliers = False)
+		plt.gca().bxp(list(boxStats.iloc[:, i]), positions = x0 + i * singleWidth, widths = 0.7*singleWidth, shownotches = True, patch_artist = True, showmeans = True, meanline = True, meanprops = {'color':'k'}, boxprops = {'facecolor':colors[i]}, showfliers = False)
 
 	plt.xlim((x[0]-0.6, x[-1]+0.6))
 	plt.xticks(x, xticks, fontsize = 15)
@@ -387,10 +638,241 @@ def plot_flux_control_index(ConIdx, outDir):
 		plt.scatter([], [], marker = 's', color = colors[::-1][i], label = ConIdx.columns[::-1][i])   
 	plt.legend(loc = 'center', bbox_to_anchor = (1.2, 0.5), fontsize = 15)
 	
-	plt.savefig('%s/flux_control_index.jpg' % outDir, dpi = 300, bbox_inches = 'tight')
+	plt.savefig('%s/flux_control_index.%s' % (outDir, fmt), dpi = dpi, bbox_inches = 'tight')
+	
+	
+def save_control_coefficients(concConCoes, fluxConCoes, metabs, enzymes, innerEnzymes, modelIDs, outDir):
+	'''
+	Parameters
+	concConCoes: array, concentration control coefficients, in shape of [# of models, # of metabolites, # of enzymes]
+	fluxConCoes: array, flux control coefficients, in shape of [# of models, # of fluxes, # of enzymes], nan for models with singular Jacobian
+	metabs: lst, metabolite IDs
+	enzymes: lst, enzyme IDs
+	innerEnzymes: lst, enzyme IDs excluding _in and _out reactions
+	modelIDs: lst, model IDs
+	outDir: str, output directory
+	
+	Returns
+	ownFluxConCoes: df, control coefficient of each enzyme on its own flux, model in rows, enzyme in columns
+	'''
+	
+	idx = [list(enzymes).index(enz) for enz in innerEnzymes]
+	
+	ownFluxConCoes = pd.DataFrame(fluxConCoes[:, idx, idx], index = np.array(modelIDs) + 1, columns = innerEnzymes)
+	ownFluxConCoes.to_csv('%s/flux_control_coefficients.tsv' % outDir, sep = '\t', index_label = '#Model')
+	
+	ifDefined = ~np.isnan(fluxConCoes).all(axis = (1, 2))
+	
+	fluxMedian = np.median(fluxConCoes[ifDefined], axis = 0) if ifDefined.any() else np.full(fluxConCoes.shape[1:], np.nan)
+	concMedian = np.median(concConCoes[ifDefined], axis = 0) if ifDefined.any() else np.full(concConCoes.shape[1:], np.nan)
+	
+	pd.DataFrame(fluxMedian, index = enzymes, columns = enzymes).to_csv('%s/flux_control_coefficients_median.tsv' % outDir, sep = '\t', index_label = '#Flux')
+	pd.DataFrame(concMedian, index = metabs, columns = enzymes).to_csv('%s/concentration_control_coefficients_median.tsv' % outDir, sep = '\t', index_label = '#Metabolite')
+	
+	return ownFluxConCoes
+	
+	
+def plot_flux_control_coefficients(ownFluxConCoes, outDir, dpi = 300, fmt = 'jpg'):
+	'''
+	Parameters
+	ownFluxConCoes: df, control coefficient of each enzyme on its own flux, model in rows, enzyme in columns
+	outDir: str, output directory
+	dpi: int, resolution of raster figures
+	fmt: str, figure format, 'jpg', 'png', 'svg' or 'pdf'
+	'''
+	
+	import re
+	import platform
+	system = platform.system()
+	if re.search(r'linux', system, flags = re.I):
+		import matplotlib
+		matplotlib.use('agg')
+	import matplotlib.pyplot as plt
+	
+	enzymes = ownFluxConCoes.columns
+	
+	plt.figure(figsize = (enzymes.size * 1, 6))
+	
+	plt.boxplot([ownFluxConCoes[enz].dropna() for enz in enzymes], labels = enzymes, notch = True, patch_artist = True, showfliers = False, boxprops = {'facecolor': 'lightblue'}, medianprops = {'color': 'k'})
+	
+	plt.xticks(fontsize = 15)
+	plt.ylabel('Flux control coefficient', fontsize = 20)
+	
+	plt.savefig('%s/flux_control_coefficients.%s' % (outDir, fmt), dpi = dpi, bbox_inches = 'tight')
+	
+	
+def get_weighted_boxplot_stats(values, counts):
+	'''
+	Parameters
+	values: array, data values
+	counts: array, number of occurrences of each value
+	
+	Returns
+	stats: dict, boxplot statistics as returned by matplotlib.cbook.boxplot_stats for the expanded data, usable by Axes.bxp
+	'''
 	
+	order = np.argsort(values)
+	values = np.asarray(values, dtype = float)[order]
+	counts = np.asarray(counts, dtype = int)[order]
 	
+	values, counts = values[counts > 0], counts[counts > 0]
+	cumCounts = np.cumsum(counts)
+	n = cumCounts[-1] if cumCounts.size else 0
 	
+	if n == 0:
+		return {'med': np.nan, 'q1': np.nan, 'q3': np.nan, 'whislo': np.nan, 'whishi': np.nan, 'mean': np.nan, 'cilo': np.nan, 'cihi': np.nan, 'iqr': np.nan, 'fliers': []}
 	
+	def percentile(q):
+		pos = q / 100 * (n - 1)
+		lo, hi = values[np.searchsorted(cumCounts, [np.floor(pos), np.ceil(pos)], side = 'right')]
+		return lo + (hi - lo) * (pos - np.floor(pos))
 	
+	q1, med, q3 = percentile(25), percentile(50), percentile(75)
+	iqr = q3 - q1
 	
+	inWhisker = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+	
+	stats = {'med': med, 'q1': q1, 'q3': q3, 'iqr': iqr, 'mean': np.sum(values * counts) / n,
+	         'whislo': min(inWhisker.min(), q1), 'whishi': max(inWhisker.max(), q3),
+	         'cilo': med - 1.57 * iqr / np.sqrt(n), 'cihi': med + 1.57 * iqr / np.sqrt(n), 'fliers': []}
+	
+	return stats
+	
+	
+plotNames = ['minimal_driving_forces', 'enzyme_protein_costs', 'robustness_index', 'system_failure', 'flux_change', 'flux_control_index', 'flux_control_coefficients', 'pair_failure']   # figures rendered from saved tables
+
+
+def render_plot(plotName, outDir, plotMode = 'full', fmt = 'jpg', enzymes = None, fluxBnds = (0.1, 10)):
+	'''
+	Parameters
+	plotName: str, figure in plotNames
+	outDir: str, output directory where the tables were saved
+	plotMode: str, 'fast' for low resolution and simplified drawing, 'full' for publication quality
+	fmt: str, figure format, 'jpg', 'png', 'svg' or 'pdf'
+	enzymes: lst, enzyme IDs, required by 'flux_change' and 'flux_control_index'
+	fluxBnds: 2-tuple, relative bounds of flux change, required by 'flux_change' and 'flux_control_index'
+	
+	Returns
+	plotName: str, figure rendered
+	'''
+	
+	import os
+	from constants import plotDpis
+	
+	if plotName not in plotNames:
+		raise ValueError('unknown figure %s, available: %s' % (plotName, ', '.join(plotNames)))
+	
+	dpi = plotDpis[plotMode]
+	
+	if plotName == 'minimal_driving_forces':
+		allDeltaGs = pd.read_csv('%s/minimal_driving_forces.tsv' % outDir, sep = '\t', index_col = 0)
+		
+		plot_cumulative_deltaGs(allDeltaGs.iloc[:, 1], allDeltaGs.iloc[:, 0], outDir, dpi, fmt)
+		
+	elif plotName == 'enzyme_protein_costs':
+		optEnzyCosts = pd.read_csv('%s/enzyme_protein_costs.tsv' % outDir, sep = '\t', index_col = 0).iloc[:, 0]
+		
+		plot_enzyme_costs(optEnzyCosts.drop('Total') / 1000, outDir, dpi, fmt)   # MW in kDa
+		
+	elif plotName == 'robustness_index':
+		robustIdx = pd.read_csv('%s/robustness_index.tsv' % outDir, sep = '\t', index_col = 0).iloc[:, 0]
+		
+		if os.path.exists('%s/robustness_index_CI.tsv' % outDir):
+			robustIdxCI = pd.read_csv('%s/robustness_index_CI.tsv' % outDir, sep = '\t', index_col = 0)
+			
+		else:
+			robustIdxCI = None
+		
+		plot_robustness_index(robustIdx, outDir, dpi, fmt, robustIdxCI)
+		
+	elif plotName == 'system_failure':
+		failurePro = pd.read_csv('%s/system_failure.tsv' % outDir, sep = '\t', index_col = 0)
+		failurePro.columns = failurePro.columns.astype(float)
+		
+		if all(os.path.exists('%s/system_failure_CI_%s.tsv' % (outDir, bound)) for bound in ['lower', 'upper']):
+			failureProCI = [pd.read_csv('%s/system_failure_CI_%s.tsv' % (outDir, bound), sep = '\t', index_col = 0) for bound in ['lower', 'upper']]
+			
+			for failureProBound in failureProCI: failureProBound.columns = failurePro.columns
+			
+		else:
+			failureProCI = None
+		
+		plot_system_failure_probability(failurePro, outDir, dpi, fmt, failureProCI)
+		
+	elif plotName == 'pair_failure':
+		directions = pd.read_csv('%s/pair_directions.tsv' % outDir, sep = '\t', index_col = 0)
+		
+		pairFailureProAll = pd.read_csv('%s/pair_failure.tsv' % outDir, sep = '\t', index_col = [0, 1, 2])
+		
+		pairFailurePro = {pair: failurePro.droplevel([0, 1]) for pair, failurePro in pairFailureProAll.groupby(level = [0, 1], sort = False)}
+		
+		plot_pair_failure_probability(pairFailurePro, directions, outDir, dpi, fmt)
+		
+	elif plotName == 'flux_control_coefficients':
+		ownFluxConCoes = pd.read_csv('%s/flux_control_coefficients.tsv' % outDir, sep = '\t', index_col = 0)
+		
+		plot_flux_control_coefficients(ownFluxConCoes, outDir, dpi, fmt)
+		
+	else:
+		fluxChange = {}
+		for enzyme in enzymes:
+			fluxChange[enzyme] = pd.read_csv('%s/flux_change_%s.tsv' % (outDir, enzyme), sep = '\t', index_col = 0)
+			fluxChange[enzyme].columns = fluxChange[enzyme].columns.astype(float)
+		
+		if plotName == 'flux_change':
+			plot_flux_fold_change(enzymes, fluxChange, outDir, fluxBnds, dpi, fmt, plotMode == 'fast')
+			
+		else:
+			from robustness import calculate_flux_control_index
+			
+			plot_flux_control_index(calculate_flux_control_index(fluxChange, enzymes, fluxBnds), outDir, dpi, fmt)
+	
+	import matplotlib.pyplot as plt
+	
+	plt.close('all')
+	
+	return plotName
+	
+	
+def submit_plots(pool, plotNames, outDir, plotMode = 'full', fmt = 'jpg', **kwargs):
+	'''
+	Parameters
+	pool: multiprocessing Pool, process pool rendering figures
+	plotNames: lst, figures in plotNames
+	outDir: str, output directory where the tables were saved
+	plotMode: str, 'fast' or 'full'
+	fmt: str, figure format, 'jpg', 'png', 'svg' or 'pdf'
+	kwargs: enzymes and fluxBnds passed to render_plot
+	
+	Returns
+	plotJobs: lst of AsyncResult, call get to wait for the figures
+	NOTE the tables must be saved before figures are submitted, rendering runs concurrently with the remaining analysis
+	'''
+	
+	plotJobs = []
+	for plotName in plotNames:
+		
+		res = pool.apply_async(func = render_plot, args = (plotName, outDir, plotMode, fmt), kwds = kwargs)
+		
+		plotJobs.append(res)
+	
+	return plotJobs
+	
+	
+def wait_plots(pool, plotJobs):
+	'''
+	Parameters
+	pool: multiprocessing Pool, process pool rendering figures
+	plotJobs: lst of AsyncResult
+	NOTE figures failed to render are reported without raising, tables are already saved
+	'''
+	
+	pool.close()
+	pool.join()
+	
+	for res in plotJobs:
+		try:
+			res.get()
+		
+		except Exception as e:
+			print('figure failed to render, %s: %s' % (type(e).__name__, e))
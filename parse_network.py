@@ -175,51 +175,193 @@ def get_full_stoichiometric_matrix(S, metabInfo):
 	return SFull
 
 
-def get_steady_state_net_fluxes(S, enzymeInfo, metabInfo, speEnz = None, speFlux = None):		
+def prune_network(S, Vss):
+	'''
+	Parameters
+	S: df, stoichiometric matrix, metabolite in rows, reaction in columns (including input and output reactions)
+	Vss: ser, net fluxes in steady state
+	
+	Returns
+	Spruned: df, S without blocked reactions and orphan metabolites
+	blockedRxns: lst, reactions with zero flux in steady state (|v| <= zeroFluxTol * max|v|)
+	orphanMetabs: lst, metabolites left in no reaction
+	NOTE removing blocked reactions keeps the steady state, so no dead end is left among the remaining reactions. linear chains are 
+	not collapsed since the generalized rate law of a chain is not that of a single reaction
+	NOTE reactions without a steady state flux are not taken as blocked, e.g. input and output reactions of metabolites excluded from mass 
+	balance (-eb) but not from optimization (-eo), they raise an error since every reaction of the model needs a reference flux
+	'''
+	
+	from constants import zeroFluxTol
+	
+	missingRxns = [rxn for rxn in S.columns if rxn not in Vss.index]
+	
+	if missingRxns:
+		raise ValueError('no steady state flux for reactions %s, metabolites excluded from mass balance (-eb) should be excluded from optimization (-eo) as well' % ', '.join(missingRxns))
+	
+	fluxes = Vss[S.columns].abs()
+	
+	blockedRxns = fluxes.index[fluxes <= zeroFluxTol * fluxes.max()].tolist()
+	
+	Spruned = S.drop(columns = blockedRxns)
+	
+	orphanMetabs = Spruned.index[(Spruned == 0).all(axis = 1)].tolist()
+	
+	Spruned = Spruned.drop(index = orphanMetabs)
+	
+	return Spruned, blockedRxns, orphanMetabs
+	
+	
+def get_conservation_relations(S):
+	'''
+	Parameters
+	S: df, stoichiometric matrix, metabolite in rows, reaction in columns (including input and output reactions)
+	
+	Returns
+	L: df, link matrix, metabolite in rows, independent metabolite in columns, X = L*Xi + constant, i.e. dX = L*dXi
+	G: df, conservation relations (left null space of S, G*S = 0), conserved moiety in rows, metabolite in columns, G*X is constant
+	NOTE independent metabolites are rows of S picked by QR with column pivoting of S', the reduced stoichiometric matrix is S.loc[L.columns] 
+	and S = L*S.loc[L.columns]. the reduced Jacobian S.loc[L.columns]*dVdX*L is nonsingular unless the kinetics is degenerate
+	'''
+	
+	from scipy.linalg import qr
+	
+	Sv = S.values.astype(float)
+	
+	Q, R, piv = qr(Sv.T, mode = 'economic', pivoting = True)
+	
+	diagR = np.abs(np.diag(R))
+	rank = int(np.sum(diagR > diagR.max() * max(Sv.shape) * np.finfo(float).eps)) if diagR.size else 0
+	
+	indep = np.sort(piv[:rank])
+	dep = np.sort(piv[rank:])
+	
+	# dependent rows as combinations of independent ones, S[dep] = L0*S[indep]
+	L0 = np.linalg.lstsq(Sv[indep].T, Sv[dep].T, rcond = None)[0].T
+	L0 = np.round(L0, 10) + 0.0
+	
+	L = pd.DataFrame(0.0, index = S.index, columns = S.index[indep])
+	L.iloc[indep, :] = np.eye(rank)
+	L.iloc[dep, :] = L0
+	
+	G = pd.DataFrame(0.0, index = range(1, dep.size + 1), columns = S.index)
+	G.iloc[:, dep] = np.eye(dep.size)
+	G.iloc[:, indep] = -L0
+	
+	return L, G
+	
+	
+def factorize_balance_system(S, enzymeInfo, metabInfo):
 	'''
 	Parameters
 	S: df, stoichiometric matrix, metabolite in rows, reaction in columns. negative for substrates, positive for products 
 	enzymeInfo: df, reaction in rows
 	metabInfo: ser, metabolite in index, values are 0 (inner metabolite) or -1 (initial substrate) or 1 (final product)
-	speEnz: str, enzyme specified as initial enzyme
-	speFlux: float, flux specified as initial flux
 	
 	Returns
-	Vss: ser, net fluxes in steady state (including in and out fluxes)	
+	Vunit: ser, net fluxes in steady state (including in and out fluxes) with influx of the first initial substrate set to 1
+	NOTE the flux distribution must be unique up to a scale, i.e. the null space of S one dimensional. The least squares problem 
+	[S; e']*v = [0; 1], with e the unit vector of the reference influx, is solved by sparse LU of its augmented system [I, A; A', 0], 
+	which stays sparse and does not square the condition number of A = [S; e'] as the normal equations do. The system is singular if 
+	the null space has more than one dimension (e.g. cyclic pathways with too few initial substrates and end products specified) or the 
+	reference influx can not carry flux, detected by the 1-norm condition number of the augmented system (estimated by onenormest)
 	'''
 	
-	import re
-	from scipy.optimize import lsq_linear
+	from scipy.sparse import csc_matrix, bmat, identity
+	from scipy.sparse.linalg import splu, norm, onenormest, LinearOperator
+	
+	iniSubs = [metab for metab in S.index if metabInfo.loc[metab] == -1]
+	refRxn = iniSubs[0] + '_in'
+	
+	Ssp = csc_matrix(S.values, dtype = float)
 	
-	# make new S to solve all net fluxes
-	Snew = S.copy(deep = 'all')
+	e = np.zeros(S.shape[1])
+	e[S.columns.get_loc(refRxn)] = 1.0
 	
-	if speEnz:
-		Snew.loc[speEnz, speEnz] = 1.0
+	A = bmat([[Ssp], [csc_matrix(e)]], format = 'csc')
+	nrows, ncols = A.shape
+	
+	K = bmat([[identity(nrows), A], [A.T, None]], format = 'csc')
+	
+	b = np.zeros(nrows + ncols)
+	b[nrows - 1] = 1.0
+	
+	errMsg = 'steady state fluxes are underdetermined (or %s can not carry flux), check initial substrates and end products' % refRxn
+	
+	try:
+		lu = splu(K)
 		
-	else:	
-		iniSubs = [metab for metab in S.index if metabInfo.loc[metab] == -1]	
+	except RuntimeError:   # exactly singular
+		raise ValueError(errMsg)
+	
+	condK = norm(K, 1) * onenormest(LinearOperator(K.shape, matvec = lu.solve, rmatvec = lambda x: lu.solve(x, trans = 'T'), dtype = float))
+	
+	if not np.isfinite(condK) or condK > 1e12:
+		raise ValueError(errMsg)
+	
+	v = lu.solve(b)[nrows:]
+	
+	if np.abs(Ssp.dot(v)).max() > 1e-8 * np.abs(v).max() or abs(v[e == 1][0] - 1) > 1e-8:
+		raise ValueError('no steady state carries flux through %s, check initial substrates and end products' % refRxn)
+	
+	Vunit = pd.Series(v, index = S.columns)
+	
+	return Vunit
+	
+	
+def get_steady_state_net_fluxes_batch(S, enzymeInfo, metabInfo, assignments):
+	'''
+	Parameters
+	S: df, stoichiometric matrix, metabolite in rows, reaction in columns. negative for substrates, positive for products 
+	enzymeInfo: df, reaction in rows
+	metabInfo: ser, metabolite in index, values are 0 (inner metabolite) or -1 (initial substrate) or 1 (final product)
+	assignments: lst of tuple (speEnz, speFlux), speEnz None for influx to pathway set to 1
+	
+	Returns
+	Vsss: df, net fluxes in steady state (including in and out fluxes), reaction in rows, assignment in columns (same order with assignments)
+	NOTE the balance system is factorized once and all assignments are solved as scalings of the same unit flux distribution
+	'''
+	
+	Vunit = factorize_balance_system(S, enzymeInfo, metabInfo)
+	
+	scales = []
+	for speEnz, speFlux in assignments:
+		if speEnz:
+			if abs(Vunit[speEnz]) <= 1e-10:
+				raise ValueError('%s carries no flux in steady state, flux can not be assigned to it' % speEnz)
+				
+			scales.append(speFlux / Vunit[speEnz])
 			
-		Snew.loc[iniSubs[0] + '_in', iniSubs[0] + '_in'] = 1.0	
-
-	Snew = Snew.replace(np.nan, 0)	
+		else:
+			scales.append(1.0)
 	
-	# solve all net fluxes
-	beq = np.zeros(Snew.shape[0])
-		
-	if speEnz:
-		beq[-1] = speFlux
+	Vsss = pd.DataFrame(np.outer(Vunit.values, scales), index = S.columns, columns = range(len(assignments)))
+	Vsss[Vsss.abs() <= 1e-12] = 0
+	
+	irrRxns = [r for r in S.columns if r not in enzymeInfo.index or enzymeInfo.loc[r, 'rev'] == 0]
 	
-	else:		
-		beq[-1] = 1.0   
+	ifInfeasible = (Vsss.loc[irrRxns, :] < 0).any(axis = 0)
+	if ifInfeasible.any():
+		speEnz, speFlux = assignments[np.where(ifInfeasible)[0][0]]
+		raise ValueError('flux assignment %s:%s drives irreversible reactions %s backwards' % (speEnz, speFlux, ','.join(Vsss.index[Vsss.loc[:, np.where(ifInfeasible)[0][0]] < 0].intersection(irrRxns))))
 	
-	lbs = [0 if (r not in enzymeInfo.index or enzymeInfo.loc[r, 'rev'] == 0) else -np.inf for r in Snew.columns]   
+	return Vsss
 	
-	bnds = (lbs, np.inf)
 	
-	fluxes = lsq_linear(Snew.values, beq, bounds = bnds).x   
+def get_steady_state_net_fluxes(S, enzymeInfo, metabInfo, speEnz = None, speFlux = None):		
+	'''
+	Parameters
+	S: df, stoichiometric matrix, metabolite in rows, reaction in columns. negative for substrates, positive for products 
+	enzymeInfo: df, reaction in rows
+	metabInfo: ser, metabolite in index, values are 0 (inner metabolite) or -1 (initial substrate) or 1 (final product)
+	speEnz: str, enzyme specified as initial enzyme
+	speFlux: float, flux specified as initial flux
+	
+	Returns
+	Vss: ser, net fluxes in steady state (including in and out fluxes)	
+	'''
 	
-	Vss = pd.Series(fluxes.reshape(-1), index = Snew.columns)
+	Vss = get_steady_state_net_fluxes_batch(S, enzymeInfo, metabInfo, [(speEnz, speFlux)]).iloc[:, 0]
+	Vss.name = None
 	
 	return Vss
 	
@@ -238,14 +380,52 @@ def read_concentrations(concFile):
 	return Concs
 	
 	
+def read_covariance(covFile):
+	'''
+	Parameters
+	covFile: str, covariance matrix file of ΔrG'm, (kJ/mol)^2, first row and first column are reaction IDs
+	
+	Returns
+	cov: df, covariance matrix, reaction in rows and columns
+	'''
 	
+	cov = pd.read_csv(covFile, sep = '\t', header = 0, index_col = 0)
 	
+	if not cov.index.equals(cov.columns):
+		raise ValueError('rows and columns of covariance file %s do not match' % covFile)
 	
+	return cov
 	
 	
+def read_scenarios(scenarioFile, deftConcLB, deftConcUB, deftAssignFlux = ''):
+	'''
+	Parameters
+	scenarioFile: str, scenario file, fields: Scenario ID, concentration bounds "lb,ub", metabolite bounds "metabolite:lb,ub;..." and assigned flux "enzyme ID:value", 
+	the last three are optional
+	deftConcLB: float, default concentration lower bound (mM) for all metabolites
+	deftConcUB: float, default concentration upper bound (mM) for all metabolites
+	deftAssignFlux: str, default assigned flux in the format "enzyme ID:value", '' for influx to pathway set to 1
 	
+	Returns
+	scenarios: df, scenario in rows, columns are 'concLB', 'concUB', 'metabBnds' (dict, metabolite => (lb, ub)) and 'assignFlux'
+	'''
 	
+	inputs = pd.read_csv(scenarioFile, sep = '\t', header = None, index_col = 0, names = ['id', 'concBnds', 'metabBnds', 'assignFlux'], comment = '#', na_filter = False, dtype = str)
 	
+	scenarios = pd.DataFrame(index = inputs.index, columns = ['concLB', 'concUB', 'metabBnds', 'assignFlux'], dtype = object)
 	
+	for scenario in inputs.index:
 	
+		concBndsStr, metabBndsStr, assignFlux = inputs.loc[scenario, ['concBnds', 'metabBnds', 'assignFlux']]
+		
+		concLB, concUB = map(float, concBndsStr.split(',')) if concBndsStr else (deftConcLB, deftConcUB)
+		
+		metabBnds = {}
+		for item in filter(None, metabBndsStr.split(';')):
+			metab, bndsStr = item.split(':')
+			metabBnds[metab] = tuple(map(float, bndsStr.split(',')))
+		
+		scenarios.loc[scenario, ['concLB', 'concUB', 'assignFlux']] = [concLB, concUB, assignFlux or deftAssignFlux]
+		scenarios.at[scenario, 'metabBnds'] = metabBnds
 	
+	return scenarios
@@ -13,47 +13,115 @@ import pandas as pd
 
 
 
+def get_continuation_diagnostics(results):
+	'''
+	Parameters
+	results: dict, simulation results from ensemble models
+	
+	Returns
+	diagnostics: df, one row for each model, enzyme and direction, columns are 'Model', 'Enzyme', 'Direction', 'Steps', 'Termination', 
+	'Max eigenvalue' and 'Condition number' (at exit)
+	'''
+	
+	rows = []
+	for enzyme, resultsPerEnzyme in results.items():
+		for resulti in resultsPerEnzyme:
+			for direction, diagnosticsi in zip(['down', 'up'], resulti[4:6]):
+				rows.append([diagnosticsi['model'], enzyme, direction, diagnosticsi['steps'], diagnosticsi['termination'], diagnosticsi['max eigenvalue'], diagnosticsi['condition number']])
+	
+	diagnostics = pd.DataFrame(rows, columns = ['Model', 'Enzyme', 'Direction', 'Steps', 'Termination', 'Max eigenvalue', 'Condition number'])
+	
+	return diagnostics
+	
+	
+def get_robustness_per_model(results, enzymesInner):
+	'''
+	Parameters
+	results: dict
+	enzymesInner: lst, enzyme IDs with initial and final reaction
+	
+	Returns
+	Ss: array, robustness index Si, model in rows, enzyme in columns
+	stepsDown: array, # of steps completed with decreased enzyme level, in the same shape with Ss
+	stepsUp: array, # of steps completed with increased enzyme level, in the same shape with Ss
+	NOTE robustness index and probability of system failure are means of these over models
+	'''
+	
+	from scipy.stats import lognorm
+	
+	nmodels = len(results[enzymesInner[0]])
+	
+	Erefs = np.zeros((nmodels, len(enzymesInner)))
+	LBs = np.zeros((nmodels, len(enzymesInner)))
+	UBs = np.zeros((nmodels, len(enzymesInner)))
+	stepsDown = np.zeros((nmodels, len(enzymesInner)), dtype = int)
+	stepsUp = np.zeros((nmodels, len(enzymesInner)), dtype = int)
+	for j, enzyme in enumerate(enzymesInner):
+		
+		if nmodels == 0: continue
+		
+		row = results[enzyme][0][0].index.get_loc(enzyme)
+		
+		Eouts2 = [resulti[0].values for resulti in results[enzyme]]
+		Eouts1 = [resulti[1].values for resulti in results[enzyme]]
+		
+		# feasible LB and UB of enzyme level
+		Erefs[:, j] = [Eout2[row, 0] for Eout2 in Eouts2]
+		LBs[:, j] = [Eout2[row, -1] for Eout2 in Eouts2]
+		UBs[:, j] = [Eout1[row, -1] for Eout1 in Eouts1]
+		
+		stepsDown[:, j] = [Eout2.shape[1] - 1 for Eout2 in Eouts2]
+		stepsUp[:, j] = [Eout1.shape[1] - 1 for Eout1 in Eouts1]
+	
+	# probability of maintaining stability, ln(E) ~ N(ln(Eref), 0.5)
+	ps = lognorm.cdf(UBs, s = 0.5, scale = Erefs) - lognorm.cdf(LBs, s = 0.5, scale = Erefs)
+	ps[ps <= 0] = 0.0001
+	
+	Ss = -ps * np.log(ps)
+	
+	return Ss, stepsDown, stepsUp
+	
+	
+def get_failure_matrices(nsteps, enzymeLB, enzymeUB):
+	'''
+	Parameters
+	nsteps: int, # of integration steps
+	enzymeLB: float, lower bound of relative enzyme level
+	enzymeUB: float, upper bound of relative enzyme level
+	
+	Returns
+	ERange: array, relative enzyme levels of probability of system failure
+	failsDown: array, whether a model fails, # of steps completed with decreased enzyme level in rows, levels in ERange[:nsteps + 1] in columns
+	failsUp: array, whether a model fails, # of steps completed with increased enzyme level in rows, levels in ERange[nsteps + 1:] in columns
+	'''
+	
+	ERange = np.concatenate((np.linspace(enzymeLB, 1, nsteps + 1), np.linspace(1, enzymeUB, nsteps + 1)[1:]))
+	
+	steps = np.arange(nsteps + 1)
+	
+	feasibleLBs = 1 - steps * (1 - enzymeLB) / nsteps
+	feasibleUBs = 1 + steps * (enzymeUB - 1) / nsteps
+	
+	failsDown = (ERange[:nsteps + 1] < feasibleLBs[:, None]).astype(float)
+	failsUp = (ERange[nsteps + 1:] > feasibleUBs[:, None]).astype(float)
+	
+	return ERange, failsDown, failsUp
+	
+	
 def calculate_robustness_index(results, enzymesInner, nsteps):
 	'''
 	Parameters
 	results: dict
 	enzymesInner: lst, enzyme IDs with initial and final reaction
 	nsteps: int, # of integration steps
-	enzymeLBs: ser, lower bounds of enzyme level
-	enzymeUBs: ser, upper bounds of enzyme level
 		
 	Returns
-	robustIdx: ser, median of robustness index Si for each enzyme
+	robustIdx: ser, mean of robustness index Si over models for each enzyme
 	'''
 	
-	from scipy.stats import lognorm
-	
-	robustIdx = pd.Series(index = enzymesInner)
-	for enzyme in robustIdx.index:
+	Ss = get_robustness_per_model(results, enzymesInner)[0]
 	
-		Ss = []
-		for i in range(len(results[enzyme])):
-			
-			resulti = results[enzyme][i]
-				
-			# feasible LB and UB of enzyme level
-			Eref = resulti[0].loc[enzyme, resulti[0].columns[0]]
-			
-			LB = resulti[0].loc[enzyme, resulti[0].columns[-1]]
-			UB = resulti[1].loc[enzyme, resulti[1].columns[-1]]
-			
-			# calculate the probability of maintaining stability
-			p = lognorm.cdf(UB, s = 0.5, scale = Eref) - lognorm.cdf(LB, s = 0.5, scale = Eref)   # ln(E) ~ N(ln(Eref), 0.5)
-			
-			# calculate the robustness index
-			if p <= 0: p = 0.0001   
-				
-			S = -p * np.log(p)	
-			#S = p
-				
-			Ss.append(S)	
-				
-		robustIdx.loc[enzyme] = np.mean(Ss)
+	robustIdx = pd.Series(Ss.mean(axis = 0), index = enzymesInner)
 		
 	return robustIdx
 
@@ -70,52 +138,144 @@ def calculate_system_failure_probability(results, enzymesInner, nsteps, nmodels,
 	
 	Returns
 	failurePro: df, probability of system failure, enzyme in rows, enzyme level in columns
+	NOTE a model fails at enzyme levels beyond its feasible range, i.e. the # of steps completed
 	'''
-
-	ERange = np.concatenate((np.linspace(enzymeLB, 1, nsteps + 1), np.linspace(1, enzymeUB, nsteps + 1)[1:]))
 	
-	failurePro = pd.DataFrame(index = enzymesInner, columns = ERange)	
-	for enzyme in failurePro.index:
+	stepsDown, stepsUp = get_robustness_per_model(results, enzymesInner)[1:]
+	
+	ERange, failsDown, failsUp = get_failure_matrices(nsteps, enzymeLB, enzymeUB)
 	
-		nmodels = len(results[enzyme])
+	failurePro = pd.DataFrame(index = enzymesInner, columns = ERange, dtype = float)
+	for j, enzyme in enumerate(enzymesInner):
+		
+		# # of models by steps completed
+		countsDown = np.bincount(stepsDown[:, j], minlength = nsteps + 1)
+		countsUp = np.bincount(stepsUp[:, j], minlength = nsteps + 1)
 		
-		# count for decreased enzyme level
-		for Elevel in failurePro.columns[:nsteps + 1]:
+		failurePro.loc[enzyme] = np.concatenate((countsDown @ failsDown, countsUp @ failsUp)) / stepsDown.shape[0]
 			
-			count = 0
-			for	i in range(nmodels):
+	return failurePro
 
-				Elength = results[enzyme][i][0].shape[1]
-				feasibleLB = 1 - (Elength - 1) * (1 - enzymeLB) / nsteps
-				
-				if Elevel >= feasibleLB: count += 1
+
+def calculate_bootstrap_intervals(results, enzymesInner, nsteps, enzymeLB, enzymeUB, nboots = 2000, level = 0.95, seed = None):
+	'''
+	Parameters
+	results: dict
+	enzymesInner: lst, enzyme IDs with initial and final reaction
+	nsteps: int, # of integration steps
+	enzymeLB: float, lower bound of relative enzyme level
+	enzymeUB: float, upper bound of relative enzyme level
+	nboots: int, # of bootstrap resamples of models
+	level: float, confidence level
+	seed: int, random seed of resampling
+	
+	Returns
+	robustIdxCI: df, percentile bootstrap confidence interval of robustness index, enzyme in rows, 'Lower' and 'Upper' in columns
+	failureProLower: df, lower bound of confidence interval of probability of system failure, enzyme in rows, enzyme level in columns
+	failureProUpper: df, upper bound, in the same shape with failureProLower
+	NOTE resamples are drawn as arrays of model indices in chunks, the probability of system failure of a resample is obtained from the 
+	counts of models by steps completed
+	'''
+	
+	Ss, stepsDown, stepsUp = get_robustness_per_model(results, enzymesInner)
+	
+	ERange, failsDown, failsUp = get_failure_matrices(nsteps, enzymeLB, enzymeUB)
+	
+	nmodels, nenzymes = Ss.shape
+	
+	rng = np.random.default_rng(seed)
+	
+	# chunks of resamples of about 1e7 model draws
+	chunkSize = max(int(1e7 // max(nmodels * nenzymes, 1)), 1)
+	
+	robustIdxBoots = np.zeros((nboots, nenzymes))
+	failureProBoots = np.zeros((nboots, nenzymes, ERange.size))
+	for start in range(0, nboots, chunkSize):
 		
-			failurePro.loc[enzyme, Elevel] = 1 - count / nmodels
-			
-		# count for increased enzyme level
-		for Elevel in failurePro.columns[nsteps + 1:]:
-			
-			count = 0
-			for i in range(nmodels):
-				
-				Elength = results[enzyme][i][1].shape[1]
-				feasibleUB = 1 + (Elength - 1) * (enzymeUB - 1) / nsteps
-				
-				if Elevel <= feasibleUB: count += 1
-				
-			failurePro.loc[enzyme, Elevel] = 1 - count / nmodels
-			
-	return failurePro	
+		stop = min(start + chunkSize, nboots)
+		
+		idx = rng.integers(0, nmodels, (stop - start, nmodels))
+		
+		robustIdxBoots[start:stop] = Ss[idx].mean(axis = 1)
+		
+		# counts of models by steps completed in each resample and enzyme, flattened to (resample, enzyme, steps)
+		offsets = (np.arange(stop - start)[:, None, None] * nenzymes + np.arange(nenzymes)) * (nsteps + 1)
+		
+		countsDown = np.bincount((offsets + stepsDown[idx]).ravel(), minlength = (stop - start) * nenzymes * (nsteps + 1)).reshape(stop - start, nenzymes, nsteps + 1)
+		countsUp = np.bincount((offsets + stepsUp[idx]).ravel(), minlength = (stop - start) * nenzymes * (nsteps + 1)).reshape(stop - start, nenzymes, nsteps + 1)
+		
+		failureProBoots[start:stop] = np.concatenate((countsDown @ failsDown, countsUp @ failsUp), axis = 2) / nmodels
+	
+	quantiles = [(1 - level) / 2 * 100, (1 + level) / 2 * 100]
+	
+	robustIdxCI = pd.DataFrame(np.percentile(robustIdxBoots, quantiles, axis = 0).T, index = enzymesInner, columns = ['Lower', 'Upper'])
+	
+	failureProLower, failureProUpper = [pd.DataFrame(bound, index = enzymesInner, columns = ERange) for bound in np.percentile(failureProBoots, quantiles, axis = 0)]
+	
+	return robustIdxCI, failureProLower, failureProUpper
+
+
+def get_bootstrap_halfwidths(results, enzymesInner, nsteps, enzymeLB, enzymeUB, nboots = 200, seed = None):
+	'''
+	Parameters
+	results: dict
+	enzymesInner: lst, enzyme IDs with initial and final reaction
+	nsteps: int, # of integration steps
+	enzymeLB: float, lower bound of relative enzyme level
+	enzymeUB: float, upper bound of relative enzyme level
+	nboots: int, # of bootstrap resamples of models
+	seed: int, random seed of resampling
+	
+	Returns
+	halfWidths: dict, 'robustness index' and 'system failure' => max half width of 95% bootstrap confidence intervals over enzymes
+	(and enzyme levels)
+	NOTE used to decide whether an ensemble is large enough, see main2.py --tolerance
+	'''
+	
+	robustIdxCI, failureProLower, failureProUpper = calculate_bootstrap_intervals(results, enzymesInner, nsteps, enzymeLB, enzymeUB, nboots, seed = seed)
+	
+	halfWidths = {'robustness index': float((robustIdxCI['Upper'] - robustIdxCI['Lower']).max() / 2),
+	              'system failure': float((failureProUpper - failureProLower).values.max() / 2)}
+	
+	return halfWidths
+	
+	
+def calculate_pair_failure_probability(pairSteps, pairs, directions, nsteps):
+	'''
+	Parameters
+	pairSteps: array, steps completed, model, pair and direction in the 3 axes, see ensemble_models.simulate_pair_perturbation
+	pairs: lst of 2-tuple, enzyme pairs
+	directions: df, relative levels of the two enzymes at the end of each direction, see ensemble_models.get_pair_directions
+	nsteps: int, # of integration steps
 	
+	Returns
+	pairFailurePro: dict, pair => df, probability of system failure, direction (angle) in rows, fraction of the way to the end of 
+	direction in columns
+	NOTE a model fails beyond the steps completed in a direction
+	'''
+	
+	nmodels = pairSteps.shape[0]
+	
+	pairFailurePro = {}
+	for p, pair in enumerate(pairs):
+		
+		# # of models by steps completed in each direction, models fail at step k if fewer than k steps completed
+		counts = np.apply_along_axis(np.bincount, 0, pairSteps[:, p, :], minlength = nsteps + 1)
+		
+		failurePro = np.vstack((np.zeros(directions.shape[0]), np.cumsum(counts, axis = 0)[:-1])) / nmodels
+		
+		pairFailurePro[pair] = pd.DataFrame(failurePro.T, index = directions.index, columns = np.arange(nsteps + 1) / nsteps)
 	
-def flux_change_calculation_enzymeDOWN_worker(ifReal, enzyme, enzymes, Smetab2rnx, ensembleModels, Vss, results, fluxRange, ERangeDown, nsteps, enzymeLB, nwindows):
+	return pairFailurePro
+	
+	
+def flux_change_calculation_enzymeDOWN_worker(ifReal, enzyme, enzymes, rateLawArrays, Vss, results, fluxRange, ERangeDown, nsteps, enzymeLB, nwindows):
 	'''
 	Parameters	
 	ifReal: str, whether using real values, 'yes' or 'no'	
 	enzyme: str, enzyme ID
 	enzymes: lst, enzyme IDs
-	Smetab2rnx: df, transforme X to metabolites needed in each reaction
-	ensembleModels: lst
+	rateLawArrays: dict of arrays, rate law arrays of ensemble models, see utilities.get_rate_law_arrays
 	Vss: ser, fluxes in steady state
 	results: dict
 	fluxRange: array, range of flux change
@@ -126,37 +286,17 @@ def flux_change_calculation_enzymeDOWN_worker(ifReal, enzyme, enzymes, Smetab2rn
 	
 	Returns
 	fluxChangeEdown: dict
+	NOTE fluxes of all models reaching an enzyme level are calculated at once by utilities.get_rate_law_derivatives
 	'''
 	
-	from utilities import get_V
-	from common_rate_laws import v_expression
-	
 	fluxChangeEdown = pd.DataFrame(index = range(nwindows), columns = ERangeDown)
-			
-	nmodels = len(results[enzyme])	
-
+	
 	# stats for decreased enzyme level
 	for Elevel in fluxChangeEdown.columns:
 		
 		colID = int(round((1 - Elevel) * nsteps / (1 - enzymeLB), 0))
 		
-		# calculate all flux changes	
-		fluxChangeThisEnzyme = []
-		for i in range(nmodels):
-		
-			if results[enzyme][i][0].shape[1] < colID + 1: continue    
-	
-			reverses, kcats, subConcss, subCoess, subKmss, proConcss, proCoess, proKmss, Keqs = ensembleModels[i]	
-			
-			Enew = results[enzyme][i][0].loc[:, colID]
-			
-			Xnew = results[enzyme][i][2].loc[:, colID]
-			
-			Vnew = get_V(Smetab2rnx, v_expression, Enew, Xnew, reverses, kcats, subCoess, subKmss, proCoess, proKmss, Keqs)
-			if ifReal == 'yes': Vnew = Vnew * 3600   # V in mmol/gCDW/h for real values
-			Vnew = pd.Series(np.array(Vnew).reshape(-1).astype(np.float), index = enzymes)	
-			
-			fluxChangeThisEnzyme.append(Vnew[enzyme] / Vss[enzyme])
+		fluxChangeThisEnzyme = get_flux_change(ifReal, enzyme, enzymes, rateLawArrays, Vss, results[enzyme], 0, 2, colID)
 		
 		# get the histogram of flux changes
 		fluxChangeEdown.loc[:, Elevel] = np.histogram(fluxChangeThisEnzyme, bins = fluxRange)[0][::-1]   
@@ -164,14 +304,13 @@ def flux_change_calculation_enzymeDOWN_worker(ifReal, enzyme, enzymes, Smetab2rn
 	return fluxChangeEdown
 	
 	
-def flux_change_calculation_enzymeUP_worker(ifReal, enzyme, enzymes, Smetab2rnx, ensembleModels, Vss, results, fluxRange, ERangeUp, nsteps, enzymeUB, nwindows):
+def flux_change_calculation_enzymeUP_worker(ifReal, enzyme, enzymes, rateLawArrays, Vss, results, fluxRange, ERangeUp, nsteps, enzymeUB, nwindows):
 	'''
 	Parameters	
 	ifReal: str, whether using real values, 'yes' or 'no'	
 	enzyme: str, enzyme ID
 	enzymes: lst, enzyme IDs
-	Smetab2rnx: df, transforme X to metabolites needed in each reaction
-	ensembleModels: lst
+	rateLawArrays: dict of arrays, rate law arrays of ensemble models, see utilities.get_rate_law_arrays
 	Vss: ser, fluxes in steady state
 	results: dict
 	fluxRange: array, range of flux change
@@ -182,36 +321,16 @@ def flux_change_calculation_enzymeUP_worker(ifReal, enzyme, enzymes, Smetab2rnx,
 	
 	Returns
 	fluxChangeEup: dict
+	NOTE fluxes of all models reaching an enzyme level are calculated at once by utilities.get_rate_law_derivatives
 	'''
 	
-	from utilities import get_V
-	from common_rate_laws import v_expression
-	
 	fluxChangeEup = pd.DataFrame(index = range(nwindows), columns = ERangeUp)
-			
-	nmodels = len(results[enzyme])	
 	
 	for Elevel in fluxChangeEup.columns:
 				
 			colID = int(round((Elevel - 1) * nsteps / (enzymeUB - 1), 0))
-				
-			# calculate all flux changes	
-			fluxChangeThisEnzyme = []
-			for i in range(nmodels):
 			
-				if results[enzyme][i][1].shape[1] < colID + 1: continue    
-				
-				reverses, kcats, subConcss, subCoess, subKmss, proConcss, proCoess, proKmss, Keqs = ensembleModels[i]
-				
-				Enew = results[enzyme][i][1].loc[:, colID]
-				
-				Xnew = results[enzyme][i][3].loc[:, colID]
-				
-				Vnew = get_V(Smetab2rnx, v_expression, Enew, Xnew, reverses, kcats, subCoess, subKmss, proCoess, proKmss, Keqs)
-				if ifReal == 'yes': Vnew = Vnew * 3600   # V in mmol/gCDW/h for real values
-				Vnew = pd.Series(np.array(Vnew).reshape(-1).astype(np.float), index = enzymes)	
-				
-				fluxChangeThisEnzyme.append(Vnew[enzyme] / Vss[enzyme])
+			fluxChangeThisEnzyme = get_flux_change(ifReal, enzyme, enzymes, rateLawArrays, Vss, results[enzyme], 1, 3, colID)
 				
 			# get the histogram of flux changes
 			fluxChangeEup.loc[:, Elevel] = np.histogram(fluxChangeThisEnzyme, bins = fluxRange)[0]   
@@ -219,7 +338,61 @@ def flux_change_calculation_enzymeUP_worker(ifReal, enzyme, enzymes, Smetab2rnx,
 	return fluxChangeEup
 	
 	
-def calculate_flux_fold_change(ifReal, Smetab2rnx, ensembleModels, Vss, results, enzymes, enzymesInner, nsteps, enzymeLB, enzymeUB, nprocess, fluxBnds = (0.1, 10), nwindows = 49):
+def get_flux_change(ifReal, enzyme, enzymes, rateLawArrays, Vss, resultsPerEnzyme, Epos, Xpos, colID):
+	'''
+	Parameters
+	ifReal: str, whether using real values, 'yes' or 'no'
+	enzyme: str, enzyme ID
+	enzymes: lst, enzyme IDs
+	rateLawArrays: dict of arrays, rate law arrays of ensemble models, see utilities.get_rate_law_arrays
+	Vss: ser, fluxes in steady state
+	resultsPerEnzyme: lst, simulation results of the enzyme, [Eout2, Eout1, Xout2, Xout1, ...] of each model
+	Epos: int, position of enzyme levels in results of each model, 0 for decreased and 1 for increased enzyme level
+	Xpos: int, position of metabolite concentrations in results of each model, 2 for decreased and 3 for increased enzyme level
+	colID: int, integration step
+	
+	Returns
+	fluxChangeThisEnzyme: array, relative flux of the enzyme in models reaching the step
+	'''
+	
+	from utilities import get_rate_law_derivatives
+	
+	models = [i for i, result in enumerate(resultsPerEnzyme) if result[Epos].shape[1] >= colID + 1]
+	
+	if not models: return np.array([])
+	
+	Enew = np.array([resultsPerEnzyme[i][Epos].loc[:, colID].values for i in models], dtype = float)
+	Xnew = np.array([resultsPerEnzyme[i][Xpos].loc[:, colID].values for i in models], dtype = float)
+	
+	Vnew = get_rate_law_derivatives({key: value[models] for key, value in rateLawArrays.items()}, Enew, Xnew)[0]
+	if ifReal == 'yes': Vnew = Vnew * 3600   # V in mmol/gCDW/h for real values
+	
+	pos = list(enzymes).index(enzyme)
+	
+	return Vnew[:, pos] / Vss[enzyme]
+	
+	
+def pooled_flux_change_worker(direction, enzyme, resultsPerEnzyme, fluxRange, ERange, nsteps, enzymeBnd, nwindows):
+	'''
+	Parameters
+	direction: str, 'down' for flux_change_calculation_enzymeDOWN_worker, 'up' for flux_change_calculation_enzymeUP_worker
+	enzyme: str, enzyme ID
+	resultsPerEnzyme: lst, simulation results of the enzyme
+	fluxRange, ERange, nsteps, enzymeBnd, nwindows: see flux_change_calculation_enzymeDOWN_worker and flux_change_calculation_enzymeUP_worker
+	
+	Returns
+	fluxChangeE: df, histograms of flux change
+	NOTE network data and models are taken from workerData of a pool created by ensemble_models.create_worker_pool
+	'''
+	
+	from ensemble_models import workerData as d
+	
+	worker = flux_change_calculation_enzymeDOWN_worker if direction == 'down' else flux_change_calculation_enzymeUP_worker
+	
+	return worker(d['ifReal'], enzyme, d['enzymes'], d['rateLawArrays'], d['Vss'], {enzyme: resultsPerEnzyme}, fluxRange, ERange, nsteps, enzymeBnd, nwindows)
+	
+	
+def calculate_flux_fold_change(ifReal, Smetab2rnx, ensembleModels, Vss, results, enzymes, enzymesInner, nsteps, enzymeLB, enzymeUB, nprocess, fluxBnds = (0.1, 10), nwindows = 49, threadsPerProcess = 1, pool = None):
 	'''
 	Parameters
 	ifReal: str, whether using real values, 'yes' or 'no'
@@ -235,46 +408,43 @@ def calculate_flux_fold_change(ifReal, Smetab2rnx, ensembleModels, Vss, results,
 	nprocess: int, number of processes to run simutaneously
 	fluxBnds: 2-tuple, relative bounds of flux change
 	nwindows: int, # of window to get the histogram of flux change. better set a odd number, the higher value of nwindows, the higher resolution of figure
+	threadsPerProcess: int, # of BLAS threads of each worker process
+	pool: worker pool from ensemble_models.create_worker_pool loaded with the same network and models (ensembleModels and Vss required), 
+	if None, a pool is created and closed here
 	
 	Returns
 	fluxChange: dict 
+	NOTE decreased and increased enzyme levels of all enzymes are submitted to the pool at once, each task gets the results of its enzyme only
 	'''
 	
-	from multiprocessing import Pool
+	from ensemble_models import create_worker_pool
+	from utilities import get_rate_law_arrays
 	
 	ERangeDown = np.linspace(enzymeLB, 1, nsteps + 1)
 	ERangeUp = np.linspace(1, enzymeUB, nsteps + 1)
 	fluxRange = np.logspace(np.log10(fluxBnds[0]), np.log10(fluxBnds[1]), nwindows + 1)
 	
-	# decreased enzyme level
-	pool1 = Pool(processes = nprocess)
-
-	fluxChangeEdown = {}
-	for enzyme in enzymesInner:
-	
-		res = pool1.apply_async(func = flux_change_calculation_enzymeDOWN_worker, args = (ifReal, enzyme, enzymes, Smetab2rnx, ensembleModels, Vss, results, fluxRange, ERangeDown, nsteps, enzymeLB, nwindows))
-	
-		fluxChangeEdown[enzyme] = res
-	
-	pool1.close()	
-	pool1.join()
-	
-	for enzyme, res in fluxChangeEdown.items(): fluxChangeEdown[enzyme] = res.get()
+	ifOwnPool = pool is None
 	
-	# increased enzyme level
-	pool2 = Pool(processes = nprocess)
+	if ifOwnPool: 
+		data = {'ifReal': ifReal, 'enzymes': enzymes, 'rateLawArrays': get_rate_law_arrays(Smetab2rnx, ensembleModels), 'Vss': Vss}
+		
+		pool = create_worker_pool(nprocess, data, threadsPerProcess)
 	
+	fluxChangeEdown = {}
 	fluxChangeEup = {}
 	for enzyme in enzymesInner:
+		
+		fluxChangeEdown[enzyme] = pool.apply_async(func = pooled_flux_change_worker, args = ('down', enzyme, results[enzyme], fluxRange, ERangeDown, nsteps, enzymeLB, nwindows))
+		fluxChangeEup[enzyme] = pool.apply_async(func = pooled_flux_change_worker, args = ('up', enzyme, results[enzyme], fluxRange, ERangeUp, nsteps, enzymeUB, nwindows))
 	
-		res = pool2.apply_async(func = flux_change_calculation_enzymeUP_worker, args = (ifReal, enzyme, enzymes, Smetab2rnx, ensembleModels, Vss, results, fluxRange, ERangeUp, nsteps, enzymeUB, nwindows))
-	
-		fluxChangeEup[enzyme] = res
-	
-	pool2.close()	
-	pool2.join()
+	if ifOwnPool:
+		pool.close()
+		pool.join()
 	
-	for enzyme, res in fluxChangeEup.items(): fluxChangeEup[enzyme] = res.get()
+	for enzyme in enzymesInner:
+		fluxChangeEdown[enzyme] = fluxChangeEdown[enzyme].get()
+		fluxChangeEup[enzyme] = fluxChangeEup[enzyme].get()
 	
 	# combine data
 	fluxChange = {}
@@ -293,7 +463,7 @@ def calculate_flux_control_index(fluxChange, enzymes, fluxBnds = (0.1, 10)):
 	fluxBnds: 2-tuple, relative bounds of flux change
 	
 	Returns
-	ConIdx: df, enyzmes in rows
+	ConIdx: df, enyzmes in rows, each cell is a 2-tuple of flux control indices and their counts
 	'''
 	
 	ConIdx = pd.DataFrame(index = enzymes, columns = ['Down regulation', 'Up regulation'])   
@@ -307,35 +477,64 @@ def calculate_flux_control_index(fluxChange, enzymes, fluxBnds = (0.1, 10)):
 
 		steps = fluxChangeThisEnzyme.columns.size
 
-		# decreased enzyme level
-		fluxChangeEdown = fluxChangeThisEnzyme.iloc[:, :(steps-1)//2]
-		
-		ConIdxEdown = []
-		for v in fluxChangeEdown.index:
-			for e in fluxChangeEdown.columns:
-				ConIdxEdown.extend([np.log10(v) / np.log10(e)] * fluxChangeEdown.loc[v, e])
+		with np.errstate(divide = 'ignore', invalid = 'ignore'):   # column of unchanged enzyme level is excluded below
+			ConIdxAll = np.log10(fluxChangeThisEnzyme.index.values)[:, np.newaxis] / np.log10(fluxChangeThisEnzyme.columns.values)
+		counts = fluxChangeThisEnzyme.values.astype(int)
 		
-		ConIdx.loc[enzyme:enzyme, 'Down regulation'] = [ConIdxEdown]
+		# decreased enzyme level
+		ConIdx.at[enzyme, 'Down regulation'] = (ConIdxAll[:, :(steps-1)//2].ravel(), counts[:, :(steps-1)//2].ravel())
 		
 		# increased enzyme level
-		fluxChangeEup = fluxChangeThisEnzyme.iloc[:, (steps+1)//2:]
-		
-		ConIdxEup = []
-		for v in fluxChangeEup.index:
-			for e in fluxChangeEup.columns:
-				ConIdxEup.extend([np.log10(v) / np.log10(e)] * fluxChangeEup.loc[v, e])
-
-		ConIdx.loc[enzyme:enzyme, 'Up regulation'] = [ConIdxEup]
+		ConIdx.at[enzyme, 'Up regulation'] = (ConIdxAll[:, (steps+1)//2:].ravel(), counts[:, (steps+1)//2:].ravel())
 
 	return ConIdx
 	
 	
+def calculate_control_coefficients(ensembleModels, S, Smetab2rnx, Eini, Xini, L = None):
+	'''
+	Parameters
+	ensembleModels: lst
+	S: df, stoichiometric matrix, metabolite in rows, reaction in columns
+	Smetab2rnx: df, transforme X to metabolites needed in each reaction
+	Eini: array, enzyme concentrations in reference state, in order of enzymes
+	Xini: array, metabolite concentrations in reference state, in order of metabs
+	L: df, link matrix from parse_network.get_conservation_relations, None for no reduction
+	
+	Returns
+	concConCoes: array, scaled concentration control coefficients d(ln X)/d(ln E), model in axis 0, metabolite in axis 1, enzyme in axis 2
+	fluxConCoes: array, scaled flux control coefficients d(ln V)/d(ln E), model in axis 0, flux in axis 1, enzyme in axis 2
+	NOTE local counterparts of the flux fold change at the reference state, dX/dE = -L * Jr^-1 * Sr * dV/dE with the reduced Jacobian 
+	Jr = Sr * dV/dX * L of independent metabolites, solved for all models at once. Models whose Jr is rank deficient (smallest singular 
+	value within the pinv cutoff of utilities.solve_dXdE) have no unique steady state response and get nan coefficients
+	'''
+	
+	from utilities import get_rate_law_arrays, get_rate_law_derivatives
+	
+	Eini = np.asarray(Eini, dtype = float)
+	Xini = np.asarray(Xini, dtype = float)
 	
+	if L is None: L = pd.DataFrame(np.eye(S.shape[0]), index = S.index, columns = S.index)
 	
+	Sr = S.loc[L.columns].values.astype(float)
+	L = L.values.astype(float)
 	
+	rateLawArrays = get_rate_law_arrays(Smetab2rnx, ensembleModels)
 	
+	V, dVdX, dVdE = get_rate_law_derivatives(rateLawArrays, Eini, Xini)
 	
+	J = np.matmul(np.matmul(Sr, dVdX), L)
 	
+	# a rank deficient Jr leaves the steady state undetermined along its null space, control coefficients are not defined
+	singVals = np.linalg.svd(J, compute_uv = False)
+	ifSingular = singVals[:, -1] <= singVals[:, 0] * np.finfo(float).eps * 1e6
 	
+	dXdE = np.full((J.shape[0], L.shape[0], dVdE.shape[-1]), np.nan)
+	if not ifSingular.all():
+		dXdE[~ifSingular] = -np.matmul(L, np.linalg.solve(J[~ifSingular], np.matmul(Sr, dVdE[~ifSingular])))
+	dVdEtotal = dVdE + np.matmul(dVdX, dXdE)
 	
+	concConCoes = dXdE * Eini / Xini[:, np.newaxis]
+	fluxConCoes = dVdEtotal * Eini / V[..., np.newaxis]
 	
+	return concConCoes, fluxConCoes
+
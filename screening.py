@@ -0,0 +1,213 @@
+#!/usr/bin/env pyhton
+# -*- coding: UTF-8 -*-
+
+
+__author__ = 'Chao Wu'
+__date__ = '10/18/2026'
+__version__ = '1.0'
+
+
+import numpy as np
+import pandas as pd
+
+
+
+
+def get_reaction_files(path):
+	'''
+	Parameters
+	path: str, directory of reaction files (*.tsv), or manifest file with one reaction file per line (relative paths are relative to the manifest)
+
+	Returns
+	reactionFiles: lst, reaction files
+	'''
+
+	import os
+	from glob import glob
+
+	if os.path.isdir(path):
+		reactionFiles = sorted(glob(os.path.join(path, '*.tsv')))
+
+	else:
+		with open(path) as f:
+			lines = [line.strip() for line in f]
+
+		reactionFiles = [os.path.join(os.path.dirname(path), line) for line in lines if line and not line.startswith('#')]
+
+	return reactionFiles
+
+
+def get_pathway_names(reactionFiles):
+	'''
+	Parameters
+	reactionFiles: lst, reaction files
+
+	Returns
+	pathways: lst, pathway names, paths of reaction files relative to their deepest common directory without extension
+	NOTE names are the subdirectories of results, so reaction files of the same name in different directories do not collide. 
+	ValueError is raised if a reaction file is listed twice
+	'''
+
+	import os
+
+	paths = pd.Series([os.path.splitext(os.path.abspath(reactionFile))[0] for reactionFile in reactionFiles], dtype = object)
+
+	if paths.duplicated().any():
+		raise ValueError('reaction files listed more than once: %s' % ', '.join(sorted(set(paths[paths.duplicated()]))))
+
+	root = os.path.commonpath([os.path.dirname(path) for path in paths])
+
+	return [os.path.relpath(path, root) for path in paths]
+
+
+def screen_pathway_worker(reactionFile, iniMetabs, finMetabs, exBalMetabs, exOptMetabs, concLB, concUB, assignFlux, runWhich, lpSolver, nlpSolver, outDir, nsamples = 0, seed = None, nstarts = 1, tvaFraction = 1.0, pathway = None):
+	'''
+	Parameters
+	reactionFile: str, reaction list file
+	iniMetabs: lst, metabolites as initial substrates
+	finMetabs: lst, metabolites as end products
+	exBalMetabs: lst, metabolites excluded from mass balance
+	exOptMetabs: lst, metabolites excluded from optimization
+	concLB: float, concentration lower bound (mM) for all metabolites
+	concUB: float, concentration upper bound (mM) for all metabolites
+	assignFlux: str, assigned flux in the format "enzyme ID:value", None for influx to pathway set to 1
+	runWhich: str, '1' for maximizing the minimal driving force, '2' for minimizing the total enzyme protein cost, '3' for thermodynamic 
+	variability analysis, '4' for MDF under ΔrG'm uncertainty, '12', '13', ... for combinations
+	lpSolver: str, LP solver
+	nlpSolver: str, solver for minimizing the total enzyme protein cost
+	outDir: str, output directory of this pathway
+	nsamples: int, # of Monte Carlo samples of ΔrG'm for MDF under uncertainty, 0 to skip
+	seed: int, random seed of Monte Carlo samples and of the starts for minimizing the total enzyme protein cost
+	nstarts: int, # of starts for minimizing the total enzyme protein cost, run one after another in this worker, 1 for a single start
+	tvaFraction: float, fraction of the maximized minimal driving force kept in thermodynamic variability analysis
+	pathway: str, pathway name in the ranking, the reaction file name without extension if None
+
+	Returns
+	resultPerPathway: dict, status is 'ok' or the error message if any stage failed
+	'''
+
+	import os
+	import re
+	import time
+	from parse_network import parse_network, get_full_stoichiometric_matrix, get_steady_state_net_fluxes
+	from thermodynamics import optimize_minimal_driving_force, thermodynamic_variability_analysis, sample_minimal_driving_force, optimize_enzyme_cost, optimize_enzyme_cost_multistart
+	from output import save_driving_force_optimization_results, save_variability_analysis_results, save_driving_force_sampling_results, save_enzyme_cost_optimization_results, save_enzyme_cost_multistart_results
+
+	t0 = time.perf_counter()
+
+	if pathway is None: pathway = os.path.splitext(os.path.basename(reactionFile))[0]
+
+	resultPerPathway = {'Pathway': pathway, 'Reaction file': reactionFile, 'Status': 'ok',
+	                    'MDF (kJ/mol)': np.nan, 'Bottleneck': '', 'MDF 5% (kJ/mol)': np.nan, 'P(MDF > 0)': np.nan, 'Total enzyme cost (g/mol/s)': np.nan}
+
+	try:
+		os.makedirs(outDir, exist_ok = True)
+
+		S4Bal, S4Opt, enzymeInfo, metabInfo = parse_network(reactionFile, iniMetabs, finMetabs, exBalMetabs, exOptMetabs)
+
+		S4BalFull = get_full_stoichiometric_matrix(S4Bal, metabInfo)
+
+		if assignFlux:
+			speEnz, speFlux = assignFlux.split(':')
+
+			Vss = get_steady_state_net_fluxes(S4BalFull, enzymeInfo, metabInfo, speEnz, float(speFlux))
+
+		else:
+			Vss = get_steady_state_net_fluxes(S4BalFull, enzymeInfo, metabInfo)
+
+		if re.search(r'1', runWhich):
+			optConcs, optDeltaGs, refDeltaGs, solverInfo = optimize_minimal_driving_force(S4Opt, Vss, enzymeInfo, concLB, concUB, lpSolver)
+
+			resultPerPathway['MDF (kJ/mol)'] = -optDeltaGs.max()
+			resultPerPathway['Bottleneck'] = ','.join(optDeltaGs.index[optDeltaGs >= optDeltaGs.max() - 1e-6])
+
+			save_driving_force_optimization_results(optConcs, optDeltaGs, refDeltaGs, outDir)
+
+		if re.search(r'3', runWhich):
+			concRanges, deltaGRanges, MDF = thermodynamic_variability_analysis(S4Opt, Vss, enzymeInfo, concLB, concUB, tvaFraction, 1, lpSolver)
+
+			save_variability_analysis_results(concRanges, deltaGRanges, outDir)
+
+		if re.search(r'4', runWhich) and nsamples > 0:
+			MDFs, bottleneckPro = sample_minimal_driving_force(S4Opt, Vss, enzymeInfo, concLB, concUB, nsamples, seed = seed, solver = lpSolver)
+
+			resultPerPathway['MDF 5% (kJ/mol)'] = MDFs.quantile(0.05)
+			resultPerPathway['P(MDF > 0)'] = (MDFs > 0).mean()
+
+			save_driving_force_sampling_results(MDFs, bottleneckPro, outDir)
+
+		if re.search(r'2', runWhich):
+			if nstarts > 1 and nlpSolver != 'ralg':
+				optConcs, optEnzyCosts, optEnzyCostTotal, startResults = optimize_enzyme_cost_multistart(S4Opt, Vss, enzymeInfo, concLB, concUB, nstarts, 1, nlpSolver, seed = seed, lpSolver = lpSolver)
+
+				save_enzyme_cost_multistart_results(startResults, outDir)
+
+			else:
+				optConcs, optEnzyCosts, optEnzyCostTotal = optimize_enzyme_cost(S4Opt, Vss, enzymeInfo, concLB, concUB, nlpSolver)
+
+			resultPerPathway['Total enzyme cost (g/mol/s)'] = optEnzyCostTotal * 1000   # MW in kDa
+
+			save_enzyme_cost_optimization_results(optConcs, optEnzyCosts, optEnzyCostTotal, outDir)
+
+	except Exception as e:
+		resultPerPathway['Status'] = '%s: %s' % (type(e).__name__, e)
+
+	resultPerPathway['Time (s)'] = time.perf_counter() - t0
+
+	return resultPerPathway
+
+
+def screen_pathways(reactionFiles, iniMetabs, finMetabs, exBalMetabs, exOptMetabs, concLB, concUB, assignFlux, runWhich, lpSolver, nlpSolver, outDir, nprocess, nsamples = 0, seed = None, nstarts = 1, tvaFraction = 1.0):
+	'''
+	Parameters
+	reactionFiles: lst, reaction list files
+	iniMetabs: lst, metabolites as initial substrates
+	finMetabs: lst, metabolites as end products
+	exBalMetabs: lst, metabolites excluded from mass balance
+	exOptMetabs: lst, metabolites excluded from optimization
+	concLB: float, concentration lower bound (mM) for all metabolites
+	concUB: float, concentration upper bound (mM) for all metabolites
+	assignFlux: str, assigned flux in the format "enzyme ID:value", None for influx to pathway set to 1
+	runWhich: str, '1' for maximizing the minimal driving force, '2' for minimizing the total enzyme protein cost, '3' for thermodynamic 
+	variability analysis, '4' for MDF under ΔrG'm uncertainty, '12', '13', ... for combinations
+	lpSolver: str, LP solver
+	nlpSolver: str, solver for minimizing the total enzyme protein cost
+	outDir: str, output directory, results of each pathway are saved in a subdirectory named by get_pathway_names
+	nprocess: int, number of processes
+	nsamples: int, # of Monte Carlo samples of ΔrG'm for MDF under uncertainty in each pathway, 0 to skip
+	seed: int, random seed of Monte Carlo samples and of the starts for minimizing the total enzyme protein cost
+	nstarts: int, # of starts for minimizing the total enzyme protein cost in each pathway, 1 for a single start
+	tvaFraction: float, fraction of the maximized minimal driving force kept in thermodynamic variability analysis
+
+	Returns
+	ranking: df, pathway in rows, ranked by MDF (descending) then total enzyme cost (ascending), failed pathways last
+	'''
+
+	import os
+	from multiprocessing import Pool
+
+	pathways = get_pathway_names(reactionFiles)
+
+	pool = Pool(processes = nprocess)
+
+	tmp = []
+	for reactionFile, pathway in zip(reactionFiles, pathways):
+
+		pathwayDir = os.path.join(outDir, pathway)
+
+		res = pool.apply_async(func = screen_pathway_worker, args = (reactionFile, iniMetabs, finMetabs, exBalMetabs, exOptMetabs, concLB, concUB, assignFlux, runWhich, lpSolver, nlpSolver, pathwayDir, nsamples, seed, nstarts, tvaFraction, pathway))
+
+		tmp.append(res)
+
+	pool.close()
+	pool.join()
+
+	ranking = pd.DataFrame([res.get() for res in tmp])
+
+	ranking['ifFailed'] = ranking['Status'] != 'ok'
+	ranking = ranking.sort_values(['ifFailed', 'MDF (kJ/mol)', 'Total enzyme cost (g/mol/s)'], ascending = [True, False, True], na_position = 'last')
+	ranking = ranking.drop(columns = 'ifFailed')
+
+	ranking.index = range(1, ranking.shape[0] + 1)
+
+	return ranking
@@ -0,0 +1,144 @@
+#!/usr/bin/env pyhton
+# -*- coding: UTF-8 -*-
+
+
+__author__ = 'Chao Wu'
+__date__ = '10/18/2026'
+__version__ = '1.0'
+
+
+import numpy as np
+import pandas as pd
+
+
+
+
+def get_shard_model_ids(nmodels, shard):
+	'''
+	Parameters
+	nmodels: int, number of models in the whole ensemble
+	shard: str, shard in the format "i/N", i from 1 to N
+
+	Returns
+	ishard: int, shard #
+	nshards: int, number of shards
+	modelIDs: lst, IDs of models in this shard, the ensemble is split into N contiguous shards
+	'''
+
+	ishard, nshards = map(int, shard.split('/'))
+
+	if not 1 <= ishard <= nshards:
+		raise ValueError('shard %s out of range, should be i/N with 1 <= i <= N' % shard)
+
+	modelIDs = [int(k) for k in np.array_split(np.arange(nmodels), nshards)[ishard - 1]]
+
+	return ishard, nshards, modelIDs
+
+
+def read_shard_results(shardDir):
+	'''
+	Parameters
+	shardDir: str, output directory of a shard
+
+	Returns
+	shardResults: dict, 'info' (shard.json), 'robustIdx' (ser), 'failurePro' (df), 'fluxChange' (dict, enzyme => df), 'diagnostics' (df) and
+	'ownFluxConCoes' (df), None for results not found
+	'''
+
+	import os
+	import json
+	from glob import glob
+
+	with open('%s/shard.json' % shardDir) as f:
+		info = json.load(f)
+
+	shardResults = {'info': info, 'robustIdx': None, 'failurePro': None, 'fluxChange': None, 'diagnostics': None, 'ownFluxConCoes': None}
+
+	if os.path.exists('%s/robustness_index.tsv' % shardDir):
+		shardResults['robustIdx'] = pd.read_csv('%s/robustness_index.tsv' % shardDir, sep = '\t', index_col = 0).iloc[:, 0]
+
+	if os.path.exists('%s/system_failure.tsv' % shardDir):
+		failurePro = pd.read_csv('%s/system_failure.tsv' % shardDir, sep = '\t', index_col = 0)
+		failurePro.columns = failurePro.columns.astype(float)
+
+		shardResults['failurePro'] = failurePro
+
+	fluxChangeFiles = sorted(glob('%s/flux_change_*.tsv' % shardDir))
+	if fluxChangeFiles:
+		fluxChange = {}
+		for fluxChangeFile in fluxChangeFiles:
+
+			enzyme = os.path.basename(fluxChangeFile)[len('flux_change_'):-len('.tsv')]
+
+			fluxChange[enzyme] = pd.read_csv(fluxChangeFile, sep = '\t', index_col = 0)
+			fluxChange[enzyme].columns = fluxChange[enzyme].columns.astype(float)
+
+		shardResults['fluxChange'] = fluxChange
+
+	if os.path.exists('%s/continuation_diagnostics.tsv' % shardDir):
+		shardResults['diagnostics'] = pd.read_csv('%s/continuation_diagnostics.tsv' % shardDir, sep = '\t')
+	
+	if os.path.exists('%s/flux_control_coefficients.tsv' % shardDir):
+		shardResults['ownFluxConCoes'] = pd.read_csv('%s/flux_control_coefficients.tsv' % shardDir, sep = '\t', index_col = 0)
+
+	return shardResults
+
+
+def merge_shard_results(shardDirs):
+	'''
+	Parameters
+	shardDirs: lst, output directories of shards
+
+	Returns
+	merged: dict, 'robustIdx', 'failurePro', 'fluxChange', 'diagnostics' and 'ownFluxConCoes' of the whole ensemble, None for results missing in any shard,
+	'nmodels' (# of models simulated) and 'missingShards' (lst)
+	NOTE robustness index and probability of system failure are means over models, they are merged as means weighted by the # of
+	models simulated in each shard, histograms of flux change are summed, per model tables are concatenated
+	'''
+
+	allResults = [read_shard_results(shardDir) for shardDir in shardDirs]
+
+	infos = [shardResults['info'] for shardResults in allResults]
+
+	if len({(info['seed'], info.get('sampler', 'random'), info['nshards'], info['nmodelsTotal']) for info in infos}) > 1:
+		raise ValueError('shards come from different runs, seed, sampler, # of shards and ensemble size should be the same')
+
+	ishards = [info['shard'] for info in infos]
+
+	if len(set(ishards)) < len(ishards):
+		raise ValueError('duplicated shards %s' % ', '.join(str(ishard) for ishard in sorted(set(ishards)) if ishards.count(ishard) > 1))
+
+	missingShards = sorted(set(range(1, infos[0]['nshards'] + 1)) - set(ishards))
+
+	ns = np.array([info['nsimulated'] for info in infos])
+
+	merged = {'nmodels': int(ns.sum()), 'missingShards': missingShards}
+
+	for key in ['robustIdx', 'failurePro']:
+		if any(shardResults[key] is None for shardResults in allResults):
+			merged[key] = None
+
+		else:
+			weighted = [shardResults[key].fillna(0) * n for shardResults, n in zip(allResults, ns)]
+
+			merged[key] = sum(weighted[1:], weighted[0]) / ns.sum()
+
+	if any(shardResults['fluxChange'] is None for shardResults in allResults):
+		merged['fluxChange'] = None
+
+	else:
+		merged['fluxChange'] = {enzyme: sum(shardResults['fluxChange'][enzyme] for shardResults in allResults) for enzyme in allResults[0]['fluxChange']}
+
+	if any(shardResults['diagnostics'] is None for shardResults in allResults):
+		merged['diagnostics'] = None
+
+	else:
+		merged['diagnostics'] = pd.concat([shardResults['diagnostics'] for shardResults in allResults]).sort_values(['Model', 'Enzyme', 'Direction'])
+	
+	if any(shardResults['ownFluxConCoes'] is None for shardResults in allResults):
+		merged['ownFluxConCoes'] = None
+	
+	else:
+		merged['ownFluxConCoes'] = pd.concat([shardResults['ownFluxConCoes'] for shardResults in allResults]).sort_index()
+
+	return merged
@@ -0,0 +1,8 @@
+#!/usr/bin/env pyhton
+# -*- coding: UTF-8 -*-
+
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,106 @@
+#!/usr/bin/env pyhton
+# -*- coding: UTF-8 -*-
+
+
+'''
+Bootstrap confidence intervals of robustness index and probability of system failure: shapes match the point estimates, and the 
+intervals of samples of models drawn from a known population cover the population values at about the confidence level
+'''
+
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from robustness import calculate_robustness_index, calculate_system_failure_probability, calculate_bootstrap_intervals
+
+
+enzymes = ['E1', 'E2']
+
+nsteps, enzymeLB, enzymeUB = 10, 0.1, 10
+
+
+
+
+def get_results(stepss):
+	'''
+	stepss: lst of tuples, # of steps completed with decreased and increased level of each enzyme in each model
+	'''
+	
+	results = {enzyme: [] for enzyme in enzymes}
+	for steps in stepss:
+		for enzyme, (stepsDown, stepsUp) in zip(enzymes, steps):
+			
+			Eout2 = pd.DataFrame([np.linspace(1, 1 - stepsDown * (1 - enzymeLB) / nsteps, stepsDown + 1)] * len(enzymes), index = enzymes)
+			Eout1 = pd.DataFrame([np.linspace(1, 1 + stepsUp * (enzymeUB - 1) / nsteps, stepsUp + 1)] * len(enzymes), index = enzymes)
+			
+			results[enzyme].append((Eout2, Eout1))
+	
+	return results
+	
+	
+@pytest.fixture(scope = 'module')
+def population():
+	
+	# every combination of steps of E1 once, E2 fails early more often
+	stepsE1 = [(d, u) for d in range(nsteps + 1) for u in range(nsteps + 1)]
+	stepsE2 = [(min(d, 3), u // 2) for d, u in stepsE1]
+	
+	return list(zip(stepsE1, stepsE2))
+	
+	
+def test_shapes(population):
+	
+	results = get_results(population[:30])
+	
+	robustIdxCI, failureProLower, failureProUpper = calculate_bootstrap_intervals(results, enzymes, nsteps, enzymeLB, enzymeUB, nboots = 200, seed = 1)
+	
+	robustIdx = calculate_robustness_index(results, enzymes, nsteps)
+	failurePro = calculate_system_failure_probability(results, enzymes, nsteps, 30, enzymeLB, enzymeUB)
+	
+	assert list(robustIdxCI.index) == enzymes and list(robustIdxCI.columns) == ['Lower', 'Upper']
+	
+	for bound in [failureProLower, failureProUpper]:
+		assert bound.shape == failurePro.shape == (len(enzymes), 2 * nsteps + 1)
+		assert list(bound.index) == enzymes and np.allclose(bound.columns.astype(float), failurePro.columns.astype(float))
+	
+	assert (robustIdxCI['Lower'] <= robustIdxCI['Upper']).all() and (failureProLower <= failureProUpper).all().all()
+	assert ((robustIdxCI['Lower'] <= robustIdx) & (robustIdx <= robustIdxCI['Upper'])).all()
+	
+	# the same seed gives the same intervals, identical models give intervals of zero width
+	assert robustIdxCI.equals(calculate_bootstrap_intervals(results, enzymes, nsteps, enzymeLB, enzymeUB, nboots = 200, seed = 1)[0])
+	
+	robustIdxCI, failureProLower, failureProUpper = calculate_bootstrap_intervals(get_results(population[:1] * 5), enzymes, nsteps, enzymeLB, enzymeUB, nboots = 50, seed = 1)
+	
+	assert np.allclose(robustIdxCI['Lower'], robustIdxCI['Upper']) and np.allclose(failureProLower, failureProUpper)
+	
+	
+def test_coverage(population):
+	
+	results = get_results(population)
+	
+	robustIdx = calculate_robustness_index(results, enzymes, nsteps)
+	failurePro = calculate_system_failure_probability(results, enzymes, nsteps, len(population), enzymeLB, enzymeUB)
+	
+	# levels where the population probability of system failure of every enzyme is between 0 and 1
+	levels = failurePro.columns[((failurePro > 0.05) & (failurePro < 0.95)).all()]
+	
+	rng = np.random.default_rng(1)
+	
+	nreps, nmodels = 200, 100
+	
+	coveredRobustIdx = []
+	coveredFailurePro = []
+	for rep in range(nreps):
+		
+		idx = rng.integers(0, len(population), nmodels)
+		
+		sample = {enzyme: [results[enzyme][i] for i in idx] for enzyme in enzymes}
+		
+		robustIdxCI, failureProLower, failureProUpper = calculate_bootstrap_intervals(sample, enzymes, nsteps, enzymeLB, enzymeUB, nboots = 400, seed = rep)
+		
+		coveredRobustIdx.append(((robustIdxCI['Lower'] <= robustIdx) & (robustIdx <= robustIdxCI['Upper'])).values)
+		coveredFailurePro.append(((failureProLower[levels] <= failurePro[levels]) & (failurePro[levels] <= failureProUpper[levels])).values)
+	
+	assert 0.88 <= np.mean(coveredRobustIdx) <= 0.99
+	assert 0.88 <= np.mean(coveredFailurePro) <= 0.99
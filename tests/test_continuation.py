@@ -0,0 +1,153 @@
+#!/usr/bin/env pyhton
+# -*- coding: UTF-8 -*-
+
+
+'''
+Continuation backends should agree on the same model: the numeric kernel with the symbolic (legacy) path, the sparse path with the 
+dense one, and the batch of pair directions with the continuation of each direction
+'''
+
+
+import os
+import re
+import numpy as np
+import pandas as pd
+import pytest
+
+from parse_network import parse_network, get_full_stoichiometric_matrix, get_steady_state_net_fluxes, prune_network, get_conservation_relations
+from ensemble_models import generate_stable_ensemble_models, simulation_worker
+
+
+exampleDir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples')
+
+
+
+
+def get_network(reactionFile, finMetabs, exBalMetabs, exOptMetabs, nmodels):
+	
+	S4Bal, S4Opt, enzymeInfo, metabInfo = parse_network(os.path.join(exampleDir, reactionFile), [], finMetabs, exBalMetabs, exOptMetabs)
+	
+	Vss = get_steady_state_net_fluxes(get_full_stoichiometric_matrix(S4Bal, metabInfo), enzymeInfo, metabInfo)
+	
+	S = prune_network(get_full_stoichiometric_matrix(S4Opt, metabInfo), Vss)[0]
+	
+	L = get_conservation_relations(S)[0]
+	
+	Smetab2rnx = (S.T / S.T.abs()).replace(np.nan, 0)
+	
+	ensembleModels = generate_stable_ensemble_models(S, enzymeInfo, Vss, nmodels, Smetab2rnx, seed = 1, L = L)[0]
+	
+	return {'S': S, 'L': L, 'Smetab2rnx': Smetab2rnx, 'ensembleModels': ensembleModels, 
+	        'innerEnzymes': [enzyme for enzyme in S.columns if not re.match(r'.+_(in|out)', enzyme)]}
+	
+	
+@pytest.fixture(scope = 'module')
+def network():
+	
+	return get_network('PS.tsv', [], ['H2O'], [], 2)
+	
+	
+@pytest.fixture(scope = 'module')
+def networkCBB():
+	
+	cofactors = ['ATP', 'ADP', 'Pi', 'NADH', 'NAD', 'NADPH', 'NADP']
+	
+	return get_network('CBB.tsv', ['GAP'], cofactors, cofactors, 2)
+	
+	
+def simulate(network, i, backend, pertEnzymes, L = None):
+	
+	from sympy import symbols
+	
+	S = network['S']
+	
+	enzymeLBs = pd.Series(0.1, index = S.columns)
+	enzymeUBs = pd.Series(10.0, index = S.columns)
+	
+	return simulation_worker(i, network['ensembleModels'][i], S, network['Smetab2rnx'], np.array(symbols(' '.join(S.columns))), np.ones(S.shape[1]), 
+	                         np.array(symbols(' '.join(S.index))), np.ones(S.shape[0]), S.columns, 100, enzymeLBs, enzymeUBs, backend, L, pertEnzymes)[0]
+	
+	
+def assert_same_continuation(result1, result2, rtol):
+	
+	# relative to the concentration scale of the trajectory, near singular steps amplify round-off of single entries
+	for k in range(4):
+		assert result1[k].shape == result2[k].shape
+		
+		values1 = result1[k].values.astype(float)
+		values2 = result2[k].values.astype(float)
+		
+		assert np.abs(values1 - values2).max() <= rtol * np.abs(values1).max()
+	
+	for k in [4, 5]:
+		assert result1[k]['steps'] == result2[k]['steps']
+		assert result1[k]['termination'] == result2[k]['termination']
+	
+	
+def test_numeric_matches_sympy(network):
+	
+	pertEnzymes = network['innerEnzymes'][:3]
+	
+	for i in range(len(network['ensembleModels'])):
+		
+		resultsSympy = simulate(network, i, 'sympy', pertEnzymes)
+		resultsNumeric = simulate(network, i, 'numeric', pertEnzymes)
+		
+		for enzyme in pertEnzymes:
+			assert_same_continuation(resultsSympy[enzyme], resultsNumeric[enzyme], rtol = 1e-6)
+			
+			
+def test_sparse_matches_dense(networkCBB, monkeypatch):
+	
+	import constants
+	
+	# the reduced Jacobian of CBB is still rank deficient, and more singular values fall below the cutoff of the pseudo inverse when 
+	# enzymes are decreased
+	pertEnzymes = ['RuBisCO', 'PGK', 'GAPDH']
+	
+	for i in range(len(networkCBB['ensembleModels'])):
+		
+		monkeypatch.setattr(constants, 'sparseThreshold', 10**9)
+		resultsDense = simulate(networkCBB, i, 'numeric', pertEnzymes, networkCBB['L'])
+		
+		monkeypatch.setattr(constants, 'sparseThreshold', 0)
+		resultsSparse = simulate(networkCBB, i, 'numeric', pertEnzymes, networkCBB['L'])
+		
+		for enzyme in pertEnzymes:
+			assert_same_continuation(resultsDense[enzyme], resultsSparse[enzyme], rtol = 1e-5)
+			
+			
+def test_batch_matches_continuation(networkCBB):
+	
+	from constants import eigThreshold, condThreshold
+	from utilities import get_rate_law_arrays
+	from kernels import continuation_kernel
+	from ensemble_models import get_pair_directions, pair_simulation_worker
+	
+	S, L = networkCBB['S'], networkCBB['L']
+	enzymes = list(S.columns)
+	pairs = [('RuBisCO', 'PRK'), ('PGK', 'GAPDH')]
+	directions = get_pair_directions(16, 0.1, 10)
+	
+	Sr = np.ascontiguousarray(S.loc[L.columns].values, dtype = float)
+	Lr = np.ascontiguousarray(L.values, dtype = float)
+	Eini = np.ones(S.shape[1])
+	Xini = np.ones(S.shape[0])
+	
+	for i, ensembleModel in enumerate(networkCBB['ensembleModels']):
+		
+		stepsBatch = pair_simulation_worker(i, ensembleModel, S, networkCBB['Smetab2rnx'], Eini, Xini, enzymes, pairs, directions, 100, L)
+		
+		rateLawArrays = {key: np.ascontiguousarray(value[0]) for key, value in get_rate_law_arrays(networkCBB['Smetab2rnx'], [ensembleModel]).items()}
+		
+		for p, (enzymeA, enzymeB) in enumerate(pairs):
+			for d in range(directions.shape[0]):
+				
+				Eend = Eini.copy()
+				Eend[enzymes.index(enzymeA)] *= directions['A'].values[d]
+				Eend[enzymes.index(enzymeB)] *= directions['B'].values[d]
+				
+				steps = continuation_kernel(Sr, Lr, *[rateLawArrays[key] for key in ['kcats', 'invKeqs', 'subCoes', 'subKms', 'proCoes', 'proKms']], 
+				                            Eini, Eend, Xini, 100, float(eigThreshold), float(condThreshold))[2]
+				
+				assert stepsBatch[p, d] == steps
@@ -0,0 +1,59 @@
+#!/usr/bin/env pyhton
+# -*- coding: UTF-8 -*-
+
+
+'''
+Control coefficients at the reference state: on a linear chain every flux equals the input, so each enzyme has the same control 
+over all fluxes, and models with a singular Jacobian get no coefficients
+'''
+
+
+import numpy as np
+import pytest
+
+from robustness import calculate_control_coefficients
+from test_continuation import get_network, networkCBB
+
+
+
+
+@pytest.fixture(scope = 'module')
+def networkChain(tmp_path_factory):
+	
+	reactionFile = tmp_path_factory.mktemp('chain') / 'chain.tsv'
+	
+	lines = ["#Enzyme ID\tReversibility\tΔrG'm (kJ/mol)\tSubstrates\tProducts\tSubstrate Km (mM)\tProduct Km (mM)\tkcat (1/s)\tEnzyme MW (kDa)"]
+	lines += ['R%s\t1\t-5\tM%s\tM%s\t\t\t\t40' % (i, i, i + 1) for i in range(6)]
+	reactionFile.write_text('\n'.join(lines) + '\n')
+	
+	return get_network(str(reactionFile), [], [], [], 5)
+	
+	
+def get_control_coefficients(network):
+	
+	S = network['S']
+	
+	return calculate_control_coefficients(network['ensembleModels'], S, network['Smetab2rnx'], np.ones(S.shape[1]), np.ones(S.shape[0]), network['L'])
+	
+	
+def test_chain_flux_control_is_the_same_for_all_fluxes(networkChain):
+	
+	concConCoes, fluxConCoes = get_control_coefficients(networkChain)
+	
+	assert np.isfinite(fluxConCoes).all() and np.isfinite(concConCoes).all()
+	
+	# each column (enzyme) is constant over the fluxes, and the summation theorem holds
+	assert np.allclose(fluxConCoes, fluxConCoes[:, :1, :], rtol = 0, atol = 1e-8)
+	assert np.allclose(fluxConCoes.sum(axis = 2), 1, rtol = 0, atol = 1e-8)
+	assert np.allclose(concConCoes.sum(axis = 2), 0, rtol = 0, atol = 1e-8)
+	
+	
+def test_singular_jacobian_gives_nan(networkCBB):
+	
+	concConCoes, fluxConCoes = get_control_coefficients(networkCBB)
+	
+	ifSingular = np.isnan(fluxConCoes).all(axis = (1, 2))
+	
+	assert ifSingular.any()
+	assert np.isnan(concConCoes[ifSingular]).all()
+	assert np.isfinite(fluxConCoes[~ifSingular]).all()
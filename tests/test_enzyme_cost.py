@@ -0,0 +1,119 @@
+#!/usr/bin/env pyhton
+# -*- coding: UTF-8 -*-
+
+
+'''
+Enzyme cost minimization: the closed form cost of the numeric backend should agree with the sympy rate law expressions and the 
+openopt optimum, and failed solver runs should never be reported as optima
+'''
+
+
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.optimize
+
+from parse_network import parse_network, get_full_stoichiometric_matrix, get_steady_state_net_fluxes
+from thermodynamics import optimize_enzyme_cost_numeric, optimize_enzyme_cost_multistart
+
+
+exampleDir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples')
+
+
+
+
+@pytest.fixture(scope = 'module')
+def pathway():
+	
+	S4Bal, S4Opt, enzymeInfo, metabInfo = parse_network(os.path.join(exampleDir, 'PS.tsv'), [], [], ['H2O'], [])
+	
+	Vss = get_steady_state_net_fluxes(get_full_stoichiometric_matrix(S4Bal, metabInfo), enzymeInfo, metabInfo)
+	
+	return S4Opt, Vss, enzymeInfo
+	
+	
+def get_sympy_enzyme_costs(logConcs, S, Vss, enzymeInfo):
+	
+	from constants import R, T
+	from common_rate_laws import E_expression
+	
+	enzyCosts = []
+	for enzyme in S.columns:
+		
+		subMasks = S[enzyme] < 0
+		proMasks = S[enzyme] > 0
+		
+		subKms = np.array([item[0] for item in enzymeInfo.loc[enzyme, 'subsKm'].loc[subMasks]])
+		proKms = np.array([item[0] for item in enzymeInfo.loc[enzyme, 'prosKm'].loc[proMasks]])
+		
+		deltaGm = -R * T * np.log(enzymeInfo.loc[enzyme, 'Keq'][0])
+		
+		E = E_expression(enzymeInfo.loc[enzyme, 'rev'], logConcs[subMasks.values], S.loc[subMasks, enzyme].abs().values, subKms, 
+		                 logConcs[proMasks.values], S.loc[proMasks, enzyme].abs().values, proKms, Vss[enzyme], enzymeInfo.loc[enzyme, 'kcat'][0], deltaGm)
+		
+		enzyCosts.append(float(enzymeInfo.loc[enzyme, 'MW'] * E))
+	
+	return pd.Series(enzyCosts, index = S.columns)
+	
+	
+def test_numeric_matches_sympy(pathway):
+	
+	S, Vss, enzymeInfo = pathway
+	
+	optConcs, optEnzyCosts, optEnzyCostTotal = optimize_enzyme_cost_numeric(S, Vss, enzymeInfo, 0.001, 10)
+	
+	sympyEnzyCosts = get_sympy_enzyme_costs(np.log(optConcs.values), S, Vss, enzymeInfo)
+	
+	assert np.allclose(optEnzyCosts, sympyEnzyCosts, rtol = 1e-10, atol = 0)
+	assert np.isclose(optEnzyCostTotal, sympyEnzyCosts.sum(), rtol = 1e-10, atol = 0)
+	
+	# both NLP solvers reach the same optimum
+	assert np.isclose(optimize_enzyme_cost_numeric(S, Vss, enzymeInfo, 0.001, 10, 'SLSQP')[2], optEnzyCostTotal, rtol = 1e-3, atol = 0)
+	
+	
+def test_numeric_matches_ralg(pathway):
+	
+	pytest.importorskip('openopt')
+	
+	from thermodynamics import optimize_enzyme_cost_sympy
+	
+	S, Vss, enzymeInfo = pathway
+	
+	np.random.seed(1)
+	
+	assert np.isclose(optimize_enzyme_cost_sympy(S, Vss, enzymeInfo, 0.001, 10)[2], optimize_enzyme_cost_numeric(S, Vss, enzymeInfo, 0.001, 10)[2], rtol = 1e-2, atol = 0)
+	
+	
+def test_failed_starts_are_not_optima(pathway, monkeypatch):
+	
+	S, Vss, enzymeInfo = pathway
+	
+	minimize = scipy.optimize.minimize
+	ncalls = []
+	
+	def fail_first_call(*args, **kwargs):
+		
+		r = minimize(*args, **kwargs)
+		
+		ncalls.append(1)
+		if len(ncalls) == 1:
+			r.success, r.fun, r.message = False, 0.0, 'Iteration limit reached'
+		
+		return r
+	
+	monkeypatch.setattr(scipy.optimize, 'minimize', fail_first_call)
+	
+	optConcs, optEnzyCosts, optEnzyCostTotal, startResults = optimize_enzyme_cost_multistart(S, Vss, enzymeInfo, 0.001, 10, 3, seed = 1)
+	
+	assert list(startResults['Status'] != 'ok') == [True, False, False]
+	assert np.isnan(startResults.loc[1, 'Total cost']) and startResults.loc[1, S.index].isna().all()
+	assert optEnzyCostTotal == startResults['Total cost'].min() > 0
+	
+	monkeypatch.setattr(scipy.optimize, 'minimize', lambda *args, **kwargs: scipy.optimize.OptimizeResult(x = args[1], fun = 0.0, success = False, message = 'failed'))
+	
+	with pytest.raises(ValueError):
+		optimize_enzyme_cost_numeric(S, Vss, enzymeInfo, 0.001, 10)
+	
+	with pytest.raises(ValueError):
+		optimize_enzyme_cost_multistart(S, Vss, enzymeInfo, 0.001, 10, 3, seed = 1)
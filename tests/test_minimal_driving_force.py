@@ -0,0 +1,74 @@
+#!/usr/bin/env pyhton
+# -*- coding: UTF-8 -*-
+
+
+'''
+MDF by the HiGHS backend should agree with the former openopt (cvxopt_lp) solver, and with the former dense formulation of the LP 
+solved by another algorithm
+'''
+
+
+import os
+import numpy as np
+import pytest
+
+from parse_network import parse_network, get_full_stoichiometric_matrix, get_steady_state_net_fluxes
+from thermodynamics import optimize_minimal_driving_force
+
+
+exampleDir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples')
+
+pathways = {'PS': ('PS.tsv', [], ['H2O']), 'CBB': ('CBB.tsv', ['GAP'], [])}
+
+
+
+
+@pytest.fixture(scope = 'module', params = sorted(pathways))
+def pathway(request):
+	
+	reactionFile, finMetabs, exBalMetabs = pathways[request.param]
+	
+	S4Bal, S4Opt, enzymeInfo, metabInfo = parse_network(os.path.join(exampleDir, reactionFile), [], finMetabs, exBalMetabs, [])
+	
+	Vss = get_steady_state_net_fluxes(get_full_stoichiometric_matrix(S4Bal, metabInfo), enzymeInfo, metabInfo)
+	
+	return S4Opt, Vss, enzymeInfo
+	
+	
+def test_highs_matches_dense_lp(pathway):
+	
+	from scipy.optimize import linprog
+	from constants import R, T
+	
+	S, Vss, enzymeInfo = pathway
+	
+	optConcs, optDeltaGs, refDeltaGs, solverInfo = optimize_minimal_driving_force(S, Vss, enzymeInfo, 0.001, 10)
+	
+	assert solverInfo['solver'] == 'highs' and solverInfo['status'] == 0
+	assert np.all((optConcs >= 0.001 * (1 - 1e-9)) & (optConcs <= 10 * (1 + 1e-9)))
+	
+	# the LP as built before the solver backends, with a dense constraint matrix
+	Sv = S * Vss[S.columns]
+	A = np.concatenate((np.ones((Sv.shape[1], 1)), R * T * Sv.T.values.astype(float)), axis = 1)
+	b = np.array([R * T * np.log(item[0]) for item in enzymeInfo.loc[:, 'Keq']]) * Vss[S.columns].values
+	
+	f = np.zeros(S.shape[0] + 1)
+	f[0] = -1
+	
+	res = linprog(f, A_ub = A, b_ub = b, bounds = [(None, None)] + [(np.log(0.001), np.log(10))] * S.shape[0], method = 'highs-ipm')
+	
+	assert res.status == 0
+	assert np.isclose(-optDeltaGs.max(), -res.fun, rtol = 0, atol = 1e-6)
+	
+	
+def test_highs_matches_cvxopt(pathway):
+	
+	pytest.importorskip('openopt')
+	pytest.importorskip('cvxopt')
+	
+	S, Vss, enzymeInfo = pathway
+	
+	optDeltaGs = optimize_minimal_driving_force(S, Vss, enzymeInfo, 0.001, 10, 'highs')[1]
+	optDeltaGsOld = optimize_minimal_driving_force(S, Vss, enzymeInfo, 0.001, 10, 'cvxopt_lp')[1]
+	
+	assert np.isclose(optDeltaGs.max(), optDeltaGsOld.max(), rtol = 0, atol = 1e-4)
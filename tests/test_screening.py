@@ -0,0 +1,28 @@
+#!/usr/bin/env pyhton
+# -*- coding: UTF-8 -*-
+
+
+'''
+Pathway names in screening are the result subdirectories, so they must be unique over the library
+'''
+
+
+import os
+import pytest
+
+from screening import get_pathway_names
+
+
+
+
+def test_same_file_names_in_different_directories(tmp_path):
+	
+	reactionFiles = [str(tmp_path / 'a' / 'x.tsv'), str(tmp_path / 'b' / 'x.tsv'), str(tmp_path / 'y.tsv')]
+	
+	assert get_pathway_names(reactionFiles) == [os.path.join('a', 'x'), os.path.join('b', 'x'), 'y']
+	
+	
+def test_file_listed_twice(tmp_path):
+	
+	with pytest.raises(ValueError):
+		get_pathway_names([str(tmp_path / 'x.tsv'), str(tmp_path / 'm' / '..' / 'x.tsv')])
@@ -0,0 +1,74 @@
+#!/usr/bin/env pyhton
+# -*- coding: UTF-8 -*-
+
+
+'''
+Shards of an ensemble merged by merge_shards.py should give the results of the unsharded run with the same seed
+'''
+
+
+import os
+import sys
+import subprocess
+import numpy as np
+import pandas as pd
+import pytest
+
+
+rootDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+cofactors = 'ATP,ADP,Pi,NADH,NAD,NADPH,NADP'
+
+
+
+
+def run_script(script, args):
+	
+	subprocess.run([sys.executable, os.path.join(rootDir, script)] + args, cwd = rootDir, check = True, stdout = subprocess.DEVNULL)
+	
+	
+@pytest.fixture(scope = 'module')
+def runs(tmp_path_factory):
+	
+	outDir = tmp_path_factory.mktemp('shards')
+	
+	args = ['-r', os.path.join('examples', 'CBB.tsv'), '-f', 'GAP', '-eb', cofactors, '-eo', cofactors, '-n', '12', '-b', '0.1,10', '-d', 'no', 
+	        '-w', '123', '-p', '1', '-sd', '1', '-pl', 'none']
+	
+	run_script('main2.py', ['-o', str(outDir / 'full')] + args + ['-t', 'no'])
+	
+	for i in [1, 2]:
+		run_script('main2.py', ['-o', str(outDir / ('shard_%s' % i))] + args + ['-sh', '%s/2' % i, '-t', 'no'])
+	
+	run_script('merge_shards.py', ['-o', str(outDir / 'merged'), '-s', str(outDir / 'shard_1'), str(outDir / 'shard_2'), '-pl', 'none'])
+	
+	return outDir / 'full', outDir / 'merged'
+	
+	
+def read_table(outDir, fileName):
+	
+	return pd.read_csv(outDir / fileName, sep = '\t', index_col = 0)
+	
+	
+def test_merge_equals_unsharded_run(runs):
+	
+	fullDir, mergedDir = runs
+	
+	for fileName in ['robustness_index.tsv', 'system_failure.tsv']:
+		assert np.allclose(read_table(mergedDir, fileName), read_table(fullDir, fileName), rtol = 1e-12, atol = 1e-12)
+	
+	fluxChangeFiles = sorted(os.listdir(fullDir))
+	fluxChangeFiles = [fileName for fileName in fluxChangeFiles if fileName.startswith('flux_change_')]
+	
+	assert fluxChangeFiles and fluxChangeFiles == sorted(fileName for fileName in os.listdir(mergedDir) if fileName.startswith('flux_change_'))
+	
+	for fileName in fluxChangeFiles:
+		assert read_table(mergedDir, fileName).equals(read_table(fullDir, fileName))
+	
+	keys = ['Model', 'Enzyme', 'Direction']
+	
+	diagnostics = pd.read_csv(fullDir / 'continuation_diagnostics.tsv', sep = '\t').sort_values(keys).reset_index(drop = True)
+	mergedDiagnostics = pd.read_csv(mergedDir / 'continuation_diagnostics.tsv', sep = '\t').sort_values(keys).reset_index(drop = True)
+	
+	assert mergedDiagnostics[keys + ['Steps', 'Termination']].equals(diagnostics[keys + ['Steps', 'Termination']])
+	assert np.allclose(mergedDiagnostics[['Max eigenvalue', 'Condition number']], diagnostics[['Max eigenvalue', 'Condition number']], rtol = 1e-10, atol = 1e-20, equal_nan = True)
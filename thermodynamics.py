@@ -13,54 +13,637 @@ import pandas as pd
 
 
 
-def optimize_minimal_driving_force(S, Vss, enzymeInfo, concLB, concUB):
+def get_minimal_driving_force_problem(S, Vss, enzymeInfo):
 	'''
 	Parameters
 	S: df, stoichiometric matrix, metabolite in rows, reaction in columns. negative for substrates, positive for products
 	Vss: ser, net fluxes in steady state (including in and out fluxes)
 	enzymeInfo: df, reaction in rows
-	concLB: float, concentration lower bound (mM) for all metabolites
-	concUB: float, concentration upper bound (mM) for all metabolites
 	
 	Returns
-	optConcs: ser, optimal log(concentrations)
-	optDeltaGs: ser, optimal minimal driving forces
-	refDeltaGs: float, reference minimal driving forces (all concentrations at 1 mM)
+	f: array, objective coefficients, x = [minimal driving force, log(concentrations)]
+	A: sparse matrix, inequality constraints A*x <= b, reaction in rows
+	b: array, inequality constraints A*x <= b
 	'''
-
-	from openopt import LP
+	
+	from scipy.sparse import csr_matrix, hstack
 	from constants import R, T
-
+	
 	f = np.zeros(S.shape[0] + 1)
 	f[0] = -1
 	
 	S = S * Vss[S.columns]
-	A = np.concatenate((np.ones((S.shape[1], 1)), R * T * S.T), axis = 1)
+	A = hstack((np.ones((S.shape[1], 1)), csr_matrix(R * T * S.T.values.astype(float))), format = 'csr')
 	
 	b = -np.array([-R * T * np.log(item[0]) for item in enzymeInfo.loc[:, 'Keq']])
 	b = b * Vss[S.columns].values
 	
+	return f, A, b
+	
+	
+def optimize_minimal_driving_force(S, Vss, enzymeInfo, concLB, concUB, solver = 'highs'):
+	'''
+	Parameters
+	S: df, stoichiometric matrix, metabolite in rows, reaction in columns. negative for substrates, positive for products
+	Vss: ser, net fluxes in steady state (including in and out fluxes)
+	enzymeInfo: df, reaction in rows
+	concLB: float, concentration lower bound (mM) for all metabolites
+	concUB: float, concentration upper bound (mM) for all metabolites
+	solver: str, LP solver, 'highs' or 'cvxopt_lp'
+	
+	Returns
+	optConcs: ser, optimal log(concentrations)
+	optDeltaGs: ser, optimal minimal driving forces
+	refDeltaGs: float, reference minimal driving forces (all concentrations at 1 mM)
+	solverInfo: dict, solver, status, message, niter and time (s)
+	'''
+
+	from constants import R, T
+	from lp_solvers import solve_lp
+
+	f, A, b = get_minimal_driving_force_problem(S, Vss, enzymeInfo)
+	
 	lb = [-np.inf] + [np.log(concLB)] * S.shape[0]
 	ub = [np.inf] + [np.log(concUB)] * S.shape[0]
 	
-	meth = 'cvxopt_lp'
 	
+	x, fopt, solverInfo = solve_lp(f, A, b, lb, ub, solver)
 	
-	p = LP(f = f, A = A, b = b, lb = lb, ub = ub, iprint = -1, name = 'Maximize minimal driving force')
-	r = p.solve(meth, plot = 0)
+	if solverInfo['status'] != 0:
+		raise ValueError('maximizing minimal driving force failed: %s' % solverInfo['message'])
 	
 	
-	optLogConcs = r.xf[1:]
+	S = S * Vss[S.columns]
+	
+	optLogConcs = x[1:]
 	optConcs = pd.Series(np.exp(optLogConcs), index = S.index)   
 	
 	optDeltaGs = pd.Series(-b + R * T * np.dot(S.T, optLogConcs), index = S.columns)
 	
 	refDeltaGs = pd.Series(-b, index = S.columns)
 	
-	return optConcs, optDeltaGs, refDeltaGs
+	return optConcs, optDeltaGs, refDeltaGs, solverInfo
 
 
-def optimize_enzyme_cost(S, Vss, enzymeInfo, concLB, concUB):
+def sweep_minimal_driving_force(S, Vsss, enzymeInfo, scenarios, nprocess = 1, solver = 'highs'):
+	'''
+	Parameters
+	S: df, stoichiometric matrix, metabolite in rows, reaction in columns. negative for substrates, positive for products
+	Vsss: dict, flux assignment in scenarios => Vss (net fluxes in steady state, including in and out fluxes)
+	enzymeInfo: df, reaction in rows
+	scenarios: df, scenario in rows, columns are 'concLB', 'concUB', 'metabBnds' (dict, metabolite => (lb, ub)) and 'assignFlux'
+	nprocess: int, number of processes
+	solver: str, LP solver, 'highs' or 'cvxopt_lp'
+	
+	Returns
+	sweepResults: df, scenario in rows, MDF, bottleneck reactions and solver info appended to scenarios
+	NOTE constraints are built once for each flux assignment, then only bounds change between scenarios
+	'''
+	
+	from lp_solvers import solve_lp_series_parallel
+	
+	sweepResults = scenarios.copy()
+	sweepResults['MDF (kJ/mol)'] = np.nan
+	sweepResults['Bottleneck'] = ''
+	sweepResults['Status'] = ''
+	sweepResults['Iterations'] = np.nan
+	sweepResults['Time (s)'] = np.nan
+	
+	for assignFlux, scenariosThisFlux in scenarios.groupby('assignFlux', sort = False):
+	
+		f, A, b = get_minimal_driving_force_problem(S, Vsss[assignFlux], enzymeInfo)
+		
+		changes = []
+		for scenario in scenariosThisFlux.index:
+		
+			concLB, concUB, metabBnds = scenarios.loc[scenario, ['concLB', 'concUB', 'metabBnds']]
+			
+			lb = pd.Series(np.log(concLB), index = S.index)
+			ub = pd.Series(np.log(concUB), index = S.index)
+			for metab, (metabLB, metabUB) in metabBnds.items():
+				if metab not in S.index:
+					raise ValueError('metabolite %s in scenario %s is not included in optimization' % (metab, scenario))
+				
+				lb[metab] = np.log(metabLB)
+				ub[metab] = np.log(metabUB)
+				
+			changes.append({'lb': np.concatenate(([-np.inf], lb.values)), 'ub': np.concatenate(([np.inf], ub.values))})
+		
+		xs, fopts, solverInfos = solve_lp_series_parallel(f, A, b, changes[0]['lb'], changes[0]['ub'], changes, nprocess, solver)
+		
+		for scenario, x, fopt, solverInfo in zip(scenariosThisFlux.index, xs, fopts, solverInfos):
+		
+			slacks = b - A.dot(x)
+			
+			sweepResults.loc[scenario, 'MDF (kJ/mol)'] = -fopt
+			sweepResults.loc[scenario, 'Bottleneck'] = ','.join(S.columns[slacks <= 1e-6])
+			sweepResults.loc[scenario, 'Status'] = solverInfo['message']
+			sweepResults.loc[scenario, 'Iterations'] = solverInfo['niter']
+			sweepResults.loc[scenario, 'Time (s)'] = solverInfo['time']
+			
+	return sweepResults
+	
+	
+def thermodynamic_variability_analysis(S, Vss, enzymeInfo, concLB, concUB, fraction = 1.0, nprocess = 1, solver = 'highs'):
+	'''
+	Parameters
+	S: df, stoichiometric matrix, metabolite in rows, reaction in columns. negative for substrates, positive for products
+	Vss: ser, net fluxes in steady state (including in and out fluxes)
+	enzymeInfo: df, reaction in rows
+	concLB: float, concentration lower bound (mM) for all metabolites
+	concUB: float, concentration upper bound (mM) for all metabolites
+	fraction: float, fraction of the maximized minimal driving force to keep, 1 for the optimum
+	nprocess: int, number of processes
+	solver: str, LP solver, 'highs' or 'cvxopt_lp'
+	
+	Returns
+	concRanges: df, metabolite in rows, columns are min and max concentrations (mM)
+	deltaGRanges: df, reaction in rows, columns are min and max ΔG' (same with optDeltaGs of optimize_minimal_driving_force)
+	MDF: float, maximized minimal driving force
+	NOTE the MDF problem is built once, the minimal driving force is bounded below by fraction * MDF, then min and max of each 
+	log(concentration) and ΔG' are solved as a series of LPs with only objectives changed
+	'''
+	
+	from lp_solvers import solve_lp, solve_lp_series_parallel
+	
+	f, A, b = get_minimal_driving_force_problem(S, Vss, enzymeInfo)
+	
+	lb = np.concatenate(([-np.inf], np.full(S.shape[0], np.log(concLB))))
+	ub = np.concatenate(([np.inf], np.full(S.shape[0], np.log(concUB))))
+	
+	x, fopt, solverInfo = solve_lp(f, A, b, lb, ub, solver)
+	
+	if solverInfo['status'] != 0:
+		raise ValueError('maximizing minimal driving force failed: %s' % solverInfo['message'])
+	
+	MDF = -fopt
+	
+	lb[0] = MDF - (1 - fraction) * abs(MDF) - 1e-6
+	
+	# objectives, each log(concentration) and ΔG' (A[:, 1:]*x - b) minimized then maximized
+	objs = [np.eye(1, S.shape[0] + 1, i + 1).ravel() for i in range(S.shape[0])] 
+	objs += [np.concatenate(([0], A[j, 1:].toarray().ravel())) for j in range(S.shape[1])]
+	
+	changes = [{'f': sign * obj} for obj in objs for sign in [1, -1]]
+	
+	xs, fopts, solverInfos = solve_lp_series_parallel(f, A, b, lb, ub, changes, nprocess, solver)
+	
+	if any(solverInfo['status'] != 0 for solverInfo in solverInfos):
+		raise ValueError('thermodynamic variability analysis failed: %s' % ';'.join(set(solverInfo['message'] for solverInfo in solverInfos if solverInfo['status'] != 0)))
+	
+	mins, maxs = fopts[0::2], -fopts[1::2]
+	
+	concRanges = pd.DataFrame({'min': np.exp(mins[:S.shape[0]]), 'max': np.exp(maxs[:S.shape[0]])}, index = S.index)
+	
+	deltaGRanges = pd.DataFrame({'min': mins[S.shape[0]:] - b, 'max': maxs[S.shape[0]:] - b}, index = S.columns)
+	
+	return concRanges, deltaGRanges, MDF
+	
+	
+def sample_minimal_driving_force(S, Vss, enzymeInfo, concLB, concUB, nsamples, cov = None, seed = None, nprocess = 1, solver = 'highs'):
+	'''
+	Parameters
+	S: df, stoichiometric matrix, metabolite in rows, reaction in columns. negative for substrates, positive for products
+	Vss: ser, net fluxes in steady state (including in and out fluxes)
+	enzymeInfo: df, reaction in rows
+	concLB: float, concentration lower bound (mM) for all metabolites
+	concUB: float, concentration upper bound (mM) for all metabolites
+	nsamples: int, # of Monte Carlo samples
+	cov: df, covariance of ΔG'm (kJ/mol)^2, reaction in rows and columns. If None, Keqs are sampled log-uniformly within their bounds
+	seed: int, random seed
+	nprocess: int, number of processes
+	solver: str, LP solver, 'highs' or 'cvxopt_lp'
+	
+	Returns
+	MDFs: ser, maximized minimal driving force of each sample
+	bottleneckPro: ser, probability of each reaction being a bottleneck (driving force constraint active), reaction in index
+	NOTE all samples share the constraint matrix of the MDF problem, only b changes
+	'''
+	
+	from constants import R, T
+	from lp_solvers import solve_lp_series_parallel
+	
+	rng = np.random.default_rng(seed)
+	
+	f, A, b = get_minimal_driving_force_problem(S, Vss, enzymeInfo)
+	
+	lb = np.concatenate(([-np.inf], np.full(S.shape[0], np.log(concLB))))
+	ub = np.concatenate(([np.inf], np.full(S.shape[0], np.log(concUB))))
+	
+	# sample ΔG'm
+	KeqInfos = np.array([item for item in enzymeInfo.loc[S.columns, 'Keq']], dtype = float)
+	
+	if cov is None:
+		logKeqs = np.log(KeqInfos[:, 1]) + (np.log(KeqInfos[:, 2]) - np.log(KeqInfos[:, 1])) * rng.random((nsamples, S.shape[1]))
+		deltaGms = -R * T * logKeqs
+		
+	else:
+		deltaGms = rng.multivariate_normal(-R * T * np.log(KeqInfos[:, 0]), cov.loc[S.columns, S.columns].values, size = nsamples)
+	
+	bs = -deltaGms * Vss[S.columns].values
+	
+	# maximize minimal driving force of each sample
+	changes = [{'b': bi} for bi in bs]
+	
+	xs, fopts, solverInfos = solve_lp_series_parallel(f, A, b, lb, ub, changes, nprocess, solver)
+	
+	MDFs = pd.Series(-fopts, index = range(1, nsamples + 1))
+	
+	slacks = bs - A.dot(xs.T).T
+	ifBottleneck = slacks <= 1e-6 * np.maximum(np.abs(bs), 1)
+	
+	bottleneckPro = pd.Series(ifBottleneck[~np.isnan(fopts)].mean(axis = 0), index = S.columns)
+	
+	return MDFs, bottleneckPro
+	
+	
+def get_enzyme_cost_arrays(S, Vss, enzymeInfo):
+	'''
+	Parameters
+	S: df, stoichiometric matrix, metabolite in rows, reaction in columns. negative for substrates, positive for products	
+	Vss: ser, net fluxes in steady state (including in and out fluxes)
+	enzymeInfo: df, reaction in rows
+	
+	Returns
+	costArrays: dict of arrays, stoichiometric matrix and per-enzyme constants of common_rate_laws.E_expression
+	NOTE with x = log(concentrations), the enzyme cost of reversible reactions is k * (exp(a) + exp(b) + 1) / (1 - exp(g)) and of irreversible 
+	reactions k * (1 + exp(b)), where a = S.T*x + ca, b = -Ssub.T*x + cb, g = S.T*x + cg
+	'''
+	
+	from constants import R, T
+	
+	Svals = S.values.astype(float)
+	Ssub = np.where(Svals < 0, -Svals, 0)
+	Spro = np.where(Svals > 0, Svals, 0)
+	
+	logSubKms = np.zeros_like(Svals)
+	logProKms = np.zeros_like(Svals)
+	for j, enzyme in enumerate(S.columns):
+	
+		subMasks = Svals[:, j] < 0
+		logSubKms[subMasks, j] = np.log([item[0] for item in enzymeInfo.loc[enzyme, 'subsKm'].loc[S.index[subMasks]]])
+		
+		proMasks = Svals[:, j] > 0
+		logProKms[proMasks, j] = np.log([item[0] for item in enzymeInfo.loc[enzyme, 'prosKm'].loc[S.index[proMasks]]])
+	
+	MWs = enzymeInfo.loc[S.columns, 'MW'].values.astype(float)
+	kcats = np.array([item[0] for item in enzymeInfo.loc[S.columns, 'kcat']])
+	Keqs = np.array([item[0] for item in enzymeInfo.loc[S.columns, 'Keq']])
+	
+	costArrays = {'S': Svals, 
+	              'Ssub': Ssub,
+	              'ca': np.sum(Ssub * logSubKms, axis = 0) - np.sum(Spro * logProKms, axis = 0),
+	              'cb': np.sum(Ssub * logSubKms, axis = 0),
+	              'cg': -np.log(Keqs),   # deltaGm / RT
+	              'k': MWs * Vss[S.columns].values.astype(float) / kcats,
+	              'rev': enzymeInfo.loc[S.columns, 'rev'].values.astype(float) == 1}
+	
+	return costArrays
+	
+	
+def get_enzyme_cost_numeric(logConcs, costArrays):
+	'''
+	Parameters
+	logConcs: array, log(concentrations), in order of metabolites, or 2-D with sample in rows
+	costArrays: dict of arrays, see get_enzyme_cost_arrays
+	
+	Returns
+	enzyCosts: array, enzyme costs, in order of enzymes (in columns if logConcs is 2-D), inf for reversible reactions with ΔG >= 0
+	'''
+	
+	rev = costArrays['rev']
+	
+	y = np.dot(logConcs, costArrays['S'])
+	ea = np.exp(y + costArrays['ca'])
+	eb = np.exp(costArrays['cb'] - np.dot(logConcs, costArrays['Ssub']))
+	eg = np.exp(y + costArrays['cg'])
+	
+	with np.errstate(divide = 'ignore'):
+		q = np.where(rev, 1 / (1 - np.where(rev, eg, 0)), 1)
+	
+	enzyCosts = np.where(rev, costArrays['k'] * (ea + eb + 1) * q, costArrays['k'] * (1 + eb))
+	enzyCosts[rev & (eg >= 1)] = np.inf
+	
+	return enzyCosts
+	
+	
+def evaluate_enzyme_cost(S, Vss, enzymeInfo, logConcs, chunkSize = 100000):
+	'''
+	Parameters
+	S: df, stoichiometric matrix, metabolite in rows, reaction in columns. negative for substrates, positive for products	
+	Vss: ser, net fluxes in steady state (including in and out fluxes)
+	enzymeInfo: df, reaction in rows
+	logConcs: df or array, log(concentrations), sample in rows, metabolite in columns (in order of S.index if array)
+	chunkSize: int, # of samples evaluated at once, limits the memory of temporary arrays
+	
+	Returns
+	enzyCosts: df, enzyme costs, sample in rows, enzyme in columns, inf for reversible reactions with ΔG >= 0
+	enzyCostTotals: ser, total enzyme costs of samples
+	NOTE costs of all samples are evaluated by get_enzyme_cost_numeric on the sample matrix, e.g. to map cost landscapes, score 
+	sampled concentrations or check optimization results
+	'''
+	
+	if isinstance(logConcs, pd.DataFrame):
+		index = logConcs.index
+		logConcs = logConcs[S.index].values
+	
+	else:
+		logConcs = np.atleast_2d(logConcs)
+		index = pd.RangeIndex(logConcs.shape[0])
+	
+	costArrays = get_enzyme_cost_arrays(S, Vss, enzymeInfo)
+	
+	enzyCosts = np.empty((logConcs.shape[0], S.shape[1]))
+	
+	with np.errstate(over = 'ignore'):
+		for start in range(0, logConcs.shape[0], chunkSize):
+			enzyCosts[start:start + chunkSize] = get_enzyme_cost_numeric(logConcs[start:start + chunkSize], costArrays)
+	
+	enzyCosts = pd.DataFrame(enzyCosts, index = index, columns = S.columns)
+	enzyCostTotals = enzyCosts.sum(axis = 1)
+	
+	return enzyCosts, enzyCostTotals
+	
+	
+def optimize_enzyme_cost_numeric(S, Vss, enzymeInfo, concLB, concUB, solver = 'trust-constr', ini = None, lpSolver = 'highs'):
+	'''
+	Parameters
+	S: df, stoichiometric matrix, metabolite in rows, reaction in columns. negative for substrates, positive for products	
+	Vss: ser, net fluxes in steady state (including in and out fluxes)
+	enzymeInfo: df, reaction in rows
+	concLB: float, concentration lower bound (mM) for all metabolites
+	concUB: float, concentration upper bound (mM) for all metabolites
+	solver: str, scipy.optimize.minimize method, 'trust-constr' or 'SLSQP'
+	ini: array, initial log(concentrations), the point maximizing the minimal (unweighted) driving force if None
+	lpSolver: str, LP solver to get the initial guess
+	
+	Returns
+	optConcs: ser, optimal log(concentrations)
+	optEnzyCosts: ser, optimal enzyme costs
+	optEnzyCostTotal: float, optimal total enzyme cost
+	NOTE total cost, gradient and Hessian-vector product are evaluated in closed form in log-concentration space. ValueError is raised 
+	if the solver does not report success or its point violates the constraints by more than constants.costFeasTol
+	'''
+	
+	from scipy.optimize import minimize, Bounds, LinearConstraint
+	from constants import R, T, costFeasTol
+	from lp_solvers import solve_lp
+	
+	costArrays = get_enzyme_cost_arrays(S, Vss, enzymeInfo)
+	
+	Svals, Ssub, rev, k = costArrays['S'], costArrays['Ssub'], costArrays['rev'], costArrays['k']
+	
+	def get_terms(x):
+		
+		y = np.dot(x, Svals)
+		ea = np.exp(y + costArrays['ca'])
+		eb = np.exp(costArrays['cb'] - np.dot(x, Ssub))
+		eg = np.where(rev, np.exp(y + costArrays['cg']), 0)
+		q = np.where(rev, 1 / (1 - eg), 1)
+		N = np.where(rev, ea + eb + 1, 1 + eb)
+		
+		return ea, eb, eg, q, N
+	
+	def f(x):
+		
+		return np.sum(get_enzyme_cost_numeric(x, costArrays))
+		
+	def dfdx(x):
+	
+		ea, eb, eg, q, N = get_terms(x)
+		
+		alpha = np.where(rev, k * (ea * q + N * eg * q**2), 0)
+		beta = k * eb * q
+		
+		return np.dot(Svals, alpha) - np.dot(Ssub, beta)
+		
+	def d2fdx2p(x, p):
+	
+		ea, eb, eg, q, N = get_terms(x)
+		
+		u = np.dot(p, Svals)
+		w = -np.dot(p, Ssub)
+		
+		dalpha = np.where(rev, k * (u * (ea * q + 2 * ea * eg * q**2 + N * eg * q**2 * (1 + 2 * eg * q)) + w * eb * eg * q**2), 0)
+		dbeta = k * (w * eb * q + np.where(rev, u * eb * eg * q**2, 0))
+		
+		return np.dot(Svals, dalpha) - np.dot(Ssub, dbeta)
+	
+	# driving force constraints (ΔG <= 0) and concentration bounds
+	A = R * T * Svals.T
+	b = R * T * -costArrays['cg']
+	
+	lb = np.full(S.shape[0], np.log(concLB))
+	ub = np.full(S.shape[0], np.log(concUB))
+	
+	# get initial guess maximizing the minimal driving force, i.e. in the interior of the feasible region
+	if ini is None:
+		fMDF, AMDF, bMDF = get_minimal_driving_force_problem(S, pd.Series(1, index = S.columns), enzymeInfo)
+		
+		x, fopt, solverInfo = solve_lp(fMDF, AMDF, bMDF, np.concatenate(([-np.inf], lb)), np.concatenate(([np.inf], ub)), lpSolver)
+		
+		if solverInfo['status'] != 0 or -fopt <= 0:
+			raise ValueError('no concentrations satisfy ΔG < 0 for all reactions within bounds')
+		
+		ini = x[1:]
+	
+	# optimize enzyme cost
+	if solver == 'trust-constr':
+		r = minimize(f, ini, method = solver, jac = dfdx, hessp = d2fdx2p, bounds = Bounds(lb, ub), constraints = LinearConstraint(A, -np.inf, b))
+	
+	else:
+		r = minimize(f, ini, method = solver, jac = dfdx, bounds = Bounds(lb, ub), constraints = LinearConstraint(A, -np.inf, b))
+	
+	violation = max(np.max(np.dot(A, r.x) - b), np.max(lb - r.x), np.max(r.x - ub))
+	
+	if not r.success or not np.isfinite(r.fun) or violation > costFeasTol:
+		raise ValueError('minimizing enzyme cost failed: %s (max constraint violation %.2e)' % (r.message, violation))
+	
+	optLogConcs = r.x
+	optEnzyCostTotal = r.fun
+	
+	optConcs = pd.Series(np.exp(optLogConcs), index = S.index)
+	
+	optEnzyCosts = pd.Series(get_enzyme_cost_numeric(optLogConcs, costArrays), index = S.columns)
+	
+	return optConcs, optEnzyCosts, optEnzyCostTotal
+	
+
+def get_initial_guesses(S, enzymeInfo, concLB, concUB, nstarts, startMethod = 'mixed', seed = None, lpSolver = 'highs'):
+	'''
+	Parameters
+	S: df, stoichiometric matrix, metabolite in rows, reaction in columns. negative for substrates, positive for products	
+	enzymeInfo: df, reaction in rows
+	concLB: float, concentration lower bound (mM) for all metabolites
+	concUB: float, concentration upper bound (mM) for all metabolites
+	nstarts: int, # of initial guesses
+	startMethod: str, 'mdf', 'random', 'vertex' or 'mixed' (the MDF point first, then vertex and random starts alternately)
+	seed: int, random seed
+	lpSolver: str, LP solver
+	
+	Returns
+	inis: array, initial log(concentrations), start in rows
+	iniTypes: lst, type of each start
+	NOTE all starts satisfy ΔG < 0 for all reactions. random starts are drawn uniformly in the concentration bounds and pulled 
+	towards the MDF point until feasible, vertex starts minimize random linear objectives with half of the MDF kept, solved as 
+	one warm-started LP series
+	'''
+	
+	from lp_solvers import solve_lp, solve_lp_series
+	
+	rng = np.random.default_rng(seed)
+	
+	nmetabs = S.shape[0]
+	
+	f, A, b = get_minimal_driving_force_problem(S, pd.Series(1, index = S.columns), enzymeInfo)
+	
+	lb = np.concatenate(([-np.inf], np.full(nmetabs, np.log(concLB))))
+	ub = np.concatenate(([np.inf], np.full(nmetabs, np.log(concUB))))
+	
+	x, fopt, solverInfo = solve_lp(f, A, b, lb, ub, lpSolver)
+	
+	if solverInfo['status'] != 0 or -fopt <= 0:
+		raise ValueError('no concentrations satisfy ΔG < 0 for all reactions within bounds')
+	
+	center = x[1:]
+	
+	if startMethod == 'mixed':
+		iniTypes = ['mdf'] + ['vertex', 'random'] * (nstarts // 2)
+		iniTypes = iniTypes[:nstarts]
+	
+	else:
+		iniTypes = [startMethod] * nstarts
+	
+	inis = np.tile(center, (nstarts, 1))
+	
+	# random starts
+	randomIdx = [i for i, iniType in enumerate(iniTypes) if iniType == 'random']
+	
+	Ax = A[:, 1:].dot(center)
+	for i in randomIdx:
+		
+		d = np.log(concLB) + rng.random(nmetabs) * (np.log(concUB) - np.log(concLB)) - center
+		Ad = A[:, 1:].dot(d)
+		
+		with np.errstate(divide = 'ignore', invalid = 'ignore'):
+			tMax = np.min(np.where(Ad > 0, (b - Ax) / Ad, np.inf))
+		
+		inis[i] = center + min(1, 0.9 * tMax) * d
+	
+	# vertex starts
+	vertexIdx = [i for i, iniType in enumerate(iniTypes) if iniType == 'vertex']
+	
+	if vertexIdx:
+		lbVertex = lb.copy()
+		lbVertex[0] = -fopt / 2
+		
+		changes = [{'f': np.concatenate(([0], rng.normal(size = nmetabs)))} for i in vertexIdx]
+		
+		xs = solve_lp_series(f, A, b, lbVertex, ub, changes, lpSolver)[0]
+		
+		inis[vertexIdx] = xs[:, 1:]
+	
+	return inis, iniTypes
+	
+	
+def optimize_enzyme_cost_multistart(S, Vss, enzymeInfo, concLB, concUB, nstarts, nprocess = 1, solver = 'trust-constr', startMethod = 'mixed', seed = None, lpSolver = 'highs'):
+	'''
+	Parameters
+	S: df, stoichiometric matrix, metabolite in rows, reaction in columns. negative for substrates, positive for products	
+	Vss: ser, net fluxes in steady state (including in and out fluxes)
+	enzymeInfo: df, reaction in rows
+	concLB: float, concentration lower bound (mM) for all metabolites
+	concUB: float, concentration upper bound (mM) for all metabolites
+	nstarts: int, # of starts
+	nprocess: int, number of processes
+	solver: str, scipy.optimize.minimize method, 'trust-constr' or 'SLSQP'
+	startMethod: str, 'mdf', 'random', 'vertex' or 'mixed', see get_initial_guesses
+	seed: int, random seed
+	lpSolver: str, LP solver to get initial guesses
+	
+	Returns
+	optConcs: ser, optimal log(concentrations) of the best start
+	optEnzyCosts: ser, optimal enzyme costs of the best start
+	optEnzyCostTotal: float, optimal total enzyme cost of the best start
+	startResults: df, start in rows, columns are start type, total enzyme cost, status and optimal concentrations of each start
+	NOTE starts are run in this process if nprocess is 1, e.g. in workers of screening.screen_pathways. Failed starts have nan cost 
+	and concentrations and the error as status, ValueError is raised if all starts fail
+	'''
+	
+	from multiprocessing import Pool
+	
+	inis, iniTypes = get_initial_guesses(S, enzymeInfo, concLB, concUB, nstarts, startMethod, seed, lpSolver)
+	
+	if nprocess > 1:
+		pool = Pool(processes = nprocess)
+		
+		jobs = []
+		for ini in inis:
+		
+			res = pool.apply_async(func = optimize_enzyme_cost_numeric, args = (S, Vss, enzymeInfo, concLB, concUB, solver, ini, lpSolver))
+			
+			jobs.append(res)
+			
+		pool.close()
+		pool.join()
+	
+	# failed starts are kept in startResults with their status, but never taken as the optimum
+	tmp = []
+	statuses = []
+	for i, ini in enumerate(inis):
+		
+		try:
+			if nprocess == 1:
+				tmp.append(optimize_enzyme_cost_numeric(S, Vss, enzymeInfo, concLB, concUB, solver, ini, lpSolver))
+			
+			else:
+				tmp.append(jobs[i].get())
+			
+			statuses.append('ok')
+			
+		except ValueError as e:
+			tmp.append((pd.Series(np.nan, index = S.index), pd.Series(np.nan, index = S.columns), np.nan))
+			statuses.append(str(e))
+	
+	startResults = pd.DataFrame([res[0] for res in tmp], index = range(1, nstarts + 1))
+	startResults.insert(0, 'Status', statuses)
+	startResults.insert(0, 'Total cost', [res[2] for res in tmp])
+	startResults.insert(0, 'Start type', iniTypes)
+	
+	if (startResults['Status'] != 'ok').all():
+		raise ValueError('minimizing enzyme cost failed for all %s starts, e.g. %s' % (nstarts, statuses[0]))
+	
+	best = int(np.nanargmin(startResults['Total cost'].values))
+	
+	optConcs, optEnzyCosts, optEnzyCostTotal = tmp[best]
+	
+	return optConcs, optEnzyCosts, optEnzyCostTotal, startResults
+	
+	
+def optimize_enzyme_cost(S, Vss, enzymeInfo, concLB, concUB, solver = 'trust-constr'):
+	'''
+	Parameters
+	S: df, stoichiometric matrix, metabolite in rows, reaction in columns. negative for substrates, positive for products	
+	Vss: ser, net fluxes in steady state (including in and out fluxes)
+	enzymeInfo: df, reaction in rows
+	concLB: float, concentration lower bound (mM) for all metabolites
+	concUB: float, concentration upper bound (mM) for all metabolites
+	solver: str, 'trust-constr' or 'SLSQP' for the numeric backend, 'ralg' for the sympy (openopt) backend
+	
+	Returns
+	optConcs: ser, optimal log(concentrations)
+	optEnzyCosts: ser, optimal enzyme costs
+	optEnzyCostTotal: float, optimal total enzyme cost
+	'''
+	
+	if solver == 'ralg':
+		return optimize_enzyme_cost_sympy(S, Vss, enzymeInfo, concLB, concUB)
+		
+	else:
+		return optimize_enzyme_cost_numeric(S, Vss, enzymeInfo, concLB, concUB, solver)
+	
+	
+def optimize_enzyme_cost_sympy(S, Vss, enzymeInfo, concLB, concUB):
 	'''
 	Parameters
 	S: df, stoichiometric matrix, metabolite in rows, reaction in columns. negative for substrates, positive for products	
@@ -28,9 +28,14 @@ def assign_metabolites_to_reactions(Smetab2rnx, X):
 		else:
 			return np.ones(1), np.array(X[row == 1])   
 
-	X4rnxs = Smetab2rnx.apply(transformer, axis = 1, raw = True, args = (X,))
+	X = np.asarray(X)
+	
+	# filled one by one, the tuples of arrays are not stacked by numpy or pandas
+	X4rnxs = np.empty(Smetab2rnx.shape[0], dtype = object)
+	for i, row in enumerate(Smetab2rnx.values):
+		X4rnxs[i] = transformer(row, X)
     
-	return np.array(X4rnxs)			
+	return X4rnxs			
 	
 
 def get_V(Smetab2rnx, model, E, X, reverses, kcats, subCoess, subKmss, proCoess, proKmss, Keqs):
@@ -143,6 +148,105 @@ def get_Jacobian(S, Smetab2rnx, model, E, X, reverses, kcats, subCoess, subKmss,
 	return J
 	
 	
+def get_rate_law_arrays(Smetab2rnx, ensembleModels):
+	'''
+	Parameters
+	Smetab2rnx: df, transforme X to metabolites needed in each reaction
+	ensembleModels: lst
+	
+	Returns
+	rateLawArrays: dict of arrays, model in axis 0, enzyme in axis 1 and metabolite in axis 2 (the last entry along axis 2 is 
+	a constant unit concentration, i.e. substrate of input reactions)
+	NOTE Kms are set 1 and coefficients 0 for metabolites not involved in a reaction, products of irreversible reactions are dropped
+	'''
+	
+	import numpy as np
+	
+	nmodels = len(ensembleModels)
+	nenzymes, nmetabs = Smetab2rnx.shape
+	
+	rateLawArrays = {'kcats': np.zeros((nmodels, nenzymes)),
+	                 'invKeqs': np.zeros((nmodels, nenzymes)),
+	                 'subCoes': np.zeros((nmodels, nenzymes, nmetabs + 1)),
+	                 'subKms': np.ones((nmodels, nenzymes, nmetabs + 1)),
+	                 'proCoes': np.zeros((nmodels, nenzymes, nmetabs + 1)),
+	                 'proKms': np.ones((nmodels, nenzymes, nmetabs + 1))}
+	
+	subPoss, proPoss = [], []
+	for row in Smetab2rnx.values:
+		subPos = np.where(row == -1)[0]
+		subPoss.append(subPos if subPos.size > 0 else np.array([nmetabs]))   # input reaction in form of X_in -> X
+		proPoss.append(np.where(row == 1)[0])
+	
+	for m, ensembleModel in enumerate(ensembleModels):
+	
+		reverses, kcats, subConcss, subCoess, subKmss, proConcss, proCoess, proKmss, Keqs = ensembleModel
+		
+		rateLawArrays['kcats'][m] = np.array(kcats, dtype = float)
+		
+		for i in range(nenzymes):
+		
+			rateLawArrays['subCoes'][m, i, subPoss[i]] = subCoess[i]
+			rateLawArrays['subKms'][m, i, subPoss[i]] = subKmss[i]
+			
+			if reverses[i]:
+				rateLawArrays['proCoes'][m, i, proPoss[i]] = proCoess[i]
+				rateLawArrays['proKms'][m, i, proPoss[i]] = proKmss[i]
+				rateLawArrays['invKeqs'][m, i] = 1 / Keqs[i]
+	
+	return rateLawArrays
+	
+	
+def get_rate_law_derivatives(rateLawArrays, E, X):
+	'''
+	Parameters
+	rateLawArrays: dict of arrays, see get_rate_law_arrays
+	E: array, enzyme concentrations, in order of enzymes, model in axis 0 if 2-D
+	X: array, metabolite concentrations, in order of metabs, model in axis 0 if 2-D
+	
+	Returns
+	V: array, fluxes, model in axis 0
+	dVdX: array, dVdX, model in axis 0
+	dVdE: array, dVdE, model in axis 0
+	NOTE numeric counterparts of get_V, get_dVdX and get_dVdE with common_rate_laws.v_expression as the rate law model
+	'''
+	
+	import numpy as np
+	
+	E = np.atleast_2d(np.asarray(E, dtype = float))
+	X = np.atleast_2d(np.asarray(X, dtype = float))
+	Xa = np.concatenate((X, np.ones((X.shape[0], 1))), axis = 1)[:, np.newaxis, :]
+	
+	subCoes, subKms = rateLawArrays['subCoes'], rateLawArrays['subKms']
+	proCoes, proKms = rateLawArrays['proCoes'], rateLawArrays['proKms']
+	invKeqs = rateLawArrays['invKeqs'][..., np.newaxis]
+	kcats = rateLawArrays['kcats']
+	
+	# generalized rate law, reduced to the irreversible form with product coefficients and 1/Keq all 0
+	logXa = np.log(Xa)
+	
+	K = np.exp(-np.sum(subCoes * np.log(subKms), axis = -1))[..., np.newaxis]
+	Ps = np.exp(np.sum(subCoes * logXa, axis = -1))[..., np.newaxis]
+	Pp = np.exp(np.sum(proCoes * logXa, axis = -1))[..., np.newaxis]
+	Qs = np.exp(np.sum(subCoes * np.log(1 + Xa / subKms), axis = -1))[..., np.newaxis]
+	Qp = np.exp(np.sum(proCoes * np.log(1 + Xa / proKms), axis = -1))[..., np.newaxis]
+	
+	N = Ps - Pp * invKeqs
+	D = Qs + Qp - 1
+	
+	dNdX = (subCoes * Ps - proCoes * Pp * invKeqs) / Xa
+	dDdX = subCoes * Qs / (subKms + Xa) + proCoes * Qp / (proKms + Xa)
+	
+	kin = (K * N / D)[..., 0]
+	dkindX = K * (dNdX * D - N * dDdX) / D**2
+	
+	V = kcats * E * kin
+	dVdX = (kcats * E)[..., np.newaxis] * dkindX[..., :-1]
+	dVdE = np.einsum('mi,ij->mij', kcats * kin, np.eye(kin.shape[-1]))
+	
+	return V, dVdX, dVdE
+	
+	
 def get_lambdify_function(args, func):
 	'''
 	Parameters	
@@ -160,7 +264,7 @@ def get_lambdify_function(args, func):
 	return funLam
 	
 	
-def solve_dXdE(Espan, nsteps, Xini, Jlam, dVdElam, S):
+def solve_dXdE(Espan, nsteps, Xini, Jlam, dVdElam, S, condThreshold = None):
 	'''
 	Parameters
 	Espan: df, 1st and 2nd columns are integration interval, enzyme in rows
@@ -169,17 +273,24 @@ def solve_dXdE(Espan, nsteps, Xini, Jlam, dVdElam, S):
 	Jlam: lambdified function, Jacobian matrix
 	dVdElam: lambdified function, dVdE
 	S: df, stoichiometric matrix, metabolite in rows, reaction in columns
+	condThreshold: float, condition number of Jacobian (over its rank at the start of continuation) above which integration stops as 
+	singular Jacobian, condThreshold in constants.py by default (inf, i.e. the condition number is only recorded)
 		
 	Returns
 	Eout: df, enzyme expression range, enzyme in rows, columns are the same with Xout 
 	Xout: df, metabolite concentration range, metabolite in rows, columns are the same with Eout (initial input metabolite not included)
+	diagnostics: dict, steps completed, termination reason ('instability', 'negative concentration', 'singular Jacobian' or 'reached bound'), 
+	max real part of Jacobian eigenvalues and condition number of Jacobian (over its rank at the start of continuation) at exit
 	'''
 
 	import numpy as np
 	import pandas as pd
-	from scipy.linalg import eigvals, pinv2
+	from scipy.linalg import eigvals, svd
+	import constants
 	from constants import eigThreshold
 	
+	if condThreshold is None: condThreshold = constants.condThreshold
+	
 	# prepare initial X, E
 	Espan = np.matrix(Espan)
 	
@@ -195,28 +306,467 @@ def solve_dXdE(Espan, nsteps, Xini, Jlam, dVdElam, S):
 	Xout.iloc[:, 0] = X
 	Eout.iloc[:, 0] = E
 	
+	diagnostics = {'steps': nsteps, 'termination': 'reached bound', 'max eigenvalue': np.nan, 'condition number': np.nan}
+	
+	cutoff = np.finfo(float).eps * 1e6   # cutoff of scipy pinv2
+	
 	for i in range(1, nsteps + 1):
 	
 		XE = np.array(np.concatenate((X, E)))
 		
 		# update Jacobian matrix and screen
-		J = np.matrix(Jlam(*XE)).astype(np.float)
-
-		if np.any(eigvals(J).real >= eigThreshold): break   
+		J = np.matrix(Jlam(*XE)).astype(float)
+		
+		diagnostics['max eigenvalue'] = eigvals(J).real.max()
+		
+		if diagnostics['max eigenvalue'] >= eigThreshold:
+			diagnostics.update({'steps': i - 1, 'termination': 'instability'})
+			break
+		
+		U, s, Vh = svd(J)
+		
+		# rank of J at the start, singular values of conserved moieties are excluded from the condition number
+		if i == 1: rank = max(np.sum(s > s[0] * cutoff), 1)
+		
+		diagnostics['condition number'] = s[0] / s[rank - 1] if s[rank - 1] > 0 else np.inf
+		
+		if diagnostics['condition number'] > condThreshold:
+			diagnostics.update({'steps': i - 1, 'termination': 'singular Jacobian'})
+			break
+		
+		# pseudo inverse of J, singular values below the cutoff of scipy pinv2 are dropped
+		sInv = np.where(s > s[0] * cutoff, 1 / np.maximum(s, s[0] * cutoff), 0)
+		Jinv = np.matrix(Vh.T * sInv @ U.T)
 
 		# update X, E and screen
-		dVdE = np.matrix(dVdElam(*XE)).astype(np.float)
+		dVdE = np.matrix(dVdElam(*XE)).astype(float)
 
-		dX = -pinv2(J) * np.matrix(S) * dVdE * np.matrix(dE)
+		dX = -Jinv * np.matrix(S) * dVdE * np.matrix(dE)
 		
 		X = X + dX
 		E = E + dE
 		
-		if X.min() <= 0: break   
+		if X.min() <= 0:
+			diagnostics.update({'steps': i - 1, 'termination': 'negative concentration'})
+			break
 		
 		# update Xout, Eout
 		Xout.iloc[:, i] = X
 		Eout.iloc[:, i] = E
 		
-	return Eout, Xout	
+	return Eout, Xout, diagnostics	
+	
+	
+def solve_dXdE_numeric(Espan, nsteps, Xini, rateLawArrays, S, L = None, condThreshold = None):
+	'''
+	Parameters
+	Espan: df, 1st and 2nd columns are integration interval, enzyme in rows
+	nsteps: int, # of integration steps
+	Xini: array, ini values of X
+	rateLawArrays: dict of arrays, rate law arrays of one model, see get_rate_law_arrays
+	S: df, stoichiometric matrix, metabolite in rows, reaction in columns
+	L: df, link matrix from parse_network.get_conservation_relations, continuation runs on independent metabolites, None for all metabolites
+	condThreshold: float, see solve_dXdE
+	
+	Returns
+	Eout: df, enzyme expression range, enzyme in rows, columns are the same with Xout 
+	Xout: df, metabolite concentration range, metabolite in rows, columns are the same with Eout
+	diagnostics: dict, the same with solve_dXdE
+	NOTE numeric counterpart of solve_dXdE, the continuation runs in kernels.continuation_kernel which is compiled by Numba if installed
+	'''
+	
+	import numpy as np
+	import pandas as pd
+	import constants
+	from constants import eigThreshold
+	from kernels import continuation_kernel
+	
+	if condThreshold is None: condThreshold = constants.condThreshold
+	
+	terminations = ['reached bound', 'instability', 'singular Jacobian', 'negative concentration']
+	
+	Espan = np.asarray(Espan, dtype = float)
+	
+	if L is None: L = pd.DataFrame(np.eye(S.shape[0]), index = S.index, columns = S.index)
+	
+	Es, Xs, steps, termination, maxEig, cond = continuation_kernel(np.ascontiguousarray(S.loc[L.columns].values, dtype = float), np.ascontiguousarray(L.values, dtype = float), rateLawArrays['kcats'], rateLawArrays['invKeqs'], 
+	                                                               rateLawArrays['subCoes'], rateLawArrays['subKms'], rateLawArrays['proCoes'], rateLawArrays['proKms'], 
+	                                                               np.ascontiguousarray(Espan[:, 0]), np.ascontiguousarray(Espan[:, 1]), np.asarray(Xini, dtype = float), 
+	                                                               nsteps, float(eigThreshold), float(condThreshold))
+	
+	Eout = pd.DataFrame(Es.T, index = S.columns, columns = range(nsteps + 1))
+	Xout = pd.DataFrame(Xs.T, index = S.index, columns = range(nsteps + 1))
+	
+	diagnostics = {'steps': steps, 'termination': terminations[termination], 'max eigenvalue': maxEig, 'condition number': cond}
+	
+	return Eout, Xout, diagnostics
+	
+	
+def get_sparse_rate_law_arrays(Smetab2rnx, rateLawArrays):
+	'''
+	Parameters
+	Smetab2rnx: df, transforme X to metabolites needed in each reaction
+	rateLawArrays: dict of arrays, rate law arrays of one model, see get_rate_law_arrays
+	
+	Returns
+	sparseArrays: dict of arrays, 'rows' and 'cols' are the incidence of enzymes (rows) and metabolites (columns, the last one is the 
+	constant unit concentration of input reactions), 'subCoes', 'subKms', 'proCoes' and 'proKms' are their values at the incidence, 
+	'kcats' and 'invKeqs' are the same with rateLawArrays
+	'''
+	
+	import numpy as np
+	
+	incidence = np.concatenate((Smetab2rnx.values != 0, (Smetab2rnx.values != -1).all(axis = 1)[:, np.newaxis]), axis = 1)
+	
+	rows, cols = np.nonzero(incidence)
+	
+	sparseArrays = {'rows': rows, 'cols': cols, 'nmetabs': Smetab2rnx.shape[1], 'kcats': rateLawArrays['kcats'], 'invKeqs': rateLawArrays['invKeqs']}
+	for key in ['subCoes', 'subKms', 'proCoes', 'proKms']:
+		sparseArrays[key] = rateLawArrays[key][rows, cols]
+	
+	return sparseArrays
+	
+	
+def get_rate_law_derivatives_sparse(sparseArrays, E, X):
+	'''
+	Parameters
+	sparseArrays: dict of arrays, see get_sparse_rate_law_arrays
+	E: array, enzyme concentrations, in order of enzymes
+	X: array, metabolite concentrations, in order of metabs
+	
+	Returns
+	V: array, fluxes
+	dVdX: csr matrix, dVdX, enzyme in rows, metabolite in columns
+	dVdE: array, diagonal of dVdE
+	NOTE sparse counterpart of get_rate_law_derivatives for one model, only entries at the incidence of enzymes and metabolites are evaluated
+	'''
+	
+	import numpy as np
+	from scipy.sparse import csr_matrix
+	
+	rows, cols, nmetabs = sparseArrays['rows'], sparseArrays['cols'], sparseArrays['nmetabs']
+	subCoes, subKms = sparseArrays['subCoes'], sparseArrays['subKms']
+	proCoes, proKms = sparseArrays['proCoes'], sparseArrays['proKms']
+	kcats, invKeqs = sparseArrays['kcats'], sparseArrays['invKeqs']
+	
+	nenzymes = kcats.size
+	
+	x = np.append(X, 1)[cols]
+	
+	rowSum = lambda values: np.bincount(rows, weights = values, minlength = nenzymes)
+	
+	K = np.exp(-rowSum(subCoes * np.log(subKms)))
+	Ps = np.exp(rowSum(subCoes * np.log(x)))
+	Pp = np.exp(rowSum(proCoes * np.log(x)))
+	Qs = np.exp(rowSum(subCoes * np.log(1 + x / subKms)))
+	Qp = np.exp(rowSum(proCoes * np.log(1 + x / proKms)))
+	
+	N = Ps - Pp * invKeqs
+	D = Qs + Qp - 1
+	
+	dNdX = (subCoes * Ps[rows] - proCoes * Pp[rows] * invKeqs[rows]) / x
+	dDdX = subCoes * Qs[rows] / (subKms + x) + proCoes * Qp[rows] / (proKms + x)
+	
+	kin = K * N / D
+	
+	values = (kcats * E * K / D**2)[rows] * (dNdX * D[rows] - N[rows] * dDdX)
+	
+	inMetabs = cols < nmetabs
+	dVdX = csr_matrix((values[inMetabs], (rows[inMetabs], cols[inMetabs])), shape = (nenzymes, nmetabs))
+	
+	V = kcats * E * kin
+	dVdE = kcats * kin
+	
+	return V, dVdX, dVdE
+	
+	
+def get_rightmost_eigenvalue(J):
+	'''
+	Parameters
+	J: sparse matrix, Jacobian matrix
+	
+	Returns
+	maxEig: float, max real part of eigenvalues
+	NOTE dense eigenvalues (LAPACK) below denseEigThreshold (constants.py) metabolites. Above it, ARPACK in shift-invert mode around 
+	eigThreshold gives the eigenvalues nearest the threshold, i.e. where the rightmost eigenvalue crosses it along the continuation, 
+	falls back to dense eigenvalues if ARPACK does not converge
+	'''
+	
+	import numpy as np
+	from scipy.linalg import eigvals
+	from scipy.sparse.linalg import eigs, ArpackNoConvergence
+	from constants import eigThreshold, denseEigThreshold
+	
+	if J.shape[0] < denseEigThreshold: return eigvals(J.toarray(), check_finite = False).real.max()
+	
+	try:
+		maxEig = eigs(J.tocsc(), k = 6, sigma = eigThreshold, which = 'LM', return_eigenvectors = False).real.max()
+	
+	except RuntimeError:   # J - eigThreshold*I exactly singular, i.e. an eigenvalue at the threshold
+		maxEig = float(eigThreshold)
+	
+	except ArpackNoConvergence:
+		maxEig = eigvals(J.toarray(), check_finite = False).real.max()
+	
+	return maxEig
+	
+	
+def get_null_spaces(J):
+	'''
+	Parameters
+	J: array or sparse matrix, Jacobian matrix
+	
+	Returns
+	Nright: array, orthonormal basis of the right null space of J in columns
+	Nleft: array, orthonormal basis of the left null space of J in columns
+	NOTE singular values below the cutoff of scipy pinv2 are taken as 0, the same rank with the pseudo inverse of solve_dXdE and 
+	kernels.pinv_kernel. A dense SVD, computed once per model at the reference state by ensemble_models.simulation_worker
+	'''
+	
+	import numpy as np
+	from scipy.linalg import svd
+	from scipy.sparse import issparse
+	
+	if issparse(J): J = J.toarray()
+	
+	U, s, Vh = svd(J)
+	
+	rank = max(np.sum(s > s[0] * np.finfo(float).eps * 1e6), 1)
+	
+	return Vh[rank:].T, U[:, rank:]
+	
+	
+def get_sparse_pinv_solver(J, Nright, Nleft):
+	'''
+	Parameters
+	J: sparse matrix, Jacobian matrix
+	Nright: array, right null space of J at the previous step, see get_null_spaces
+	Nleft: array, left null space of J at the previous step
+	
+	Returns
+	solve: func, b => pinv(J)*b
+	solveT: func, b => pinv(J).T*b
+	Nright: array, right null space of J
+	Nleft: array, left null space of J
+	NOTE J is bordered by the null spaces of the previous step, [J, Nleft; Nright', 0], which is nonsingular as long as they complement 
+	the range of J and J'. One sparse LU of the bordered matrix gives the null spaces of J (solves with [0; I]) and the minimum norm 
+	solutions of pinv(J)*b. The rank is kept as at the start, if the LU fails the null spaces are recomputed by get_null_spaces
+	'''
+	
+	import numpy as np
+	from scipy.sparse import csr_matrix, bmat
+	from scipy.sparse.linalg import splu
+	
+	n, nnull = J.shape[0], Nright.shape[1]
+	
+	try:
+		lu = splu(bmat([[J, csr_matrix(Nleft)], [csr_matrix(Nright.T), None]], format = 'csc') if nnull > 0 else J.tocsc())
+	
+	except RuntimeError:   # exactly singular
+		Nright, Nleft = get_null_spaces(J)
+		
+		return get_sparse_pinv_solver(J, Nright, Nleft)
+	
+	if nnull > 0:
+		rhs = np.zeros((n + nnull, nnull))
+		rhs[n:] = np.eye(nnull)
+		
+		Nright = np.linalg.qr(lu.solve(rhs)[:n])[0]
+		Nleft = np.linalg.qr(lu.solve(rhs, trans = 'T')[:n])[0]
+	
+	def solve(b):
+		
+		b = np.ravel(b)
+		b = b - Nleft @ (Nleft.T @ b)
+		x = lu.solve(np.concatenate((b, np.zeros(nnull))))[:n]
+		
+		return x - Nright @ (Nright.T @ x)
+	
+	def solveT(b):
+		
+		b = np.ravel(b)
+		b = b - Nright @ (Nright.T @ b)
+		x = lu.solve(np.concatenate((b, np.zeros(nnull))), trans = 'T')[:n]
+		
+		return x - Nleft @ (Nleft.T @ x)
+	
+	return solve, solveT, Nright, Nleft
+	
+	
+def get_sparse_singular_values(J, solve, solveT, Nright):
+	'''
+	Parameters
+	J: sparse matrix, Jacobian matrix
+	solve, solveT: func, pinv(J)*b and pinv(J).T*b, see get_sparse_pinv_solver
+	Nright: array, right null space of J, see get_sparse_pinv_solver
+	
+	Returns
+	sMax: float, largest singular value of J
+	sRetained: float, smallest singular value of J kept by the pseudo inverse, i.e. 1 / the largest singular value of pinv(J)
+	sNull: array, singular values of J in its null space in ascending order, ~0 unless they grow back above the cutoff
+	NOTE the largest singular values of J and pinv(J) are computed by ARPACK
+	'''
+	
+	import numpy as np
+	from scipy.linalg import svdvals
+	from scipy.sparse.linalg import svds, LinearOperator, ArpackNoConvergence
+	
+	n = J.shape[0]
+	v0 = np.ones(n) / np.sqrt(n)
+	
+	Jop = LinearOperator(J.shape, matvec = lambda x: J @ np.ravel(x), rmatvec = lambda x: J.T @ np.ravel(x), dtype = float)
+	Jinvop = LinearOperator(J.shape, matvec = solve, rmatvec = solveT, dtype = float)
+	
+	try:
+		sMax = svds(Jop, k = 1, v0 = v0, return_singular_vectors = False)[0]
+		sInvMax = svds(Jinvop, k = 1, v0 = v0, return_singular_vectors = False)[0]
+	
+	except ArpackNoConvergence:
+		sMax = svdvals(J.toarray())[0]
+		sInvMax = svdvals(np.column_stack([solve(e) for e in np.eye(n)]))[0]
+	
+	sRetained = 1 / sInvMax if sInvMax > 0 else np.inf
+	sNull = np.sort(svdvals(J @ Nright)) if Nright.shape[1] > 0 else np.zeros(0)
+	
+	return sMax, sRetained, sNull
+	
+	
+def check_sparse_rank_change(J, solve, solveT, Nright):
+	'''
+	Parameters
+	J: sparse matrix, Jacobian matrix
+	solve, solveT: func, pinv(J)*b and pinv(J).T*b, see get_sparse_pinv_solver
+	Nright: array, right null space of J, see get_sparse_pinv_solver
+	
+	Returns
+	ifNearCutoff: bool, whether a singular value may have crossed the cutoff of scipy pinv2
+	NOTE screened by 2-norm bounds from the 1-norms of J and pinv(J) (estimated by onenormest with a few solves) with a margin of 10, 
+	so that singular values by ARPACK (get_sparse_singular_values) are only needed near the cutoff
+	'''
+	
+	import numpy as np
+	from scipy.linalg import svdvals
+	from scipy.sparse.linalg import norm, onenormest, LinearOperator
+	
+	n = J.shape[0]
+	cutoff = np.finfo(float).eps * 1e6   # cutoff of scipy pinv2
+	
+	norm1 = norm(J, 1)
+	norm1Inv = onenormest(LinearOperator(J.shape, matvec = solve, rmatvec = solveT, dtype = float))
+	
+	# sMax >= norm1/sqrt(n) and sRetained >= 1/(sqrt(n)*norm1Inv)
+	ifRetainedNear = n * norm1 * norm1Inv * 10 >= 1 / cutoff
+	ifNullNear = Nright.shape[1] > 0 and svdvals(J @ Nright).max() * np.sqrt(n) * 10 >= cutoff * norm1
+	
+	return bool(ifRetainedNear or ifNullNear)
+	
+	
+def solve_dXdE_sparse(Espan, nsteps, Xini, sparseArrays, S, L = None, condThreshold = None, nullSpaces = None):
+	'''
+	Parameters
+	Espan: df, 1st and 2nd columns are integration interval, enzyme in rows
+	nsteps: int, # of integration steps
+	Xini: array, ini values of X
+	sparseArrays: dict of arrays, sparse rate law arrays of one model, see get_sparse_rate_law_arrays
+	S: df, stoichiometric matrix, metabolite in rows, reaction in columns
+	L: df, link matrix from parse_network.get_conservation_relations, continuation runs on independent metabolites, None for all metabolites
+	condThreshold: float, see solve_dXdE
+	nullSpaces: 2-tuple of arrays, right and left null spaces of the reduced J at the start from get_null_spaces, e.g. computed once per 
+	model since all continuations start at the reference state, computed here if None
+	
+	Returns
+	Eout: df, enzyme expression range, enzyme in rows, columns are the same with Xout 
+	Xout: df, metabolite concentration range, metabolite in rows, columns are the same with Eout
+	diagnostics: dict, the same with solve_dXdE
+	NOTE sparse counterpart of solve_dXdE_numeric for large pathways, the reduced J is assembled in CSR form and stability is screened by the 
+	rightmost eigenvalue only (see get_rightmost_eigenvalue). The step is the same pseudo inverse step, solved by sparse LU of J bordered by its null spaces tracked along 
+	the continuation (see get_sparse_pinv_solver). The same rules with solve_dXdE apply: at each step singular values below the cutoff of 
+	scipy pinv2 are dropped, i.e. the null spaces are recomputed (dense, rarely) once a kept singular value falls below it or a dropped one 
+	grows above it, and the 2-norm condition number is over the rank at the start, from the extreme singular values by ARPACK. These are 
+	only computed if a finite condThreshold is set (the condition number is nan otherwise) or check_sparse_rank_change finds a singular 
+	value near the cutoff
+	'''
+	
+	import numpy as np
+	import pandas as pd
+	from scipy.sparse import csr_matrix
+	import constants
+	from constants import eigThreshold
+	
+	if condThreshold is None: condThreshold = constants.condThreshold
+	
+	Espan = np.asarray(Espan, dtype = float)
+	
+	dE = (Espan[:, 1] - Espan[:, 0]) / nsteps
+	
+	E = Espan[:, 0].copy()
+	X = np.asarray(Xini, dtype = float).copy()
+	
+	Xout = pd.DataFrame(np.nan, index = S.index, columns = range(nsteps + 1))
+	Eout = pd.DataFrame(np.nan, index = S.columns, columns = range(nsteps + 1))
+	
+	Xout.iloc[:, 0] = X
+	Eout.iloc[:, 0] = E
+	
+	if L is None: L = pd.DataFrame(np.eye(S.shape[0]), index = S.index, columns = S.index)
+	
+	S = csr_matrix(S.loc[L.columns].values.astype(float))
+	L = csr_matrix(L.values.astype(float))
+	
+	diagnostics = {'steps': nsteps, 'termination': 'reached bound', 'max eigenvalue': np.nan, 'condition number': np.nan}
+	
+	cutoff = np.finfo(float).eps * 1e6   # cutoff of scipy pinv2
+	
+	for i in range(1, nsteps + 1):
+		
+		V, dVdX, dVdE = get_rate_law_derivatives_sparse(sparseArrays, E, X)
+		
+		# update Jacobian matrix and screen
+		J = S @ dVdX @ L
+		
+		diagnostics['max eigenvalue'] = get_rightmost_eigenvalue(J)
+		
+		if diagnostics['max eigenvalue'] >= eigThreshold:
+			diagnostics.update({'steps': i - 1, 'termination': 'instability'})
+			break
+		
+		if nullSpaces is None: nullSpaces = get_null_spaces(J)
+		
+		# nullity at the start, the condition number is over the rank at the start
+		if i == 1: nnull0 = nullSpaces[0].shape[1]
+		
+		solve, solveT, Nright, Nleft = get_sparse_pinv_solver(J, *nullSpaces)
+		
+		# singular values by ARPACK for the condition number if a finite condThreshold is set, otherwise only if one may cross the cutoff
+		if np.isfinite(condThreshold) or check_sparse_rank_change(J, solve, solveT, Nright):
+			sMax, sRetained, sNull = get_sparse_singular_values(J, solve, solveT, Nright)
+			
+			# rank changed, i.e. a singular value crossed the cutoff
+			if sRetained <= sMax * cutoff or (sNull.size > 0 and sNull[-1] > sMax * cutoff):
+				solve, solveT, Nright, Nleft = get_sparse_pinv_solver(J, *get_null_spaces(J))
+				
+				sMax, sRetained, sNull = get_sparse_singular_values(J, solve, solveT, Nright)
+			
+			if np.isfinite(condThreshold):
+				sRank0 = sNull[nnull0] if sNull.size > nnull0 else sRetained
+				
+				diagnostics['condition number'] = sMax / sRank0 if sRank0 > 0 else np.inf
+		
+		nullSpaces = (Nright, Nleft)
+		
+		if diagnostics['condition number'] > condThreshold:
+			diagnostics.update({'steps': i - 1, 'termination': 'singular Jacobian'})
+			break
+		
+		# update X, E and screen
+		X = X + L @ solve(-(S @ (dVdE * dE)))
+		E = E + dE
+		
+		if X.min() <= 0:
+			diagnostics.update({'steps': i - 1, 'termination': 'negative concentration'})
+			break
+		
+		Xout.iloc[:, i] = X
+		Eout.iloc[:, i] = E
 	
+	return Eout, Xout, diagnostics